@@ -0,0 +1,516 @@
+'''Simulate a player's bankroll over any number of rounds and measure its
+risk: the EV and variance of every round, the drawdowns and lengths of
+sessions, and the risk of ruin.
+
+The rounds are grouped into sessions. Each session starts with the same
+bankroll, bets what the bet policy asks for (capped at the balance) every
+round, and ends when the balance falls below the minimum bet (ruin) or
+after a maximum number of rounds (survival), whichever comes first.
+
+Every statistic is kept in a streaming accumulator, a RunningStats (Welford's
+algorithm) or a fixed-bin Histogram, so memory stays constant regardless of
+the number of rounds, and no outcome is ever stored. The accumulators of
+several workers can be merged, so simulate_parallel gives the same kind of
+results as simulate for a large number of rounds.
+'''
+
+
+__author__ = "U Ahsan"
+
+
+import argparse
+import functools
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import main
+import shoe
+import simulation
+
+
+## Constants ##
+# The minimum bet of the game (see main.start_game).
+MINIMUM_BET = 1.0
+
+DEFAULT_SESSION_ROUNDS = 1000
+
+# The number of bins of every histogram.
+HISTOGRAM_BINS = 50
+
+DEFAULT_SNAPSHOT_INTERVAL = 100000
+
+
+class RunningStats:
+    '''The count, mean, and variance of a stream of values, updated with
+    Welford's algorithm, along with the minimum and maximum value.'''
+
+    __slots__ = ("count", "mean", "m2", "minimum", "maximum")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, value: float):
+        '''Add value to the stream.'''
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if value < self.minimum:
+            self.minimum = value
+
+        if value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other: "RunningStats"):
+        '''Add every value of the stream of other to this stream
+        (the parallel form of Welford's algorithm).'''
+
+        if other.count == 0:
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def variance(self) -> float:
+        '''Return the sample variance of the stream.'''
+
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def standard_error(self) -> float:
+        '''Return the standard error of the mean of the stream.'''
+
+        return math.sqrt(self.variance() / self.count) if self.count > 1 else 0.0
+
+    def summary(self) -> dict:
+        '''Return the statistics of the stream as a dictionary.'''
+
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "variance": self.variance(),
+            "standard_deviation": math.sqrt(self.variance()),
+            "standard_error": self.standard_error(),
+            "minimum": self.minimum if self.count else None,
+            "maximum": self.maximum if self.count else None,
+        }
+
+
+class Histogram:
+    '''A histogram of a stream of values with bin_count bins of equal width
+    from low to high, and a count of the values below and above them.'''
+
+    __slots__ = ("low", "high", "width", "counts", "below", "above", "total")
+
+    def __init__(self, low: float, high: float, bin_count: int=HISTOGRAM_BINS):
+        self.low = low
+        self.high = high
+        self.width = (high - low) / bin_count
+        self.counts = [0] * bin_count
+        self.below = 0
+        self.above = 0
+        self.total = 0
+
+    def add(self, value: float):
+        '''Add value to the histogram.'''
+
+        self.total += 1
+
+        if value < self.low:
+            self.below += 1
+        elif value >= self.high:
+            self.above += 1
+        else:
+            self.counts[int((value - self.low) / self.width)] += 1
+
+    def merge(self, other: "Histogram"):
+        '''Add every value of other, which has the same bins, to this histogram.'''
+
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+
+        self.below += other.below
+        self.above += other.above
+        self.total += other.total
+
+    def quantile(self, fraction: float) -> float:
+        '''Return an estimate of the value below which fraction of the values
+        fall, interpolated within its bin. Values outside the bins are
+        clamped to low or high.'''
+
+        if self.total == 0:
+            return None
+
+        target = fraction * self.total
+        seen = self.below
+
+        if target <= seen:
+            return self.low
+
+        for i, count in enumerate(self.counts):
+            if seen + count >= target:
+                return self.low + (i + (target - seen) / count) * self.width
+
+            seen += count
+
+        return self.high
+
+    def summary(self) -> dict:
+        '''Return the histogram and its quartiles as a dictionary.'''
+
+        return {
+            "low": self.low,
+            "high": self.high,
+            "counts": list(self.counts),
+            "below": self.below,
+            "above": self.above,
+            "quartiles": [self.quantile(fraction) for fraction in (0.25, 0.5, 0.75)],
+        }
+
+
+def flat_bet(unit: float, balance: float, table_shoe) -> float:
+    '''Bet policy betting unit every round.'''
+
+    return unit
+
+
+def count_spread(unit: float, spread: int, balance: float, table_shoe) -> float:
+    '''Bet policy betting unit times the true count of the shoe (see
+    shoe.true_count), rounded down, between 1 and spread units. In true
+    random mode, where there is no shoe, it always bets unit.'''
+
+    if table_shoe is None:
+        return unit
+
+    return unit * min(spread, max(1, math.floor(shoe.true_count(table_shoe))))
+
+
+def bet_policy(unit: float, spread: int=1):
+    '''Return a picklable bet policy, called as bet_policy(balance, shoe), that
+    bets a flat unit, or spreads from 1 to spread units with the true count.'''
+
+    if spread > 1:
+        return functools.partial(count_spread, unit, spread)
+
+    return functools.partial(flat_bet, unit)
+
+
+def new_state(bankroll: float, session_rounds: int) -> dict:
+    '''Create and return the accumulators of a bankroll simulation of sessions
+    starting with bankroll and lasting at most session_rounds rounds.'''
+
+    return {
+        "rounds": 0,
+        "sessions": 0,
+        "ruined": 0,
+        "outcomes": RunningStats(),
+        "bets": RunningStats(),
+        "session_lengths": Histogram(0, session_rounds + 1, min(HISTOGRAM_BINS, session_rounds + 1)),
+        "ruined_lengths": RunningStats(),
+        "drawdowns": RunningStats(),
+        "drawdown_histogram": Histogram(0, bankroll, HISTOGRAM_BINS),
+        "final_balances": Histogram(0, 2 * bankroll, HISTOGRAM_BINS),
+    }
+
+
+def merge_state(state: dict, other: dict):
+    '''Add every round and session of other to state.'''
+
+    for key, value in other.items():
+        if isinstance(value, (RunningStats, Histogram)):
+            state[key].merge(value)
+        else:
+            state[key] += value
+
+
+def snapshot(state: dict, elapsed: float) -> dict:
+    '''Return the main statistics of state after elapsed seconds as a
+    dictionary: the rounds and sessions so far, the EV per round with
+    its standard error, the risk of ruin, and the worst drawdown.'''
+
+    outcomes = state["outcomes"]
+
+    return {
+        "rounds": state["rounds"],
+        "sessions": state["sessions"],
+        "ev": outcomes.mean,
+        "ev_standard_error": outcomes.standard_error(),
+        "risk_of_ruin": state["ruined"] / state["sessions"] if state["sessions"] else None,
+        "max_drawdown": state["drawdowns"].maximum if state["drawdowns"].count else None,
+        "seconds": elapsed,
+        "rounds_per_second": state["rounds"] / elapsed if elapsed > 0 else math.inf,
+    }
+
+
+def results(state: dict, elapsed: float) -> dict:
+    '''Return every statistic of state after elapsed seconds as a dictionary.'''
+
+    summary = snapshot(state, elapsed)
+    summary["outcome"] = state["outcomes"].summary()
+    summary["bet"] = state["bets"].summary()
+    summary["ev_per_unit_bet"] = state["outcomes"].mean / state["bets"].mean if state["bets"].count else None
+    summary["session_lengths"] = state["session_lengths"].summary()
+    summary["ruined_session_length"] = state["ruined_lengths"].summary()
+    summary["drawdown"] = state["drawdowns"].summary()
+    summary["drawdown_histogram"] = state["drawdown_histogram"].summary()
+    summary["final_balance"] = state["final_balances"].summary()
+
+    return summary
+
+
+def simulate(
+    rounds: int,
+    rules: dict=None,
+    policy=simulation.simple_policy,
+    bets=None,
+    bankroll: float=main.DEFAULT_BALANCE,
+    session_rounds: int=DEFAULT_SESSION_ROUNDS,
+    seed: int=None,
+    stream: int=0,
+    snapshot_interval: int=DEFAULT_SNAPSHOT_INTERVAL,
+    progress=None
+) -> dict:
+    '''Play rounds rounds in sessions starting with bankroll and lasting at
+    most session_rounds rounds each (see the module docstring), using policy
+    for every decision and the bet policy bets (a flat bet of 10 by default)
+    for every bet, and return the accumulators of the simulation.
+
+    The table deals from the stream numbered stream of seed. If progress
+    is given, it is called with a snapshot (see snapshot) every
+    snapshot_interval rounds. A session still going once every round
+    has been played is not counted as a session.
+    '''
+
+    if rules is None:
+        rules = simulation.rules_from_settings(main.settings)
+
+    if bets is None:
+        bets = bet_policy(10.0)
+
+    state = new_state(bankroll, session_rounds)
+    outcomes = state["outcomes"]
+    bet_stats = state["bets"]
+
+    table = simulation.new_table(rules, seed, bankroll, stream)
+    table_shoe = simulation.policy_shoe(table)
+
+    start = time.perf_counter()
+    played = 0
+
+    while played < rounds:
+        table.balance = bankroll
+        peak = bankroll
+        drawdown = 0.0
+        length = 0
+
+        while played < rounds and length < session_rounds and table.balance >= MINIMUM_BET:
+            bet = min(bets(table.balance, table_shoe), table.balance)
+            outcome = simulation.play_round(table, policy, bet)
+
+            outcomes.add(outcome)
+            bet_stats.add(bet)
+
+            played += 1
+            length += 1
+
+            balance = table.balance
+
+            if balance > peak:
+                peak = balance
+            elif peak - balance > drawdown:
+                drawdown = peak - balance
+
+            if progress is not None and played % snapshot_interval == 0:
+                state["rounds"] = played
+                progress(snapshot(state, time.perf_counter() - start))
+
+        ruined = table.balance < MINIMUM_BET
+
+        if not ruined and length < session_rounds:
+            # The rounds ran out in the middle of the session
+            break
+
+        state["sessions"] += 1
+        state["session_lengths"].add(length)
+        state["drawdowns"].add(drawdown)
+        state["drawdown_histogram"].add(drawdown)
+        state["final_balances"].add(table.balance)
+
+        if ruined:
+            state["ruined"] += 1
+            state["ruined_lengths"].add(length)
+
+    state["rounds"] = played
+    state["seconds"] = time.perf_counter() - start
+
+    return state
+
+
+def _simulate_worker(arguments: tuple) -> dict:
+    '''Run simulate with the tuple of arguments in a worker process.'''
+
+    return simulate(*arguments)
+
+
+def simulate_parallel(
+    rounds: int,
+    rules: dict=None,
+    policy=simulation.simple_policy,
+    bets=None,
+    bankroll: float=main.DEFAULT_BALANCE,
+    session_rounds: int=DEFAULT_SESSION_ROUNDS,
+    seed: int=None,
+    workers: int=None
+) -> dict:
+    '''Shard rounds rounds across a pool of workers processes (every core by
+    default), each dealing from its own stream of seed, and return the merged
+    accumulators in the same form as simulate.
+
+    The policies must be picklable. If seed is None, a random seed is chosen,
+    and it is included in the accumulators as "seed" either way.
+    '''
+
+    if rules is None:
+        rules = simulation.rules_from_settings(main.settings)
+
+    if bets is None:
+        bets = bet_policy(10.0)
+
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+
+    tasks = []
+    for worker in range(workers):
+        worker_rounds = rounds // workers + (1 if worker < rounds % workers else 0)
+        tasks.append((worker_rounds, rules, policy, bets, bankroll, session_rounds, seed, worker, DEFAULT_SNAPSHOT_INTERVAL, None))
+
+    start = time.perf_counter()
+
+    with multiprocessing.Pool(workers) as pool:
+        worker_states = pool.map(_simulate_worker, tasks)
+
+    # Merge in worker order so the floating point sums are always identical
+    state = new_state(bankroll, session_rounds)
+
+    for worker_state in worker_states:
+        del worker_state["seconds"]
+        merge_state(state, worker_state)
+
+    state["seconds"] = time.perf_counter() - start
+    state["seed"] = seed
+    state["workers"] = workers
+
+    return state
+
+
+def print_progress(summary: dict):
+    '''Display a single line of a progress snapshot.'''
+
+    risk = summary["risk_of_ruin"]
+    risk_text = f"{risk * 100:.2f}%" if risk is not None else "-"
+
+    print(
+        f"{summary['rounds']:>14,} rounds  {summary['sessions']:>10,} sessions  "
+        f"EV {summary['ev']:+.4f} ± {summary['ev_standard_error']:.4f}  "
+        f"risk of ruin {risk_text}  {summary['rounds_per_second']:,.0f} rounds/s",
+        file=sys.stderr
+    )
+
+
+def print_results(summary: dict):
+    '''Display the results of a bankroll simulation.'''
+
+    risk = summary["risk_of_ruin"]
+    ruined_length = summary["ruined_session_length"]
+    drawdown = summary["drawdown"]
+
+    print(f"Rounds: {summary['rounds']}")
+    print(f"Sessions: {summary['sessions']}")
+    print(f"EV per round: ${summary['ev']:.4f} ± {summary['ev_standard_error']:.4f}")
+    print(f"Standard deviation per round: ${summary['outcome']['standard_deviation']:.2f}")
+
+    if summary["ev_per_unit_bet"] is not None:
+        print(f"EV per dollar bet: {summary['ev_per_unit_bet'] * 100:+.3f}%")
+
+    print(f"Risk of ruin: {risk * 100:.3f}%" if risk is not None else "Risk of ruin: no complete sessions")
+
+    if ruined_length["count"]:
+        print(f"Rounds until ruin: mean {ruined_length['mean']:.0f}, shortest {ruined_length['minimum']:.0f}")
+
+    if summary["sessions"]:
+        print(f"Max drawdown: ${drawdown['maximum']:.2f} (mean ${drawdown['mean']:.2f} per session)")
+
+    print(f"Elapsed: {summary['seconds']:.2f}s")
+    print(f"Rounds per second: {summary['rounds_per_second']:.0f}")
+
+
+def main_cli():
+    '''Parse the command line arguments, run the bankroll simulation,
+    and display the results and progress snapshots.'''
+
+    parser = argparse.ArgumentParser(description="Simulate a Blackjack bankroll and measure its risk of ruin.")
+    parser.add_argument("--rounds", type=int, default=1000000, help="number of rounds to play")
+    parser.add_argument("--bankroll", type=float, default=main.DEFAULT_BALANCE, help="balance at the start of each session")
+    parser.add_argument("--bet", type=float, default=10.0, help="bet of each round (the unit of a spread)")
+    parser.add_argument("--spread", type=int, default=1, help="bet up to this many units, one per point of true count")
+    parser.add_argument("--session-rounds", type=int, default=DEFAULT_SESSION_ROUNDS, help="rounds after which a session that is not ruined ends")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random number generator")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes (0 for every core)")
+    parser.add_argument("--snapshot-interval", type=int, default=DEFAULT_SNAPSHOT_INTERVAL, help="rounds between progress snapshots (with one worker)")
+    parser.add_argument("--snapshot-file", help="append every progress snapshot to this file as a line of JSON")
+    parser.add_argument("--output", help="write every statistic to this file as JSON")
+    simulation.add_rule_arguments(parser)
+
+    args = parser.parse_args()
+    rules = simulation.rules_from_arguments(args)
+    bets = bet_policy(args.bet, args.spread)
+
+    if args.workers == 1:
+        snapshot_file = open(args.snapshot_file, "a", encoding="utf-8") if args.snapshot_file is not None else None
+
+        def progress(summary: dict):
+            print_progress(summary)
+
+            if snapshot_file is not None:
+                snapshot_file.write(json.dumps(summary) + "\n")
+                snapshot_file.flush()
+
+        try:
+            state = simulate(args.rounds, rules, bets=bets, bankroll=args.bankroll, session_rounds=args.session_rounds, seed=args.seed, snapshot_interval=args.snapshot_interval, progress=progress)
+        finally:
+            if snapshot_file is not None:
+                snapshot_file.close()
+    else:
+        state = simulate_parallel(args.rounds, rules, bets=bets, bankroll=args.bankroll, session_rounds=args.session_rounds, seed=args.seed, workers=args.workers)
+
+        print(f"Workers: {state['workers']} (seed {state['seed']})")
+
+    summary = results(state, state["seconds"])
+    print_results(summary)
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=4)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,397 @@
+'''Benchmark the hot paths of the game, from hand values and card rendering
+to drawing cards, shuffling, and playing complete headless rounds.
+
+Every benchmark is seeded, so it does the same work on every run, and the
+results can be written as JSON and compared with the results of another
+commit to spot regressions:
+
+    python benchmark.py --output before.json
+    python benchmark.py --compare before.json
+'''
+
+
+__author__ = "U Ahsan"
+
+
+import argparse
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import env
+import main
+import models
+import packed
+import simulation
+import strategy
+import util
+
+
+## Constants ##
+DEFAULT_SEED = 2024
+
+DECK_COUNTS = [1, 2, 6, 8, 12]
+
+# The number of hands, cards, or rounds each benchmark works through per run.
+SAMPLE_SIZE = 2000
+
+# The number of tables played in lockstep by the batched round benchmarks,
+# small enough that shuffling their shoes does not dominate a run.
+BATCH_TABLES = 16
+
+
+def random_hands(rng: random.Random, count: int) -> [[str]]:
+    '''Return count random hands of two to six string cards.'''
+
+    hands = []
+
+    for _ in range(count):
+        hand = []
+
+        for _ in range(rng.randint(2, 6)):
+            hand.append(f"{rng.randint(1, 13)}{rng.choice(main.SUITS)}{rng.randint(0, 1)}")
+
+        hands.append(hand)
+
+    return hands
+
+
+def setup_game(rules: dict, seed: int):
+    '''Apply rules to the settings of the game in main.py,
+    seed its random number generator, and shuffle.'''
+
+    for name, setting in main.settings.items():
+        setting["value"] = rules.get(name, setting["default"])
+
+    main.seed_random(seed)
+    main.shuffle_deck()
+
+
+def bench_hand_value(seed: int, scale: float) -> list:
+    '''Return the benchmarks of util.hand_value and packed.hand_value.'''
+
+    rng = random.Random(seed)
+    hands = random_hands(rng, int(SAMPLE_SIZE * scale))
+    packed_hands = [[packed.from_str(card) for card in hand] for hand in hands]
+
+    def run_strings():
+        for hand in hands:
+            util.hand_value(hand)
+
+    def run_packed():
+        for hand in packed_hands:
+            packed.hand_value(hand)
+
+    return [
+        ("util.hand_value", {}, None, run_strings, len(hands)),
+        ("packed.hand_value", {}, None, run_packed, len(hands)),
+    ]
+
+
+def bench_rendering(seed: int, scale: float) -> list:
+    '''Return the benchmarks of util.get_lines and util.print_cards.'''
+
+    rng = random.Random(seed)
+    hands = random_hands(rng, int(SAMPLE_SIZE * scale / 4))
+
+    drawings = []
+    for hand in hands:
+        drawings.append(["\n".join(util.full_glyphs[hand[0]])] + ["\n".join(util.half_glyphs[card]) for card in hand[1:]])
+
+    stream = io.StringIO()
+    renderer = util.FrameRenderer(stream)
+
+    def run_get_lines():
+        for hand_drawings in drawings:
+            util.get_lines(hand_drawings)
+
+    def run_print_cards():
+        previous_renderer = util.renderer
+        util.renderer = renderer
+
+        for hand in hands:
+            util.print_cards(hand)
+            renderer.flush()
+
+        util.renderer = previous_renderer
+        stream.seek(0)
+        stream.truncate()
+
+    return [
+        ("util.get_lines", {}, None, run_get_lines, len(hands)),
+        ("util.print_cards", {}, None, run_print_cards, len(hands)),
+    ]
+
+
+def bench_draw_card(seed: int, scale: float) -> list:
+    '''Return the benchmarks of main.draw_card for every deck count
+    in DECK_COUNTS, with and without a continuous shuffling machine,
+    and in true random mode.'''
+
+    benchmarks = []
+    draws = int(SAMPLE_SIZE * scale * 5)
+
+    def run():
+        for _ in range(draws):
+            main.draw_card()
+
+    for deck_count in DECK_COUNTS:
+        rules = {"deck_count": deck_count, "true_random": False}
+        benchmarks.append(("main.draw_card", rules, lambda rules=rules: setup_game(rules, seed), run, draws))
+
+    # A machine that runs out of cards takes all of them back, like at the end of a round
+    for deck_count in DECK_COUNTS:
+        rules = {"deck_count": deck_count, "true_random": False, "continuous_shuffle": True}
+        benchmarks.append(("main.draw_card", rules, lambda rules=rules: setup_game(rules, seed), run, draws))
+
+    rules = {"true_random": True}
+    benchmarks.append(("main.draw_card", rules, lambda rules=rules: setup_game(rules, seed), run, draws))
+
+    return benchmarks
+
+
+def bench_shuffle_deck(seed: int, scale: float) -> list:
+    '''Return the benchmarks of main.shuffle_deck for every deck count in DECK_COUNTS.'''
+
+    benchmarks = []
+    shuffles = max(1, int(SAMPLE_SIZE * scale / 20))
+
+    def run():
+        for _ in range(shuffles):
+            main.shuffle_deck()
+
+    for deck_count in DECK_COUNTS:
+        rules = {"deck_count": deck_count}
+        benchmarks.append(("main.shuffle_deck", rules, lambda rules=rules: setup_game(rules, seed), run, shuffles))
+
+    return benchmarks
+
+
+def bench_rounds(seed: int, scale: float) -> list:
+    '''Return the benchmarks of complete headless rounds, played one table
+    at a time and in lockstep batches, with both the simple policy and the
+    basic strategy table, which split and double.'''
+
+    rules = simulation.rules_from_settings(main.settings)
+    rounds = int(SAMPLE_SIZE * scale)
+
+    policies = {
+        "simple": simulation.simple_policy,
+        "strategy": strategy.table_policy(strategy.load_table(rules)),
+    }
+
+    benchmarks = []
+
+    def make_run(policy):
+        def run():
+            simulation.simulate(rounds, rules, policy, seed)
+
+        return run
+
+    def make_batch_run(policy):
+        def run():
+            simulation.simulate_batch(rounds, rules, policy, seed, tables=BATCH_TABLES)
+
+        return run
+
+    for name, policy in policies.items():
+        benchmarks.append(("simulation.simulate", {"policy": name}, None, make_run(policy), rounds))
+        benchmarks.append(("simulation.simulate_batch", {"policy": name, "tables": BATCH_TABLES}, None, make_batch_run(policy), rounds))
+
+    return benchmarks
+
+
+def bench_env(seed: int, scale: float) -> list:
+    '''Return the benchmark of env.VectorEnv.step, with every table
+    hitting below 12 and standing otherwise.'''
+
+    rules = simulation.rules_from_settings(main.settings)
+    steps = max(1, int(SAMPLE_SIZE * scale / BATCH_TABLES))
+    vector_env = env.VectorEnv(BATCH_TABLES, rules, seed)
+
+    def run():
+        observations, _ = vector_env.reset()
+
+        for _ in range(steps):
+            actions = ['h' if observation[0] < 12 else 's' for observation in observations]
+            observations, _, _, _ = vector_env.step(actions)
+
+    return [("env.VectorEnv.step", {"tables": BATCH_TABLES}, None, run, steps * BATCH_TABLES)]
+
+
+# Each benchmark group returns a list of (name, parameters, setup, run, operations).
+BENCHMARK_GROUPS = {
+    "hand_value": bench_hand_value,
+    "rendering": bench_rendering,
+    "draw_card": bench_draw_card,
+    "shuffle_deck": bench_shuffle_deck,
+    "rounds": bench_rounds,
+    "env": bench_env,
+}
+
+
+def measure_memory(seed: int, count: int=10000) -> dict:
+    '''Return the memory footprint of a single table with the default rules
+    (see models.table_footprint) and the average memory allocated per hand
+    and per table when count of them are alive at once, in bytes.'''
+
+    rules = simulation.rules_from_settings(main.settings)
+    footprint = models.table_footprint(simulation.new_table(rules, seed))
+
+    tracemalloc.start()
+
+    hands = [simulation.new_hand(10.0, [1, 2]) for _ in range(count)]
+    footprint["allocated_per_hand"] = tracemalloc.get_traced_memory()[0] / count
+    del hands
+
+    start = tracemalloc.get_traced_memory()[0]
+    tables = [simulation.new_table(rules, seed) for _ in range(count // 10)]
+    footprint["allocated_per_table"] = (tracemalloc.get_traced_memory()[0] - start) / len(tables)
+    del tables
+
+    tracemalloc.stop()
+
+    return footprint
+
+
+def measure(setup, run, repeats: int) -> float:
+    '''Call run repeats times, each after calling setup (if it is not None)
+    outside of the timing, and return the fastest time in seconds.'''
+
+    best = float("inf")
+
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def git_commit() -> str:
+    '''Return the hash of the current git commit, or None if it is unavailable.'''
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=sys.path[0] or None
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(groups: [str], seed: int=DEFAULT_SEED, repeats: int=5, scale: float=1.0) -> dict:
+    '''Run every benchmark in groups (names in BENCHMARK_GROUPS) and return
+    the report as a dictionary ready to be written as JSON.'''
+
+    results = []
+
+    for group in groups:
+        for name, parameters, setup, run, operations in BENCHMARK_GROUPS[group](seed, scale):
+            seconds = measure(setup, run, repeats)
+
+            results.append({
+                "group": group,
+                "name": name,
+                "parameters": parameters,
+                "operations": operations,
+                "seconds": seconds,
+                "ns_per_operation": seconds / operations * 1e9,
+                "operations_per_second": operations / seconds if seconds > 0 else None,
+            })
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "repeats": repeats,
+        "scale": scale,
+        "results": results,
+        "memory": measure_memory(seed),
+    }
+
+
+def benchmark_id(result: dict) -> str:
+    '''Return a string identifying the benchmark of result across reports.'''
+
+    return result["name"] + json.dumps(result["parameters"], sort_keys=True)
+
+
+def print_report(report: dict, baseline: dict=None):
+    '''Display the results of report, including the change relative
+    to the matching results in baseline if given.'''
+
+    baseline_results = {}
+
+    if baseline is not None:
+        for result in baseline["results"]:
+            baseline_results[benchmark_id(result)] = result
+
+    for result in report["results"]:
+        label = result["name"]
+
+        if result["parameters"]:
+            label += " " + ", ".join(f"{key}={value}" for key, value in result["parameters"].items())
+
+        line = f"{label:<55}{result['ns_per_operation']:>12.0f} ns/op"
+
+        previous = baseline_results.get(benchmark_id(result))
+        if previous is not None:
+            change = result["ns_per_operation"] / previous["ns_per_operation"] - 1
+            line += f"{change * 100:>+9.1f}%"
+
+        print(line)
+
+    memory = report.get("memory")
+    if memory is not None:
+        print()
+
+        for name, size in memory.items():
+            print(f"{'memory.' + name:<55}{size:>12.0f} bytes")
+
+
+def main_cli():
+    '''Parse the command line arguments, run the benchmarks, and
+    display and optionally save the results.'''
+
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of the Blackjack game.")
+    parser.add_argument("--group", action="append", choices=BENCHMARK_GROUPS.keys(), help="only run this group (repeatable)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="seed of every benchmark")
+    parser.add_argument("--repeats", type=int, default=5, help="runs of each benchmark (the fastest is kept)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier of the amount of work per run")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    parser.add_argument("--compare", help="compare against a JSON report written earlier")
+
+    args = parser.parse_args()
+
+    # Nothing should be displayed by the game while benchmarking
+    util.set_renderer(util.NullRenderer())
+
+    report = run_benchmarks(args.group or list(BENCHMARK_GROUPS.keys()), args.seed, args.repeats, args.scale)
+
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    print_report(report, baseline)
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=4)
+
+
+if __name__ == "__main__":
+    main_cli()
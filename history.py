@@ -0,0 +1,225 @@
+'''Contain a compact binary format for the history of played rounds, a
+buffered append-only writer, and a streaming reader.
+
+A history file starts with MAGIC, followed by one record per round:
+
+    RECORD_HEADER   the length of the record in bytes, the shoe position
+                    before the round (NO_POSITION in true random mode),
+                    the balance before the bet, the initial bet, the net
+                    outcome, the rules as bit flags, and the number of
+                    cards, decisions, and final hands
+    cards           every card dealt, in order, as a packed byte
+    decisions       every decision, in order, as a byte (see DECISIONS)
+    hands           every final hand, dealer's first, as its number of
+                    cards followed by its packed cards
+
+A typical round takes around 50 bytes. See simulation.replay_round and
+simulation.audit_history to replay recorded rounds through the game logic.
+'''
+
+
+__author__ = "U Ahsan"
+
+
+import struct
+
+
+## Constants ##
+MAGIC = b"BJH\x01"
+
+RECORD_HEADER = struct.Struct("<HIdddBBBB")
+
+# The shoe position recorded for rounds dealt in true random mode.
+NO_POSITION = 0xFFFFFFFF
+
+DECISIONS = ['h', 's', "sp", 'd', 'f']
+DECISION_CODES = {decision: code for code, decision in enumerate(DECISIONS)}
+
+# The rules recorded as bit flags, in bit order.
+RULE_FLAGS = ["surrendering", "doubling", "splitting", "soft_17_hit", "true_random"]
+
+BUFFER_SIZE = 1 << 20
+
+
+class HistoryError(ValueError):
+    '''Raised when a history file or record is malformed, or when
+    a recorded round does not replay as it was recorded.'''
+
+
+class Record:
+    '''The history of a single round (see the module docstring for its fields).'''
+
+    __slots__ = ("shoe_position", "balance", "initial_bet", "net", "rules", "cards", "decisions", "hands")
+
+    def __init__(self, shoe_position: int, balance: float, initial_bet: float, rules: int):
+        self.shoe_position = shoe_position
+        self.balance = balance
+        self.initial_bet = initial_bet
+        self.net = 0.0
+        self.rules = rules
+        self.cards = []
+        self.decisions = []
+        self.hands = []
+
+
+def rule_flags(rules: dict) -> int:
+    '''Pack the rules in RULE_FLAGS from rules into bit flags.
+
+    >>> rule_flags({"surrendering": False, "doubling": True, "splitting": True, "soft_17_hit": False, "true_random": False})
+    6
+    '''
+
+    flags = 0
+
+    for bit, name in enumerate(RULE_FLAGS):
+        if rules[name] == True:
+            flags |= 1 << bit
+
+    return flags
+
+
+def rules_from_flags(flags: int) -> dict:
+    '''Unpack bit flags packed by rule_flags into a dictionary of rules.'''
+
+    return {name: bool(flags & (1 << bit)) for bit, name in enumerate(RULE_FLAGS)}
+
+
+def encode(record: Record) -> bytes:
+    '''Return record encoded in the binary record format.'''
+
+    body = bytearray(record.cards)
+
+    for decision in record.decisions:
+        body.append(DECISION_CODES[decision])
+
+    for cards in record.hands:
+        body.append(len(cards))
+        body.extend(cards)
+
+    header = RECORD_HEADER.pack(
+        RECORD_HEADER.size + len(body),
+        record.shoe_position,
+        record.balance,
+        record.initial_bet,
+        record.net,
+        record.rules,
+        len(record.cards),
+        len(record.decisions),
+        len(record.hands)
+    )
+
+    return header + body
+
+
+def decode(buffer, offset: int=0) -> (Record, int):
+    '''Decode the record starting at offset in buffer and return
+    it along with the offset of the next record.'''
+
+    length, shoe_position, balance, initial_bet, net, rules, card_count, decision_count, hand_count = RECORD_HEADER.unpack_from(buffer, offset)
+
+    record = Record(shoe_position, balance, initial_bet, rules)
+    record.net = net
+
+    position = offset + RECORD_HEADER.size
+    record.cards = list(buffer[position:position + card_count])
+    position += card_count
+
+    try:
+        record.decisions = [DECISIONS[code] for code in buffer[position:position + decision_count]]
+    except IndexError as error:
+        raise HistoryError(f"Invalid decision code in the record at offset {offset}.") from error
+
+    position += decision_count
+
+    for _ in range(hand_count):
+        count = buffer[position]
+        record.hands.append(list(buffer[position + 1:position + 1 + count]))
+        position += 1 + count
+
+    if position != offset + length:
+        raise HistoryError(f"The record at offset {offset} does not match its length.")
+
+    return record, position
+
+
+class HistoryWriter:
+    '''Append records to the history file at path through a large buffer,
+    so that recording a round rarely costs more than encoding it.
+
+    The file is created with MAGIC if it does not exist. Use the writer
+    as a context manager, or call close, so the buffer is written out.
+    '''
+
+    def __init__(self, path: str, buffer_size: int=BUFFER_SIZE):
+        self.path = path
+        self.records = 0
+        self.file = open(path, "ab", buffering=buffer_size)
+
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        else:
+            with open(path, "rb") as existing:
+                if existing.read(len(MAGIC)) != MAGIC:
+                    self.file.close()
+
+                    raise HistoryError(f"'{path}' is not a history file.")
+
+    def write(self, record: Record):
+        '''Append record to the history file.'''
+
+        self.file.write(encode(record))
+        self.records += 1
+
+    def flush(self):
+        '''Write out every buffered record.'''
+
+        self.file.flush()
+
+    def close(self):
+        '''Write out every buffered record and close the file.'''
+
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception_info):
+        self.close()
+
+
+def read_records(path: str, chunk_size: int=BUFFER_SIZE):
+    '''Yield every record in the history file at path, in order, reading
+    it in chunks of chunk_size bytes so that files of any size can be
+    streamed in constant memory.'''
+
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise HistoryError(f"'{path}' is not a history file.")
+
+        # The bytes of a record that is split across two chunks
+        buffer = b""
+
+        while True:
+            chunk = file.read(chunk_size)
+
+            if not chunk:
+                break
+
+            buffer += chunk
+            offset = 0
+            end = len(buffer)
+
+            while end - offset >= RECORD_HEADER.size:
+                length = buffer[offset] | (buffer[offset + 1] << 8)
+
+                if end - offset < length:
+                    break
+
+                record, offset = decode(buffer, offset)
+
+                yield record
+
+            buffer = buffer[offset:]
+
+        if buffer:
+            raise HistoryError(f"'{path}' ends with a truncated record.")
@@ -0,0 +1,96 @@
+'''Contain the calculations of the live odds panel shown during the user's
+turn: the probability of busting on a hit, the probability of each final
+dealer total, and the EV of every action the user can currently choose.
+
+Everything is computed from the cards the user has not seen: the cards left
+in the shoe plus the dealer's hidden card, which is still unknown to the user.
+In true random mode, every card is drawn from an infinite deck, so the
+panel only depends on the hand, the upcard, and the soft 17 rule.
+
+Each panel has to be ready within a few milliseconds of every card. The
+composition is packed into a signature (see odds.py) in a single pass, the
+dealer's outcomes come from the memoized calculator in odds.py, and every
+finished panel is kept in a small cache with a bounded size, so showing a
+panel again for the same hand and composition (such as after an invalid
+input, or for the second hand of a split) is a single lookup.
+'''
+
+
+__author__ = "U Ahsan"
+
+
+from collections import OrderedDict
+
+import odds
+import strategy
+
+
+## Constants ##
+# The maximum number of panels kept in the cache.
+CACHE_SIZE = 4096
+
+_cache = OrderedDict()
+
+
+def unseen_signature(remaining_cards: [int], hidden_rank: int) -> int:
+    '''Return the composition signature of the cards the user has not seen:
+    remaining_cards (the number of cards left in the shoe of each rank,
+    indexed by rank) and the dealer's hidden card of hidden_rank.'''
+
+    return odds.composition_signature(remaining_cards) + odds.UNITS[min(hidden_rank, 10)]
+
+
+def hand_odds(hard_value: int, has_ace: bool, pair_value: int, upcard_value: int, signature: int, soft_17_hit: bool, choices: [str]) -> dict:
+    '''Return the live odds of a hand of hard_value and has_ace against
+    upcard_value, drawing from the composition signature (or from an infinite
+    deck if signature is None), as a dictionary holding the probability of
+    busting on a hit ("bust"), a dictionary mapping each final dealer total
+    in odds.OUTCOMES to its probability ("dealer"), and a dictionary mapping
+    each action in choices to its EV ("evs") in units of the hand's bet.
+
+    pair_value is the value of the hand's pair if it has two cards of the
+    same rank, and None otherwise. The EVs are those of this hand on its own,
+    playing on optimally after a hit.
+    '''
+
+    key = (hard_value, has_ace, pair_value, upcard_value, signature, soft_17_hit, tuple(choices))
+    panel = _cache.get(key)
+
+    if panel is not None:
+        _cache.move_to_end(key)
+        return panel
+
+    if signature is None:
+        probabilities = odds.INFINITE_PROBABILITIES
+        dealer = odds.INFINITE_DEALER[soft_17_hit][upcard_value]
+    else:
+        total = odds.signature_total(signature)
+        probabilities = [0.0] + [odds.signature_count(signature, value) / total for value in odds.VALUES]
+        dealer = odds.dealer_signature_probabilities(upcard_value, signature, soft_17_hit)
+
+    # An ace only counts as 1 in the hard value, so any card taking it past 21 busts
+    bust = 0.0
+    for value in odds.VALUES:
+        if hard_value + value > 21:
+            bust += probabilities[value]
+
+    evs = strategy.hand_evs(hard_value, has_ace, pair_value if "sp" in choices else None, probabilities, dealer)
+
+    panel = {
+        "bust": bust,
+        "dealer": dict(zip(odds.OUTCOMES, dealer)),
+        "evs": {action: evs[action] for action in choices if action in evs},
+    }
+
+    _cache[key] = panel
+
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+    return panel
+
+
+def clear_cache():
+    '''Remove every panel from the cache.'''
+
+    _cache.clear()
@@ -10,7 +10,15 @@ __author__ = "U Ahsan"
 
 
 import util
-import random
+import shoe
+import packed
+import metrics
+import models
+import history
+import streams
+import argparse
+import importlib
+import sys
 
 
 ## Constants ##
@@ -60,6 +68,23 @@ settings = {
         "max": 12,
         "description": "The number of decks to use when dealing. Each card has an equal weight in the deck.\nInput a number between 1 and 12 (inclusive)."
     },
+    "penetration": {
+        "default": 100,
+        "display_name": "Shoe Penetration (%)",
+        "min": 50,
+        "max": 100,
+        "description": "The percentage of the shoe that is dealt before the cut card is reached and the shoe is reshuffled.\nInput a number between 50 and 100 (inclusive)."
+    },
+    "continuous_shuffle": {
+        "default": False,
+        "display_name": "Continuous Shuffling Machine",
+        "description": "When true, the cards of every round go back into the shoe once the round is over,\nand each card is dealt at random from the cards in the shoe, so it never needs reshuffling.\nWhen true, the 'Shoe Penetration' setting does nothing."
+    },
+    "odds_hud": {
+        "default": False,
+        "display_name": "Live Odds Panel",
+        "description": "When true, shows the chance of busting on a hit, the chance of each dealer total,\nand the expected value of each choice before every decision, from the cards you have not seen."
+    },
     
     # The following dictionaries are used for 
     # display purposes and not true settings
@@ -74,19 +99,40 @@ settings = {
 }
 
 ranks = list(range(1, 14))
-remaining_cards = {}
-remaining_suits = {}
 
+# Every card in a single deck, drawn from uniformly in true random mode.
+deck = [packed.encode(rank, suit) for rank in ranks for suit in SUITS]
+
+# The random number generator dealing and shuffling every card (see seed_random).
+random_stream = streams.RandomStream()
+
+count_system = shoe.DEFAULT_COUNT_SYSTEM
+current_shoe = None
+remaining_cards = []
+remaining_suits = []
 
-def get_int(message: str) -> int:
-    '''Prompt the user with message to enter an integer which is then returned.'''
+# The writer recording the history of every round (see history.py) if 
+# enabled, and the record of the round currently being played.
+history_writer = None
+round_record = None
+
+# The policy deciding every hand in place of prompting the user
+# (see simulation.Policy), or None to prompt the user.
+player_policy = None
+
+
+def get_int(message: str, choices: range=None) -> int:
+    '''Prompt the user with message to enter an integer which is then returned.
+    
+    The choices, if given, are the integers that will be accepted, passed
+    on to the decision source (see util.prompt).'''
     
     while True:
         try:
-            n = int(input(message))
+            n = int(util.prompt(message, choices))
             return n
         except ValueError:
-            print("Invalid input. Please try again.")
+            util.emit("Invalid input. Please try again.")
             
 
 def get_int_range(message: str, min_: int, max_: int) -> int:
@@ -97,12 +143,12 @@ def get_int_range(message: str, min_: int, max_: int) -> int:
     '''
     
     while True:
-        n = get_int(message)
+        n = get_int(message, range(min_, int(max_) + 1))
         
         if min_ <= n <= max_:
             return n
         else:
-            print(f"Input out of range. Try a value from {min_} to {max_} (both inclusive)")
+            util.emit(f"Input out of range. Try a value from {min_} to {max_} (both inclusive)")
 
 
 def get_decision(message: str, choices: [str]) -> str:
@@ -110,24 +156,108 @@ def get_decision(message: str, choices: [str]) -> str:
     the user's decision only if it is present in choices.'''
     
     while True:
-        decision = input(message).lower()
+        decision = util.prompt(message, choices).lower()
         
         if decision in choices:
             return decision
         else:
-            print("Please choose a valid option. Try again.")
+            util.emit("Please choose a valid option. Try again.")
+
+
+def print_odds_hud(hand: models.Hand, dealer_hand: models.Hand, choices: [str]):
+    '''Display the live odds panel (see hud.py) of hand against dealer_hand
+    for choices, drawing from the cards left in the shoe and the dealer's
+    hidden card, or from an infinite deck in true random mode.'''
+    
+    # Imported here since hud.py imports strategy.py, which imports this module
+    import hud
+    
+    with metrics.phase("odds_hud"):
+        if settings["true_random"]["value"] == True:
+            signature = None
+        else:
+            signature = hud.unseen_signature(remaining_cards, util.get_rank(dealer_hand.cards[1]))
+        
+        pair_value = None
+        if hand.card_count == 2 and util.get_rank(hand.cards[0]) == util.get_rank(hand.cards[1]):
+            pair_value = min(util.get_rank(hand.cards[0]), 10)
+        
+        panel = hud.hand_odds(
+            hand.hard_value,
+            hand.ace_count > 0,
+            pair_value,
+            min(util.get_rank(dealer_hand.cards[0]), 10),
+            signature,
+            settings["soft_17_hit"]["value"],
+            choices
+        )
+    
+    util.print_odds_hud(panel)
+
+
+def get_hand_decision(message: str, hand: models.Hand, dealer_hand: models.Hand, choices: [str]) -> str:
+    '''Return the decision from choices for hand against dealer_hand, asking
+    player_policy if it is set, and otherwise prompting the user with message.
+
+    The policy is called exactly like in simulation.play_round: with a copy
+    of hand holding packed cards, the packed upcard of dealer_hand, choices,
+    and the shoe (None in true random mode).
+    '''
+    
+    if player_policy is None:
+        return get_decision(message, choices)
+    
+    policy_hand = models.Hand(hand.bet, [packed.from_str(card) for card in hand.cards])
+    policy_hand.is_split = hand.is_split
+    policy_hand.double_bet = hand.double_bet
+    policy_hand.hard_value = hand.hard_value
+    policy_hand.ace_count = hand.ace_count
+    policy_hand.card_count = hand.card_count
+    
+    policy_shoe = None if settings["true_random"]["value"] == True else current_shoe
+    decision = player_policy(policy_hand, packed.from_str(dealer_hand.cards[0]), choices, policy_shoe)
+    
+    if decision not in choices:
+        raise ValueError(f"The player policy chose {decision!r}, which is not one of {choices}.")
+    
+    util.emit(message + decision)
+    
+    return decision
 
 
 ## Main game functions ##
+def seed_random(seed: int=None):
+    '''Replace random_stream with a new stream seeded with seed (or a random
+    seed), so that a game started with the same seed deals the same cards.'''
+    
+    global random_stream
+    
+    random_stream = streams.RandomStream(seed)
+
+
 def shuffle_deck():
-    '''Reset the remaining_cards and the remaining_suits dictionaries with 
-    their original values to simulate shuffled decks.'''
+    '''Replace current_shoe with a newly shuffled shoe built from the deck_count,
+    penetration, and continuous_shuffle settings and counted with count_system, pointing
+    remaining_cards and remaining_suits at the counts the new shoe keeps
+    up to date.
+    
+    The running count, true count, and ten-density of the shoe can be
+    queried at any time with the functions in shoe.py.'''
+    
+    global current_shoe, remaining_cards, remaining_suits
+    
+    current_shoe = shoe.new_shoe(
+        ranks,
+        SUITS,
+        settings["deck_count"]["value"],
+        settings["penetration"]["value"] / 100,
+        random_stream,
+        count_system,
+        settings["continuous_shuffle"]["value"]
+    )
     
-    for rank in ranks:
-        remaining_cards[rank] = settings["deck_count"]["value"] * len(SUITS)
-        
-        for suit in SUITS:
-            remaining_suits[rank][suit] = settings["deck_count"]["value"]
+    remaining_cards = current_shoe.remaining_cards
+    remaining_suits = current_shoe.remaining_suits
 
 
 def draw_card(hidden: bool=False) -> str:
@@ -137,62 +267,69 @@ def draw_card(hidden: bool=False) -> str:
     and the card's visibility as a 0 or 1. 
     The format is f"{rank}{suit}{is_hidden}".
     For example, an ace of hearts that is visible would be stored as "1h0".
-    '''
     
-    card = ""
+    The shoe deals packed integer cards (see packed.py), which are
+    converted to the string format here for rendering.
+    '''
 
     if settings["true_random"]["value"] == True:
-        rank = random.choice(ranks)
-        suit = random.choice(SUITS)
+        # A single choice from deck picks both the rank and the suit uniformly
+        card = random_stream.choice(deck)
+
+        if metrics.enabled:
+            metrics.count("card_draws")
+            metrics.count("rng_calls")
     else:
-        # Reshuffle the deck if there are no more cards left
-        if sum(remaining_cards.values()) == 0:
-            shuffle_deck()
-        
-        rank = random.choices(list(remaining_cards.keys()), weights=list(remaining_cards.values()))[0]
-        remaining_cards[rank] -= 1
-        
-        available_suits = remaining_suits[rank]
-        suit = random.choices(list(available_suits.keys()), weights=list(available_suits.values()))[0]
-        available_suits[suit] -= 1
+        # The shoe reshuffles itself once the cut card is reached,
+        # or deals a random card if it is a continuous shuffling machine
+        card = shoe.draw(current_shoe)
     
-    card = f"{rank}{suit}"
-    card += "1" if hidden else "0"
+    if round_record is not None:
+        round_record.cards.append(card)
+    
+    if hidden:
+        card |= packed.HIDDEN
 
-    return card
+    return packed.to_str(card)
 
 
-def new_hand(bet: float, cards: [str]) -> dict:   
-    '''Create and return a new hand as a dictionary containing
+def new_hand(bet: float, cards: [str]) -> models.Hand:   
+    '''Create and return a new hand (see models.Hand) containing
     information such as the bet and the cards it contains.
     
+    The hand also keeps running totals of its visible hard value, 
+    its number of aces, and its number of cards, which are updated with
+    util.count_card whenever a card is added, removed, or revealed
+    so that util.hand_values never has to rescan the cards.
+    
     >>> new_hand(10.0, ["1c0", "11s0"])
-    {"bet": 10.0, "cards": ["1c0", "11s0"], "is_split": False, "double_bet": False}
+    Hand(bet=10.0, cards=['1c0', '11s0'], hard_value=11, ace_count=1, card_count=2)
     >>> new_hand(12.0, ["12d1"])
-    {"bet": 12.0, "cards": ["12d1"], "is_split": False, "double_bet": False}
+    Hand(bet=12.0, cards=['12d1'], hard_value=0, ace_count=0, card_count=1)
     '''
     
-    return {
-        "bet": bet,
-        "cards": cards,
-        "is_split": False,
-        "double_bet": False,
-    }
+    hand = models.Hand(bet, cards)
+    
+    for card in cards:
+        util.count_card(hand, card)
+    
+    return hand
 
 
-def hit(hand: dict):
+def hit(hand: models.Hand):
     '''Draw and insert a new card into hand and display the card's rank and symbol.'''
     
     new_card = draw_card()
-    hand["cards"].insert(0, new_card)
+    hand.cards.insert(0, new_card)
+    util.count_card(hand, new_card)
     
     suit_symbol = util.suit_symbols[util.get_suit(new_card)]
     
-    print(f"Drew a {util.get_rank_symbol(util.get_rank(new_card))}{suit_symbol}.")
-    print()
+    util.emit(f"Drew a {util.get_rank_symbol(util.get_rank(new_card))}{suit_symbol}.")
+    util.emit()
 
 
-def split(hand: dict, user_hands: [dict]):
+def split(hand: models.Hand, user_hands: [models.Hand]):
     '''Split hand, their cards, and their bets into two individual hands,
     appending both hands to user_hands.
     
@@ -200,20 +337,21 @@ def split(hand: dict, user_hands: [dict]):
     cards.
     '''
     
-    second_card = hand["cards"].pop()
-    hand["bet"] /= 2
-    hand["is_split"] = True
+    second_card = hand.cards.pop()
+    util.count_card(hand, second_card, -1)
+    hand.bet /= 2
+    hand.is_split = True
 
-    split_hand = new_hand(hand["bet"], [second_card])
-    split_hand["is_split"] = True
+    split_hand = new_hand(hand.bet, [second_card])
+    split_hand.is_split = True
     user_hands.append(split_hand)
     
-    print("You have split your hands.")
-    print(f"You now have {len(user_hands)} hands.")
-    print()
+    util.emit("You have split your hands.")
+    util.emit(f"You now have {len(user_hands)} hands.")
+    util.emit()
 
 
-def play_user(user_hands: [dict], dealer_hand: dict, initial_bet: float) -> dict:    
+def play_user(user_hands: [models.Hand], dealer_hand: models.Hand, initial_bet: float) -> models.TurnState:    
     '''Manage the player's turn, return the turn_state, 
     comparing their hand(s) to the dealer_hand and allowing them to hit, 
     stand, split, double the initial_bet, or even forfeit 
@@ -223,40 +361,42 @@ def play_user(user_hands: [dict], dealer_hand: dict, initial_bet: float) -> dict
     
     # The final state of the user's turn describing 
     # some of the outcomes of the game
-    turn_state = {
-        "forfeited": False,
-        "busted": False,
-        "doubled": False,
-    }
+    turn_state = models.TurnState()
     
     # Use a while loop since the length of hands can change
     # in the middle of the game by splitting hands.
     i = 0
-    while (not turn_state["forfeited"]) and (not turn_state["busted"]) and i < len(user_hands):
+    while (not turn_state.forfeited) and (not turn_state.busted) and i < len(user_hands):
         hand_complete = False
         turn = 0
         hand = user_hands[i]
         
-        while (not hand_complete) and (not turn_state["forfeited"]):
+        while (not hand_complete) and (not turn_state.forfeited):
             turn += 1
             
             hand_count_ratio = f"{i+1}/{len(user_hands)}"
             util.print_hands(dealer_hand, hand, hand_count_ratio)
             
-            if hand["is_split"] == True or hand["double_bet"] == True:
-                print()
+            if hand.is_split == True or hand.double_bet == True:
+                util.emit()
                 util.await_continue("[press enter to draw your final card...]")
                     
                 hit(hand)
                 
                 util.print_hands(dealer_hand, hand, hand_count_ratio)
                 
-                if hand["is_split"]:
+                if hand.is_split:
                     # We only provide the option to split if the first and
                     # second cards in the hand have the same rank
-                    if util.get_rank(hand["cards"][0]) == util.get_rank(hand["cards"][1]):
-                        print("Would you like to:\n  (sp)lit\n  (s)tand")
-                        decision = get_decision("> ", ['s', "sp"])
+                    if util.get_rank(hand.cards[0]) == util.get_rank(hand.cards[1]):
+                        if settings["odds_hud"]["value"] == True:
+                            print_odds_hud(hand, dealer_hand, ['s', "sp"])
+                        
+                        util.emit("Would you like to:\n  (sp)lit\n  (s)tand")
+                        decision = get_hand_decision("> ", hand, dealer_hand, ['s', "sp"])
+                        
+                        if round_record is not None:
+                            round_record.decisions.append(decision)
                         
                         if decision == "sp":
                             split(hand, user_hands)
@@ -267,10 +407,10 @@ def play_user(user_hands: [dict], dealer_hand: dict, initial_bet: float) -> dict
                             # over to the next loop, allowing the user to draw one final card.
                             continue
                     else:
-                        print()
+                        util.emit()
                         util.await_continue("[press enter to complete this hand...]")
                 else:
-                    print()
+                    util.emit()
                     util.await_continue("[press enter to end your turn...]")
 
                 # Mark the hand as complete if the user does has received a second card.
@@ -283,7 +423,7 @@ def play_user(user_hands: [dict], dealer_hand: dict, initial_bet: float) -> dict
                     # Allow each of the following decisions if they are enabled
                     # in the settings and the hand state is proper.
                     
-                    if settings["splitting"]["value"] == True and util.get_rank(hand["cards"][0]) == util.get_rank(hand["cards"][1]):
+                    if settings["splitting"]["value"] == True and util.get_rank(hand.cards[0]) == util.get_rank(hand.cards[1]):
                         choices_display += "\n  (sp)lit hands"
                         choices.append("sp")
                     
@@ -295,37 +435,43 @@ def play_user(user_hands: [dict], dealer_hand: dict, initial_bet: float) -> dict
                         choices_display += "\n  (f)orfeit"
                         choices.append('f')
                 
-                print(f"Would you like to:\n{choices_display}")
-                decision = get_decision("> ", choices)
+                if settings["odds_hud"]["value"] == True:
+                    print_odds_hud(hand, dealer_hand, choices)
+                
+                util.emit(f"Would you like to:\n{choices_display}")
+                decision = get_hand_decision("> ", hand, dealer_hand, choices)
+                
+                if round_record is not None:
+                    round_record.decisions.append(decision)
                 
                 if decision == 's':
-                    print("You've chosen to stand.")
+                    util.emit("You've chosen to stand.")
                     hand_complete = True
 
                 elif decision == 'h':
                     hit(hand)
                     
                 elif decision == 'd':
-                    current_balance -= hand["bet"]
-                    hand["bet"] *= 2
-                    hand["double_bet"] = True
-                    turn_state["doubled"] = True
-                    print(f"You've doubled your bet to a total bet of ${hand['bet']:.2f}.")
-                    print(f"Your current balance: {current_balance:.2f}")
+                    current_balance -= hand.bet
+                    hand.bet *= 2
+                    hand.double_bet = True
+                    turn_state.doubled = True
+                    util.emit(f"You've doubled your bet to a total bet of ${hand.bet:.2f}.")
+                    util.emit(f"Your current balance: {current_balance:.2f}")
                     
                 elif decision == 'sp':
                     split(hand, user_hands)
                 
                 elif decision == 'f':
-                    print(f"You've forfeited and have been returned ${initial_bet / 2} (half of your initial bet).")
+                    util.emit(f"You've forfeited and have been returned ${initial_bet / 2} (half of your initial bet).")
                     current_balance += initial_bet / 2
 
                     hand_complete = True
-                    turn_state["forfeited"] = True
+                    turn_state.forfeited = True
                 
-            if min(util.hand_value(hand["cards"])) > 21:
-                print("You have busted!")
-                turn_state["busted"] = True
+            if min(util.hand_values(hand)) > 21:
+                util.emit("You have busted!")
+                turn_state.busted = True
                 hand_complete = True
                 
         i += 1
@@ -333,22 +479,27 @@ def play_user(user_hands: [dict], dealer_hand: dict, initial_bet: float) -> dict
     return turn_state
 
 
-def reveal_hidden_card(dealer_hand: dict):
+def reveal_hidden_card(dealer_hand: models.Hand):
     '''Reveal the hidden dealer's hidden card by changing the last character
     of the dealer_hand's second card to a 0 instead of a 1, indicating 
     that the card is now visible.'''
     
-    second_card = dealer_hand["cards"][1]
+    second_card = dealer_hand.cards[1]
+    revealed_card = second_card[:-1] + "0"
+    
+    dealer_hand.cards[1] = revealed_card
     
-    dealer_hand["cards"][1] = dealer_hand["cards"][1][:-1] + "0"
+    # Swap the hidden card's totals for the revealed card's totals
+    util.count_card(dealer_hand, second_card, -1)
+    util.count_card(dealer_hand, revealed_card)
 
     suit_symbol = util.suit_symbols[util.get_suit(second_card)]
     
-    print()
-    print(f"The dealer's hidden card was a {util.get_rank_symbol(util.get_rank(second_card))}{suit_symbol}!")
+    util.emit()
+    util.emit(f"The dealer's hidden card was a {util.get_rank_symbol(util.get_rank(second_card))}{suit_symbol}!")
 
 
-def play_dealer(dealer_hand: dict, user_hands: [dict]):
+def play_dealer(dealer_hand: models.Hand, user_hands: [models.Hand]):
     '''Simulate the dealer's turn by displaying the hidden card, drawing until the
     dealer_hand's overall value is greater than or equal to a hard 17, 
     and displaying the state of the each of the user_hands and the dealer_hand.'''
@@ -356,21 +507,16 @@ def play_dealer(dealer_hand: dict, user_hands: [dict]):
     reveal_hidden_card(dealer_hand)
     util.print_hands_all(dealer_hand, user_hands)
 
-    dealer_value = util.hand_value(dealer_hand["cards"])
-
-    # The dealer only hits if their soft value is less than
-    # or equalled to 17 AND soft_17_hit is enabled in settings. 
-    # The dealer must stand for any value higher than 17, 
-    # whether it is soft or hard.
-    # If the soft_17_hit setting is disabled, the dealer will only
-    # hit if the soft value is less than 17.
-    while (settings["soft_17_hit"]["value"] == True and min(dealer_value) < 17 and max(dealer_value) < 18) \
-            or (settings["soft_17_hit"]["value"] == False and max(dealer_value) < 17):
-        print()
+    dealer_value = util.hand_values(dealer_hand)
+
+    # The dealer keeps drawing until util.dealer_should_hit says
+    # otherwise, taking the soft_17_hit setting into account.
+    while util.dealer_should_hit(dealer_value, settings["soft_17_hit"]["value"]):
+        util.emit()
         util.await_continue()
         hit(dealer_hand)
         util.print_hands_all(dealer_hand, user_hands)
-        dealer_value = util.hand_value(dealer_hand["cards"])
+        dealer_value = util.hand_values(dealer_hand)
 
 
 def tutorial():
@@ -379,7 +525,7 @@ def tutorial():
     
     util.print_yield("Welcome to BLACKJACK!")
 
-    print("Game:")
+    util.emit("Game:")
     util.print_yield("  Here is how to play:")
     util.print_yield("  You bet a specific amount before the game begins.")
     util.print_yield("  The objective of the game is simple: get as close to a hand value of 21 as possible WITHOUT going over.")
@@ -387,17 +533,17 @@ def tutorial():
     util.print_yield("  You are playing against the dealer, who has the same objective.")
     util.print_yield("  If the dealer goes over 21, you win!")
     
-    print("\nYou:")
+    util.emit("\nYou:")
     util.await_continue("  What happens if neither of us go over 21? [press enter to continue...]")
 
-    print("\nGame:")
+    util.emit("\nGame:")
     util.print_yield("  Glad you asked!")
     util.print_yield("  The player that has a closer hand value to 21 wins!")
 
-    print("\nYou:")
+    util.emit("\nYou:")
     util.await_continue("  Wow! I'm so excited to play! What are the controls of the game? [press enter to continue...]")
 
-    print("\nGame:")
+    util.emit("\nGame:")
     util.print_yield("  There are two primary controls:")
     util.print_yield("    (h)it - You choose to pick up a new card.")
     util.print_yield("      You can choose to hit for as long as you wish or until you go over 21.")
@@ -407,10 +553,10 @@ def tutorial():
     util.print_yield("  Assuming you havent busted, once the dealer completes dealing for themself, you have results of the game!")
     util.print_yield("  If you win, you get twice what you bet. If you lose, you lose everything you bet.")
     
-    print("\nYou:")
+    util.emit("\nYou:")
     util.await_continue("  Nice! Seems intuitive. Are there any other things I should be aware of? [press enter to continue...]")
 
-    print("\nGame:")
+    util.emit("\nGame:")
     util.print_yield("  Yes, there are two more controls that are only available at specific circumstances:")
     util.print_yield("    (d)ouble - Double your bet (therefore doubling your return if you win).")
     util.print_yield("      You can only draw one more card; this will be your final card.")
@@ -421,113 +567,156 @@ def tutorial():
     util.print_yield("      You can only draw one more card per hand before that hand is complete.")
     util.print_yield("      Only available when you have only two cards and they are of the same *rank* (not same value).")
 
-    print("\nYou:")
+    util.emit("\nYou:")
     util.await_continue("  Great! Let's start the game! [press enter to start a game...]")
 
-    print("Game:")
+    util.emit("Game:")
     util.print_yield("  Great! Let's begin.")
 
     start_game()
 
 
+def new_round_record(initial_bet: float) -> history.Record:
+    '''Create and return the history record of a round with initial_bet
+    about to be dealt, before the bet is taken from the balance.'''
+    
+    if settings["true_random"]["value"] == True:
+        shoe_position = history.NO_POSITION
+    else:
+        shoe_position = current_shoe.cursor
+    
+    rules = {name: settings[name]["value"] for name in history.RULE_FLAGS}
+    
+    return history.Record(shoe_position, current_balance, initial_bet, history.rule_flags(rules))
+
+
+def write_round_record(net: float, dealer_hand: models.Hand, user_hands: [models.Hand]):
+    '''Complete the record of the current round with its net outcome
+    and final hands, and write it to the history.'''
+    
+    global round_record
+    
+    round_record.net = net
+    
+    for hand in [dealer_hand] + user_hands:
+        round_record.hands.append([packed.from_str(card) for card in hand.cards])
+    
+    history_writer.write(round_record)
+    round_record = None
+
+
 def start_game():
     '''Commence the main game, handle betting, user's turn, dealer's turn, and display
     the results of the game.'''
 
-    global current_balance
+    global current_balance, round_record
 
     if current_balance <= 0:
-        print()
-        print("You have no money left.")
-        print("Please choose 'Restart game' in the main menu to reset your balance.")
+        util.emit()
+        util.emit("You have no money left.")
+        util.emit("Please choose 'Restart game' in the main menu to reset your balance.")
 
         return
     
     util.print_title("GAME")
 
-    print(f"Balance: ${current_balance:.2f}")
-    print("Enter an integer dollar amount to bet: ")
-    initial_bet = get_int_range("> $", 1, current_balance) * 1.0
-    total_bet = initial_bet
-    current_balance -= initial_bet
-    print(f"Your bet: ${initial_bet}")
-    print()
-    
-    util.print_yield("Dealing cards...", 1)
-    
-    # Since the user can have multiple hands by splitting,
-    # we will have a list that contains all of them.
-    user_hands = []
+    with metrics.phase("betting"):
+        util.emit(f"Balance: ${current_balance:.2f}")
+        util.emit("Enter an integer dollar amount to bet: ")
+        initial_bet = get_int_range("> $", 1, current_balance) * 1.0
+        total_bet = initial_bet
+        
+        if history_writer is not None:
+            round_record = new_round_record(initial_bet)
+        
+        current_balance -= initial_bet
+        util.emit(f"Your bet: ${initial_bet}")
+        util.emit()
     
-    # Create the initial user and dealer hands
-    user_hands.append(
-        new_hand(initial_bet, [draw_card(), draw_card()])
-    )
-    dealer_hand = new_hand(0, [draw_card(), draw_card(True)])
+    with metrics.phase("initial_deal"):
+        util.print_yield("Dealing cards...", 1)
+        
+        # Since the user can have multiple hands by splitting,
+        # we will have a list that contains all of them.
+        user_hands = []
+        
+        # Create the initial user and dealer hands
+        user_hands.append(
+            new_hand(initial_bet, [draw_card(), draw_card()])
+        )
+        dealer_hand = new_hand(0, [draw_card(), draw_card(True)])
     
     # The user_result variable contains information regarding whether
     # the user doubled, forefitted, or busted during their turn. 
-    user_result = play_user(user_hands, dealer_hand, initial_bet)
-    print()
+    with metrics.phase("play_user"):
+        user_result = play_user(user_hands, dealer_hand, initial_bet)
+    util.emit()
     
-    if user_result["doubled"]:
+    if user_result.doubled:
         total_bet *= 2
     
-    if user_result["busted"] or user_result["forfeited"]:
+    if user_result.busted or user_result.forfeited:
         reveal_hidden_card(dealer_hand)
 
         util.print_title("GAME OVER")
         
-        print("Final hands:")
-        print()
+        util.emit("Final hands:")
+        util.emit()
         util.print_hands_all(dealer_hand, user_hands, True)
 
         lost_bet = total_bet
         
-        if user_result["forfeited"] == True:
+        if user_result.forfeited == True:
             lost_bet /= 2.0
 
-        print(f"Lost bet: {lost_bet:.2f}")
+        util.emit(f"Lost bet: {lost_bet:.2f}")
+        
+        total_outcome = -lost_bet
     else:
-        print("Your turn is complete. Dealer will deal now.\n")
+        util.emit("Your turn is complete. Dealer will deal now.\n")
         util.await_continue()
         
-        play_dealer(dealer_hand, user_hands)
-        dealer_values = util.hand_value(dealer_hand["cards"])
+        with metrics.phase("play_dealer"):
+            play_dealer(dealer_hand, user_hands)
         
-        # Calculate the user's profit from this game
-        profit = 0
-        for hand in user_hands:
-            user_values = util.hand_value(hand["cards"])
+        with metrics.phase("settlement"):
+            dealer_values = util.hand_values(dealer_hand)
             
-            if min(user_values) <= 21:
-                if max(user_values) == max(dealer_values):
-                    profit += hand["bet"]
-                elif max(dealer_values) > 21 or max(user_values) > max(dealer_values):
-                    profit += (hand["bet"] * 2)
-        
-        total_outcome = profit - total_bet
-        
-        # Store the sign of total_outcome so we can position
-        # it before the dollar sign in the output.
-        sign = "" if total_outcome >= 0 else "-"
-        
-        current_balance += profit
+            # Calculate the user's profit from this game
+            profit = 0
+            for hand in user_hands:
+                user_values = util.hand_values(hand)
+                profit += util.hand_return(user_values, dealer_values, hand.bet)
+            
+            total_outcome = profit - total_bet
+            
+            # Store the sign of total_outcome so we can position
+            # it before the dollar sign in the output.
+            sign = "" if total_outcome >= 0 else "-"
+            
+            current_balance += profit
 
         util.print_title("GAME OVER")
 
-        print("Final hands:")
-        print()
+        util.emit("Final hands:")
+        util.emit()
         util.print_hands_all(dealer_hand, user_hands, True)
         
-        print()
-        print("Results:")
-        print(f"  Return: ${profit:.2f}")
-        print(f"  Total bet: -${total_bet:.2f}")
-        print(f"  Total earnings: {sign}${abs(total_outcome):.2f}")
+        util.emit()
+        util.emit("Results:")
+        util.emit(f"  Return: ${profit:.2f}")
+        util.emit(f"  Total bet: -${total_bet:.2f}")
+        util.emit(f"  Total earnings: {sign}${abs(total_outcome):.2f}")
+    
+    if round_record is not None:
+        write_round_record(total_outcome, dealer_hand, user_hands)
+    
+    # A continuous shuffling machine takes back the cards of the round
+    if current_shoe.continuous:
+        shoe.return_cards(current_shoe)
     
     util.print_title("GAME OVER")
-    print()
+    util.emit()
 
 
 ## Settings functions ##
@@ -539,7 +728,7 @@ def reset_settings():
 
     shuffle_deck()
     
-    print("Reset all settings to default value.")
+    util.emit("Reset all settings to default value.")
 
 
 def change_setting(setting: dict):
@@ -547,11 +736,11 @@ def change_setting(setting: dict):
     as the current value of the setting, instructions on how to change the setting's value,
     and also handle updating the setting.'''
     
-    print(f"\nCurrent value: {setting['value']}")
+    util.emit(f"\nCurrent value: {setting['value']}")
             
     # Retrieve a new value depending on the type of setting.
     if type(setting["value"]) is bool:
-        print("Type 0 for False and 1 for True.")
+        util.emit("Type 0 for False and 1 for True.")
         
         new = get_int_range("New value: ", 0, 1)
         
@@ -564,20 +753,20 @@ def change_setting(setting: dict):
         if "min" in setting.keys():
             _min = setting["min"]
             _max = setting["max"]
-            print(f"Enter an integer from {_min} to {_max} (inclusive)")
+            util.emit(f"Enter an integer from {_min} to {_max} (inclusive)")
 
             new = get_int_range("New value: ", _min, _max)            
         else:
-            print("Enter an integer")
+            util.emit("Enter an integer")
             
             new = get_int("New value: ")
 
     setting["value"] = new
-    print(f"Setting updated to: {new}")
+    util.emit(f"Setting updated to: {new}")
 
-    # Reshuffle the deck if we've changed the
-    # deck count
-    if setting["display_name"] == settings["deck_count"]["display_name"]:
+    # Rebuild the shoe if we've changed the deck
+    # count, the penetration, or the shuffling machine
+    if setting is settings["deck_count"] or setting is settings["penetration"] or setting is settings["continuous_shuffle"]:
         shuffle_deck()
 
 
@@ -593,7 +782,7 @@ def toggle_settings():
         # Second last option (reset settings).
         if selection == len(settings) - 1:
             reset_settings()
-            print()
+            util.emit()
             util.await_continue("[press enter to return to settings menu...]")
             continue
 
@@ -604,19 +793,19 @@ def toggle_settings():
         # Find the zero-indexed position of the selected setting.
         setting = list(settings.values())[selection - 1]
         
-        print("\nWould you like to:\n  (c)hange the setting\n  (r)ead the description\n  (g)o back")
+        util.emit("\nWould you like to:\n  (c)hange the setting\n  (r)ead the description\n  (g)o back")
         decision = get_decision("> ", ['c', 'r', 'g'])
        
         if decision == 'c':
             change_setting(setting)
             
         elif decision == 'r':
-            print(f"\n{setting['display_name']}:\n{setting['description']}")
+            util.emit(f"\n{setting['display_name']}:\n{setting['description']}")
         
         elif decision == 'g':
             continue
         
-        print()
+        util.emit()
         util.await_continue("[press enter to return to settings menu...]")
 
 
@@ -626,9 +815,9 @@ def restart_game():
 
     global current_balance
     
-    print()
-    print("Are you sure you want to restart game? This will reset your balance!")
-    print("(y)es/(n)o")
+    util.emit()
+    util.emit("Are you sure you want to restart game? This will reset your balance!")
+    util.emit("(y)es/(n)o")
     decision = get_decision("> ", ['y', 'n'])
     
     if decision == 'y':
@@ -647,17 +836,6 @@ def main():
     for setting in settings.values():
         setting["value"] = setting["default"]
     
-    # Add a key for each rank in remaining_suits, storing a dictionary
-    # of suits as keys and the corresponding remaining cards of that 
-    # rank and suit as values
-    for rank in ranks:
-        available_suits = {}
-        
-        for suit in SUITS:
-            available_suits[suit] = 0
-        
-        remaining_suits[rank] = available_suits
-
     # Shuffle the deck at least once at program initialization
     shuffle_deck()
 
@@ -674,16 +852,87 @@ def main():
         elif decision == 2:
             toggle_settings()
         elif decision == 3:
-            print(f"\nYour balance is ${current_balance:.2f}")
+            util.emit(f"\nYour balance is ${current_balance:.2f}")
         elif decision == 4:
             restart_game()
         elif decision == 5:
             tutorial()
         elif decision == 6:
             util.print_goodbye()
+            util.flush()
             
             break
+
+
+def load_policy(path: str):
+    '''Import and return the callable at path, given as "module:function".'''
+    
+    module_name, _, function_name = path.partition(":")
+    
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def configure(arguments: [str]=None):
+    '''Parse the command line arguments (or arguments, if given) and
+    configure how the game displays its output and where
+    its decisions come from accordingly.'''
+    
+    global history_writer, count_system, player_policy
+    
+    parser = argparse.ArgumentParser(description="Play Blackjack in the terminal.")
+    parser.add_argument(
+        "--renderer",
+        choices=util.RENDERERS.keys(),
+        default="console",
+        help="console prints every line immediately, frame writes each screen at once, and null displays nothing"
+    )
+    
+    parser.add_argument("--metrics-file", help="periodically write instrumentation to this file in the Prometheus text format")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between writes of the metrics file")
+    parser.add_argument("--history", help="append the record of every round to this history file")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the random number generator dealing every card")
+    parser.add_argument("--count-system", choices=shoe.COUNT_SYSTEMS.keys(), default=shoe.DEFAULT_COUNT_SYSTEM, help="card counting system of the running count kept by the shoe")
+    
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--script", help="read every answer, one per line, from this file (or - for a pipe on standard input)")
+    source.add_argument("--policy", help="ask this callable, given as module:function, for every answer with (message, choices)")
+    parser.add_argument("--player-policy", help="play every hand with this policy, given as module:function (such as simulation:simple_policy), instead of prompting")
+    parser.add_argument("--no-wait", action="store_true", help="skip every pause and every 'press enter' prompt")
+    
+    args = parser.parse_args(arguments)
+    
+    util.set_renderer(util.RENDERERS[args.renderer]())
+    util.set_no_wait(args.no_wait)
+    count_system = args.count_system
+    seed_random(args.seed)
+    
+    if args.script == "-":
+        util.set_decision_source(util.ScriptSource(sys.stdin))
+    elif args.script is not None:
+        util.set_decision_source(util.ScriptSource(open(args.script, encoding="utf-8")))
+    elif args.policy is not None:
+        util.set_decision_source(util.PolicySource(load_policy(args.policy)))
+    
+    if args.player_policy is not None:
+        player_policy = load_policy(args.player_policy)
+    
+    if args.metrics_file is not None:
+        metrics.start_exporter(args.metrics_file, args.metrics_interval)
+    
+    if args.history is not None:
+        history_writer = history.HistoryWriter(args.history)
         
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    configure()
+    
+    try:
+        main()
+    except EOFError:
+        # The script or pipe ran out of answers
+        util.flush()
+    
+    metrics.stop_exporter()
+    
+    if history_writer is not None:
+        history_writer.close()
@@ -0,0 +1,254 @@
+'''Contain optional instrumentation for the hot paths of the game: the wall
+time spent in each phase of a game (betting, the initial deal, the user's
+turn, the dealer's turn, settlement, rendering, and the live odds panel)
+and counters of card draws, reshuffles, hand value calculations, and random
+number generator calls.
+
+Instrumentation is disabled by default. Every instrumented call site checks
+the module-level enabled flag before doing anything else, so the overhead
+while disabled is a single attribute lookup.
+
+The collected values can be read with snapshot, rendered in the Prometheus
+text format with render_prometheus, and periodically written to a local
+file with start_exporter.
+'''
+
+
+__author__ = "U Ahsan"
+
+
+import functools
+import os
+import threading
+import time
+
+
+## Constants ##
+PREFIX = "blackjack"
+
+COUNTERS = {
+    "card_draws": "Cards drawn from a shoe or at random.",
+    "reshuffles": "Shoes shuffled, including when a new shoe is built.",
+    "hand_value_calls": "Hand values calculated or read from running totals.",
+    "rng_calls": "Random numbers requested from a random number generator.",
+}
+
+PHASES = ["betting", "initial_deal", "play_user", "play_dealer", "settlement", "rendering", "odds_hud"]
+
+## Global Variables ##
+enabled = False
+
+counters = {name: 0 for name in COUNTERS}
+
+# The total seconds spent in, and the number of times
+# entering, each phase. Phases may be nested.
+phase_seconds = {name: 0.0 for name in PHASES}
+phase_calls = {name: 0 for name in PHASES}
+
+_exporter = None
+
+
+def enable():
+    '''Start collecting instrumentation.'''
+
+    global enabled
+
+    enabled = True
+
+
+def disable():
+    '''Stop collecting instrumentation. The values collected so far are kept.'''
+
+    global enabled
+
+    enabled = False
+
+
+def reset():
+    '''Set every counter and phase timer back to zero.'''
+
+    for name in counters:
+        counters[name] = 0
+
+    for name in phase_seconds:
+        phase_seconds[name] = 0.0
+        phase_calls[name] = 0
+
+
+def count(name: str, amount: int=1):
+    '''Add amount to the counter name.
+
+    Call sites on hot paths should check enabled first, so that nothing
+    but the check happens while instrumentation is disabled.
+    '''
+
+    counters[name] += amount
+
+
+class _Phase:
+    '''Context manager adding the wall time spent inside
+    it to the timer of a phase.'''
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *exception_info):
+        phase_seconds[self.name] += time.perf_counter() - self.start
+        phase_calls[self.name] += 1
+
+
+class _NullPhase:
+    '''Context manager that does nothing, used while instrumentation is disabled.'''
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception_info):
+        pass
+
+
+_null_phase = _NullPhase()
+
+
+def _check_phase(name: str):
+    '''Raise ValueError if name is not one of PHASES, so that a misnamed phase
+    is caught where it is used, whether or not instrumentation is enabled.'''
+
+    if name not in phase_seconds:
+        raise ValueError(f"Unknown phase {name!r}. Add it to metrics.PHASES first.")
+
+
+def phase(name: str):
+    '''Return a context manager timing the code inside it as the phase name,
+    which must be one of PHASES.
+
+    >>> with phase("play_dealer"):  # doctest: +SKIP
+    ...     play_dealer(dealer_hand, user_hands)
+    '''
+
+    _check_phase(name)
+
+    if enabled:
+        return _Phase(name)
+
+    return _null_phase
+
+
+def timed(name: str):
+    '''Return a decorator timing every call of the decorated
+    function as the phase name, which must be one of PHASES.'''
+
+    _check_phase(name)
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+
+            with _Phase(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def snapshot() -> dict:
+    '''Return a copy of every counter and phase timer as a dictionary.'''
+
+    return {
+        "counters": dict(counters),
+        "phase_seconds": dict(phase_seconds),
+        "phase_calls": dict(phase_calls),
+    }
+
+
+def render_prometheus() -> str:
+    '''Return every counter and phase timer in the Prometheus text exposition format.'''
+
+    values = snapshot()
+    lines = []
+
+    for name, description in COUNTERS.items():
+        metric = f"{PREFIX}_{name}_total"
+
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {values['counters'][name]}")
+
+    for key, description in (("phase_seconds", "Wall time spent in each phase of a game."), ("phase_calls", "Times each phase of a game was entered.")):
+        metric = f"{PREFIX}_{key}_total"
+
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} counter")
+
+        for name in PHASES:
+            lines.append(f'{metric}{{phase="{name}"}} {values[key][name]}')
+
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str):
+    '''Write every counter and phase timer to the file at path in the
+    Prometheus text format, replacing it atomically so that a reader
+    never sees a partial file.'''
+
+    temporary_path = path + ".tmp"
+
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        file.write(render_prometheus())
+
+    os.replace(temporary_path, path)
+
+
+def _export_loop(path: str, interval: float, stopped: threading.Event):
+    '''Write the metrics to path every interval seconds until stopped is set,
+    then write them one final time.'''
+
+    while not stopped.wait(interval):
+        write_prometheus(path)
+
+    write_prometheus(path)
+
+
+def start_exporter(path: str, interval: float=10.0):
+    '''Enable instrumentation and start a background thread writing the
+    metrics to the file at path every interval seconds.'''
+
+    global _exporter
+
+    stop_exporter()
+    enable()
+
+    stopped = threading.Event()
+    thread = threading.Thread(target=_export_loop, args=(path, interval, stopped), daemon=True)
+    thread.start()
+
+    _exporter = (thread, stopped)
+
+
+def stop_exporter():
+    '''Stop the background exporter thread, if there is one,
+    after it writes the metrics one final time.'''
+
+    global _exporter
+
+    if _exporter is None:
+        return
+
+    thread, stopped = _exporter
+    stopped.set()
+    thread.join()
+
+    _exporter = None
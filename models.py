@@ -0,0 +1,158 @@
+'''Contain the slotted types holding the state of the game: a Hand, the
+TurnState of a user's turn, a Shoe, and a Table.
+
+Each type declares __slots__, so its instances have no per-instance
+dictionary and store their attributes in fixed slots. This makes them
+several times smaller than the equivalent dictionaries, which matters
+once many tables are hosted at once or millions of hands are kept in
+memory. The cards of a shoe and its remaining card counts are kept in
+arrays and flat lists instead of lists of objects and nested dictionaries.
+
+deep_size and table_footprint measure the memory used by a table or by any
+of these objects.
+'''
+
+
+__author__ = "U Ahsan"
+
+
+import array
+import math
+import sys
+
+
+## Constants ##
+# The number of count slots needed to index the remaining card
+# counts of a shoe directly by rank (1 to 13) or by packed card.
+RANK_SLOTS = 14
+CARD_SLOTS = 64
+
+
+class Hand:
+    '''A hand of cards with its bet, its state, and running totals of its
+    visible hard value, its number of aces, and its number of cards.
+
+    The cards can be strings (see main.py) or packed integers (see packed.py).
+    The running totals start at zero; the functions creating hands count
+    their cards into them.
+    '''
+
+    __slots__ = ("bet", "cards", "is_split", "double_bet", "hard_value", "ace_count", "card_count")
+
+    def __init__(self, bet: float, cards: list):
+        self.bet = bet
+        self.cards = cards
+        self.is_split = False
+        self.double_bet = False
+        self.hard_value = 0
+        self.ace_count = 0
+        self.card_count = 0
+
+    def __repr__(self):
+        return f"Hand(bet={self.bet!r}, cards={self.cards!r}, hard_value={self.hard_value}, ace_count={self.ace_count}, card_count={self.card_count})"
+
+
+class TurnState:
+    '''The outcome of a user's turn: whether they forfeited, busted, or doubled.'''
+
+    __slots__ = ("forfeited", "busted", "doubled")
+
+    def __init__(self):
+        self.forfeited = False
+        self.busted = False
+        self.doubled = False
+
+
+class Shoe:
+    '''A physical shoe of packed cards (see shoe.py for its functions).
+
+    The cards are stored in a byte array, since every packed card is below
+    128. The remaining card counts are flat lists: remaining_cards is indexed
+    by rank and remaining_suits by the packed card of each rank and suit.
+
+    The shoe also keeps an index of the dealt cards: the running count under
+    the count system whose tags (indexed by rank) are count_tags, and the
+    number of ten-value cards left.
+
+    If continuous is true, the shoe is a continuous shuffling machine: the
+    cards before the cursor are the dealt cards, the cards after it are the
+    undealt cards in no particular order, and the cut is never used.
+    '''
+
+    __slots__ = ("cards", "cursor", "cut", "rng", "deck_count", "remaining_cards", "remaining_suits", "count_tags", "running_count", "tens_left", "continuous")
+
+    def __init__(self, cards: [int], cut: int, rng, deck_count: int, count_tags: [int]=None, continuous: bool=False):
+        self.cards = array.array('B', cards)
+        self.cursor = 0
+        self.cut = cut
+        self.rng = rng
+        self.deck_count = deck_count
+        self.remaining_cards = [0] * RANK_SLOTS
+        self.remaining_suits = [0] * CARD_SLOTS
+        self.count_tags = count_tags if count_tags is not None else [0] * RANK_SLOTS
+        self.running_count = 0
+        self.tens_left = 0
+        self.continuous = continuous
+
+
+class Table:
+    '''A table with its own rules, random number generator,
+    balance, and shoe (see simulation.new_table).
+
+    If dealt is a list instead of None, every card drawn at
+    the table is appended to it (see history.py).
+    '''
+
+    __slots__ = ("rules", "rng", "balance", "shoe", "dealt")
+
+    def __init__(self, rules: dict, rng, balance: float=math.inf, shoe: Shoe=None):
+        self.rules = rules
+        self.rng = rng
+        self.balance = balance
+        self.shoe = shoe
+        self.dealt = None
+
+
+def deep_size(obj, seen: set=None) -> int:
+    '''Return the total size in bytes of obj and every object it references
+    through its slots, items, keys, and values, counting each object once.
+
+    Objects shared by every table, such as small integers, strings, and
+    modules, are only counted once across a single call.
+    '''
+
+    if seen is None:
+        seen = set()
+
+    if id(obj) in seen:
+        return 0
+
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_size(key, seen) + deep_size(value, seen)
+    elif isinstance(obj, (list, tuple, set)):
+        for item in obj:
+            size += deep_size(item, seen)
+    elif hasattr(type(obj), "__slots__"):
+        for name in type(obj).__slots__:
+            if hasattr(obj, name):
+                size += deep_size(getattr(obj, name), seen)
+
+    return size
+
+
+def table_footprint(table: Table) -> dict:
+    '''Return the memory used by table in bytes as a dictionary: in total
+    (with its own random number generator), without its rules (which every
+    table created from the same rules dictionary shares), by its random
+    number generator alone, and by its shoe (which holds the same generator).'''
+
+    return {
+        "table": deep_size(table),
+        "table_without_shared_rules": deep_size(table, {id(table.rules)}),
+        "rng": deep_size(table.rng),
+        "shoe": deep_size(table.shoe),
+    }
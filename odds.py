@@ -0,0 +1,269 @@
+'''Contain an exact calculator for the probability of each final total
+the dealer can finish with, given the dealer's upcard, the composition of
+the cards left in the shoe, and the soft 17 rule.
+
+A composition is packed into a single integer signature holding the
+number of cards left of each value (an ace is 1 and a 10, Jack, Queen,
+and King are all 10) in its own 8-bit field. Removing a card is then a
+single subtraction, and the signature is a cheap dictionary key.
+
+Every dealer state the calculator visits is memoized in a cache with a
+bounded size. Once the cache is full, the least recently used entries
+are evicted.
+
+In true random mode, every card is drawn from an infinite deck, so the
+dealer's outcomes only depend on the upcard and the soft 17 rule. They are
+computed once, when this module is imported, into INFINITE_DEALER, along with
+the EV of standing on every total in INFINITE_STAND_EVS, so that every query
+in that mode is a table lookup.
+'''
+
+
+__author__ = "U Ahsan"
+
+
+from collections import OrderedDict
+
+import util
+
+
+## Constants ##
+VALUES = list(range(1, 11))
+
+RANKS = list(range(1, 14))
+
+# The bit width of the field holding the count of each value.
+FIELD_WIDTH = 8
+FIELD_MASK = (1 << FIELD_WIDTH) - 1
+
+# UNITS[value] is the signature of a single card of value.
+UNITS = [0] + [1 << (FIELD_WIDTH * (value - 1)) for value in VALUES]
+
+# The final dealer totals, in the order the probabilities are stored.
+OUTCOMES = [17, 18, 19, 20, 21, "bust"]
+BUST_INDEX = len(OUTCOMES) - 1
+
+# A single fresh deck, used when a composition runs out of cards.
+FRESH_DECK = sum(UNITS[value] * (16 if value == 10 else 4) for value in VALUES)
+
+# The maximum number of dealer states kept in the cache.
+CACHE_SIZE = 500000
+
+# The probability of drawing each value (indexed by value) from an infinite
+# deck, where every rank is equally likely, as in true random mode.
+INFINITE_PROBABILITIES = [0.0] + [(4 if value == 10 else 1) / len(RANKS) for value in VALUES]
+
+# The outcome of a dealer who has busted, and of one standing on each total.
+_BUST_OUTCOME = tuple(1.0 if i == BUST_INDEX else 0.0 for i in range(len(OUTCOMES)))
+_STAND_OUTCOMES = {total: tuple(1.0 if outcome == total else 0.0 for outcome in OUTCOMES) for total in OUTCOMES[:BUST_INDEX]}
+
+_cache = OrderedDict()
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+def composition_signature(remaining_cards) -> int:
+    '''Pack remaining_cards, the number of cards left of each rank indexed
+    by rank (like main.remaining_cards, or a dictionary with a key for every
+    rank), into a composition signature.
+
+    >>> composition_signature([0, 2, 1] + [0] * 11)
+    258
+    '''
+
+    signature = 0
+
+    for rank in RANKS:
+        signature += UNITS[min(rank, 10)] * remaining_cards[rank]
+
+    return signature
+
+
+def signature_count(signature: int, value: int) -> int:
+    '''Return the number of cards of value in the composition signature.'''
+
+    return (signature >> (FIELD_WIDTH * (value - 1))) & FIELD_MASK
+
+
+def signature_total(signature: int) -> int:
+    '''Return the total number of cards in the composition signature.'''
+
+    total = 0
+
+    for value in VALUES:
+        total += signature_count(signature, value)
+
+    return total
+
+
+def dealer_probabilities(upcard: int, remaining_cards, soft_17_hit: bool) -> dict:
+    '''Return a dictionary mapping each final dealer total in OUTCOMES
+    to its exact probability, given the rank of the dealer's upcard,
+    remaining_cards (the number of cards left of each rank that the dealer
+    can still receive, including the hidden card), and the soft_17_hit rule.
+
+    If remaining_cards is None, the dealer draws from an infinite deck
+    (as in true random mode) and the probabilities are read from INFINITE_DEALER.
+
+    >>> dealer_probabilities(10, {rank: 24 for rank in range(1, 14)}, False)["bust"]  # doctest: +ELLIPSIS
+    0.2124...
+    '''
+
+    if remaining_cards is None:
+        probabilities = INFINITE_DEALER[soft_17_hit][min(upcard, 10)]
+    else:
+        signature = composition_signature(remaining_cards)
+        probabilities = dealer_signature_probabilities(min(upcard, 10), signature, soft_17_hit)
+
+    return dict(zip(OUTCOMES, probabilities))
+
+
+def dealer_signature_probabilities(upcard_value: int, signature: int, soft_17_hit: bool) -> tuple:
+    '''Return a tuple with the exact probability of each final dealer total
+    in OUTCOMES (in order) for a dealer with an upcard of upcard_value
+    drawing from the composition signature.'''
+
+    return _dealer_state(upcard_value, upcard_value == 1, signature, signature_total(signature), soft_17_hit)
+
+
+def _dealer_state(hard_value: int, has_ace: bool, signature: int, total: int, soft_17_hit: bool) -> tuple:
+    '''Return the probability of each final dealer total for a dealer hand with
+    hard_value and has_ace drawing from the composition signature of total cards.'''
+
+    # The dealer stops (see util.dealer_should_hit) without depending on
+    # the composition, so these states are never cached
+    if hard_value > 21:
+        return _BUST_OUTCOME
+
+    best = hard_value + 10 if has_ace and hard_value + 10 <= 21 else hard_value
+
+    if best >= 18 or (best == 17 and (not soft_17_hit or best == hard_value)):
+        return _STAND_OUTCOMES[best]
+
+    key = (signature, hard_value, has_ace, soft_17_hit)
+    probabilities = _cache.get(key)
+
+    if probabilities is not None:
+        _cache.move_to_end(key)
+        _cache_stats["hits"] += 1
+
+        return probabilities
+
+    _cache_stats["misses"] += 1
+
+    # Treat an exhausted composition as a reshuffle into a fresh deck
+    if total == 0:
+        signature = FRESH_DECK
+        total = signature_total(signature)
+
+    totals = [0.0] * len(OUTCOMES)
+
+    for value in VALUES:
+        count = (signature >> (FIELD_WIDTH * (value - 1))) & FIELD_MASK
+
+        if count == 0:
+            continue
+
+        weight = count / total
+        next_state = _dealer_state(hard_value + value, has_ace or value == 1, signature - UNITS[value], total - 1, soft_17_hit)
+
+        for i, probability in enumerate(next_state):
+            totals[i] += weight * probability
+
+    probabilities = tuple(totals)
+
+    _cache[key] = probabilities
+
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+    return probabilities
+
+
+def _infinite_dealer_state(hard_value: int, has_ace: bool, soft_17_hit: bool, memo: dict) -> tuple:
+    '''Return the probability of each final dealer total for a dealer hand
+    with hard_value and has_ace drawing from an infinite deck.'''
+
+    key = (hard_value, has_ace)
+
+    if key in memo:
+        return memo[key]
+
+    if has_ace and hard_value + 10 <= 21:
+        values = [hard_value, hard_value + 10]
+    else:
+        values = [hard_value]
+
+    if hard_value > 21:
+        probabilities = tuple(1.0 if i == BUST_INDEX else 0.0 for i in range(len(OUTCOMES)))
+    elif not util.dealer_should_hit(values, soft_17_hit):
+        probabilities = tuple(1.0 if outcome == max(values) else 0.0 for outcome in OUTCOMES)
+    else:
+        totals = [0.0] * len(OUTCOMES)
+
+        for value in VALUES:
+            next_state = _infinite_dealer_state(hard_value + value, has_ace or value == 1, soft_17_hit, memo)
+
+            for i in range(len(OUTCOMES)):
+                totals[i] += INFINITE_PROBABILITIES[value] * next_state[i]
+
+        probabilities = tuple(totals)
+
+    memo[key] = probabilities
+
+    return probabilities
+
+
+def _stand_evs(dealer: tuple) -> [float]:
+    '''Return the EV of standing on every total from 0 to 21 (indexed by
+    total) against dealer, a tuple of the probability of each final total.'''
+
+    evs = []
+
+    for total in range(22):
+        ev = dealer[BUST_INDEX]
+
+        for i in range(BUST_INDEX):
+            if total > OUTCOMES[i]:
+                ev += dealer[i]
+            elif total < OUTCOMES[i]:
+                ev -= dealer[i]
+
+        evs.append(ev)
+
+    return evs
+
+
+# INFINITE_DEALER[soft_17_hit][upcard_value] is the probability of each final
+# dealer total in OUTCOMES (in order) for a dealer drawing from an infinite deck.
+INFINITE_DEALER = {}
+
+# INFINITE_STAND_EVS[soft_17_hit][upcard_value][total] is the EV, in units of
+# the bet, of standing on total against a dealer drawing from an infinite deck.
+INFINITE_STAND_EVS = {}
+
+for _soft_17_hit in (False, True):
+    _memo = {}
+
+    INFINITE_DEALER[_soft_17_hit] = [None] + [_infinite_dealer_state(value, value == 1, _soft_17_hit, _memo) for value in VALUES]
+    INFINITE_STAND_EVS[_soft_17_hit] = [None] + [_stand_evs(INFINITE_DEALER[_soft_17_hit][value]) for value in VALUES]
+
+del _soft_17_hit, _memo
+
+
+def cache_info() -> dict:
+    '''Return the number of cache hits, misses, and entries as a dictionary.'''
+
+    return {
+        "hits": _cache_stats["hits"],
+        "misses": _cache_stats["misses"],
+        "size": len(_cache),
+        "max_size": CACHE_SIZE,
+    }
+
+
+def clear_cache():
+    '''Remove every entry from the cache and reset its statistics.'''
+
+    _cache.clear()
+    _cache_stats["hits"] = 0
+    _cache_stats["misses"] = 0
@@ -0,0 +1,157 @@
+'''Contain a compact integer representation of cards along with
+precomputed lookup tables for their ranks, suits, values, and symbols.
+
+Each card is packed into a small integer using bit fields:
+    bits 0-3: the rank (1 to 13)
+    bits 4-5: the index of the suit in SUITS
+    bit 6:    1 if the card is hidden, otherwise 0
+For example, a visible ace of hearts is 1 | (3 << 4) = 49.
+
+Every packed card is below 128, so each lookup table is a plain list
+indexed directly by the card. Since small integers are shared by Python,
+storing packed cards allocates nothing per card.
+
+The string format used for rendering (f"{rank}{suit}{is_hidden}")
+is available through to_str and from_str.
+'''
+
+
+__author__ = "U Ahsan"
+
+
+import metrics
+
+
+## Constants ##
+SUITS = [
+    "c", # clubs
+    "d", # diamonds
+    "s", # spades
+    "h" # hearts
+]
+
+RANKS = list(range(1, 14))
+
+RANK_MASK = 0b1111
+SUIT_SHIFT = 4
+HIDDEN = 1 << 6
+
+# One entry for every possible packed card.
+TABLE_SIZE = HIDDEN << 1
+
+
+def encode(rank: int, suit: str, hidden: bool=False) -> int:
+    '''Pack rank, the suit initial suit, and hidden into a single integer.
+
+    >>> encode(1, "h")
+    49
+    >>> encode(12, "c", True)
+    76
+    '''
+
+    card = rank | (SUITS.index(suit) << SUIT_SHIFT)
+
+    if hidden:
+        card |= HIDDEN
+
+    return card
+
+
+def _build_tables():
+    '''Build and return the rank, suit, value, and string
+    lookup tables for every possible packed card.'''
+
+    ranks = [0] * TABLE_SIZE
+    suits = [""] * TABLE_SIZE
+    values = [0] * TABLE_SIZE
+    strings = [""] * TABLE_SIZE
+
+    for rank in RANKS:
+        for suit in SUITS:
+            for hidden in (False, True):
+                card = encode(rank, suit, hidden)
+
+                ranks[card] = rank
+                suits[card] = suit
+                strings[card] = f"{rank}{suit}{1 if hidden else 0}"
+
+                # Hidden cards do not count towards the visible hand value,
+                # and a 10, Jack, Queen, and King all are valued at 10.
+                values[card] = 0 if hidden else min(rank, 10)
+
+    return ranks, suits, values, strings
+
+
+# CARD_RANKS[card] is the rank of card, CARD_SUITS[card] is its suit initial,
+# CARD_VALUES[card] is its visible value (an ace is 1), and
+# CARD_STRINGS[card] is its string format.
+CARD_RANKS, CARD_SUITS, CARD_VALUES, CARD_STRINGS = _build_tables()
+
+RANK_SYMBOLS = ["", 'A', '2', '3', '4', '5', '6', '7', '8', '9', "10", 'J', 'Q', 'K']
+
+_string_to_card = {string: card for card, string in enumerate(CARD_STRINGS) if string}
+
+
+def to_str(card: int) -> str:
+    '''Return card in the string format used for rendering.
+
+    >>> to_str(49)
+    '1h0'
+    >>> to_str(76)
+    '12c1'
+    '''
+
+    return CARD_STRINGS[card]
+
+
+def from_str(card: str) -> int:
+    '''Return the packed integer of card given in the string format.
+
+    >>> from_str("1h0")
+    49
+    '''
+
+    return _string_to_card[card]
+
+
+def is_hidden(card: int) -> bool:
+    '''Return true if and only if the hidden bit of card is set.'''
+
+    return card & HIDDEN != 0
+
+
+def reveal(card: int) -> int:
+    '''Return card with its hidden bit cleared.'''
+
+    return card & ~HIDDEN
+
+
+def hand_value(cards: [int]) -> [int]:
+    '''Using only the visible cards in cards, calculate and return
+    the possible hand values as an integer list, exactly like
+    util.hand_value but for packed cards.
+
+    >>> hand_value([encode(1, "c"), encode(2, "s")])
+    [3, 13]
+    >>> hand_value([encode(5, "d"), encode(7, "h", True)])
+    [5]
+    '''
+
+    if metrics.enabled:
+        metrics.count("hand_value_calls")
+
+    hard_value = 0
+    has_ace = False
+
+    for card in cards:
+        value = CARD_VALUES[card]
+        hard_value += value
+
+        if value == 1:
+            has_ace = True
+
+    # Only include the 'ace as an 11-value card' if it is below 21!
+    if has_ace and hard_value + 10 <= 21:
+        return [hard_value, hard_value + 10]
+
+    return [hard_value]
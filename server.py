@@ -0,0 +1,380 @@
+'''Asyncio TCP server hosting many independent Blackjack tables at once.
+
+Every connection gets its own table (see simulation.new_table) with its
+own shoe, random number generator, rules, and balance, so no state is shared
+between players. The rounds are played by simulation.round_flow, which
+follows the exact rules of start_game, play_user, and play_dealer in main.py,
+and every decision it asks for is read from the client instead of input.
+
+The protocol is line based, so the server can be played with netcat:
+
+    python server.py --port 8765
+    nc localhost 8765
+
+Each prompt is sent as a line containing only "> ", after which the server
+waits for one line from the client. Waiting on, or writing to, a slow client
+only suspends the task of that connection, so it never blocks other tables.
+A client that stays silent for longer than the idle timeout is disconnected.
+
+The server measures the latency of every connection: the time from receiving
+a line to having handed the complete response to the network, and keeps the
+statistics for every connection and for the server as a whole. The
+statistics of the server, including how many connections closed since the
+last report, are displayed at a regular interval rather than once a connection.
+'''
+
+
+__author__ = "U Ahsan"
+
+
+import argparse
+import asyncio
+import math
+import random
+import time
+
+import models
+import packed
+import simulation
+import util
+
+
+## Constants ##
+DEFAULT_PORT = 8765
+
+# The number of connections waiting to be accepted before new ones are refused,
+# high enough that thousands of clients can connect at once.
+BACKLOG = 4096
+
+# The longest line accepted from a client, in bytes.
+LINE_LIMIT = 1024
+
+CHOICE_NAMES = {
+    'h': "(h)it",
+    's': "(s)tand",
+    "sp": "(sp)lit hands",
+    'd': "(d)ouble down",
+    'f': "(f)orfeit",
+}
+
+QUIT_COMMANDS = ("q", "quit", "exit")
+
+
+class SessionClosed(Exception):
+    '''Raised when the client of a session disconnects, quits, or times out.'''
+
+
+def new_latency() -> dict:
+    '''Create and return empty latency statistics as a dictionary.'''
+
+    return {"count": 0, "total": 0.0, "max": 0.0}
+
+
+def record_latency(latency: dict, seconds: float):
+    '''Add a single measurement of seconds to the latency statistics.'''
+
+    latency["count"] += 1
+    latency["total"] += seconds
+
+    if seconds > latency["max"]:
+        latency["max"] = seconds
+
+
+def latency_summary(latency: dict) -> str:
+    '''Return the latency statistics as a short string in milliseconds.'''
+
+    mean = latency["total"] / latency["count"] if latency["count"] else 0.0
+
+    return f"{latency['count']} responses, mean {mean * 1000:.3f}ms, max {latency['max'] * 1000:.3f}ms"
+
+
+def new_server_state(rules: dict, balance: float, seed: int=None, idle_timeout: float=300.0) -> dict:
+    '''Create and return the state shared by every connection of a server:
+    the rules and starting balance of each new table, the seed tables are
+    derived from, the idle timeout, and the connection and latency statistics.'''
+
+    return {
+        "rules": rules,
+        "balance": balance,
+        "seed": seed if seed is not None else random.SystemRandom().getrandbits(64),
+        "idle_timeout": idle_timeout,
+        "connections": 0,
+        "active": 0,
+        "closed": 0,
+        "rounds": 0,
+        "latency": new_latency(),
+    }
+
+
+def new_session(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, server_state: dict) -> dict:
+    '''Create and return a new session as a dictionary holding the streams of
+    the connection, its own table, and its latency statistics.
+
+    Each table deals from the stream of the seed of the server numbered by
+    the connection (see streams.RandomStream), so a server started with the
+    same seed deals the same shoes to its connections in order.
+    '''
+
+    number = server_state["connections"]
+    server_state["connections"] += 1
+
+    return {
+        "number": number,
+        "reader": reader,
+        "writer": writer,
+        "table": simulation.new_table(server_state["rules"], server_state["seed"], server_state["balance"], number),
+        "server": server_state,
+        "latency": new_latency(),
+        "received_at": None,
+        "rounds": 0,
+    }
+
+
+def card_text(card: int) -> str:
+    '''Return the packed card as a short string such as "A♠", or "??" if it is hidden.'''
+
+    if packed.is_hidden(card):
+        return "??"
+
+    return util.get_rank_symbol(packed.CARD_RANKS[card]) + util.suit_symbols[packed.CARD_SUITS[card]]
+
+
+def hand_text(hand: models.Hand) -> str:
+    '''Return the cards and state of hand on a single line.'''
+
+    cards = " ".join(card_text(card) for card in reversed(hand.cards))
+
+    return f"{cards}  [{util.graphical_hand_state(hand)}]"
+
+
+async def send(session: dict, lines: [str]):
+    '''Write lines to the client of session and wait until they are handed
+    to the network. If a line was received, the time since then is
+    recorded as the latency of this response.'''
+
+    writer = session["writer"]
+    writer.write(("\n".join(lines) + "\n").encode())
+
+    try:
+        await writer.drain()
+    except ConnectionError as error:
+        raise SessionClosed() from error
+
+    if session["received_at"] is not None:
+        seconds = time.perf_counter() - session["received_at"]
+        session["received_at"] = None
+
+        record_latency(session["latency"], seconds)
+        record_latency(session["server"]["latency"], seconds)
+
+
+async def receive(session: dict) -> str:
+    '''Prompt the client of session and return the next line it sends, without
+    surrounding whitespace and in lowercase.
+
+    Raises SessionClosed if the client disconnects, asks to quit,
+    or does not answer within the idle timeout.
+    '''
+
+    await send(session, ["> "])
+
+    try:
+        line = await asyncio.wait_for(session["reader"].readline(), session["server"]["idle_timeout"])
+    except (asyncio.TimeoutError, ConnectionError, ValueError) as error:
+        # A ValueError means the line is longer than the limit of the stream
+        raise SessionClosed() from error
+
+    session["received_at"] = time.perf_counter()
+
+    if not line:
+        raise SessionClosed()
+
+    text = line.decode(errors="replace").strip().lower()
+
+    if text in QUIT_COMMANDS:
+        raise SessionClosed()
+
+    return text
+
+
+async def get_bet(session: dict) -> float:
+    '''Ask the client of session for an integer bet between 1 and the balance
+    of its table (inclusive) until a valid one is given, and return it.'''
+
+    balance = session["table"].balance
+    maximum = math.floor(balance)
+
+    await send(session, [f"Balance: ${balance:.2f}", f"Enter an integer dollar amount to bet (1 to {maximum}), or q to quit:"])
+
+    while True:
+        text = await receive(session)
+
+        if text.isdigit() and 1 <= int(text) <= maximum:
+            return int(text) * 1.0
+
+        await send(session, [f"Please enter an integer between 1 and {maximum} (inclusive)."])
+
+
+async def get_decision(session: dict, hand: models.Hand, dealer_hand: models.Hand, choices: [str]) -> str:
+    '''Display hand and dealer_hand to the client of session and ask for
+    a decision until one of choices is given, then return it.'''
+
+    lines = [
+        "Dealer's hand: " + hand_text(dealer_hand),
+        "Your hand: " + hand_text(hand) + util.graphical_hand_comparison(hand, dealer_hand, False),
+        "Would you like to: " + ", ".join(CHOICE_NAMES[choice] for choice in choices),
+    ]
+
+    await send(session, lines)
+
+    while True:
+        decision = await receive(session)
+
+        if decision in choices:
+            return decision
+
+        await send(session, ["Please enter a valid choice: " + ", ".join(choices)])
+
+
+async def play_round(session: dict, initial_bet: float) -> float:
+    '''Play a single round at the table of session with initial_bet, reading
+    every decision from the client, and return the net outcome of the round.'''
+
+    # Every hand of the user, including split hands played without
+    # any decision, to display once the round is over
+    hands = []
+
+    flow = simulation.round_flow(session["table"], initial_bet, hands)
+
+    try:
+        hand, dealer_hand, choices = next(flow)
+
+        while True:
+            decision = await get_decision(session, hand, dealer_hand, choices)
+            hand, dealer_hand, choices = flow.send(decision)
+    except StopIteration as result:
+        outcome = result.value
+
+    lines = ["", "Final hands:", "Dealer's hand: " + hand_text(dealer_hand)]
+
+    for i, hand in enumerate(hands):
+        label = f"Your hand ({i + 1}/{len(hands)})" if len(hands) > 1 else "Your hand"
+        lines.append(f"{label}: " + hand_text(hand))
+
+    sign = "" if outcome >= 0 else "-"
+    lines.append(f"Total earnings: {sign}${abs(outcome):.2f}")
+    lines.append("")
+
+    await send(session, lines)
+
+    return outcome
+
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, server_state: dict):
+    '''Host a table for a single connection until the client quits,
+    disconnects, times out, or runs out of money.'''
+
+    session = new_session(reader, writer, server_state)
+    server_state["active"] += 1
+
+    try:
+        await send(session, ["Welcome to Blackjack!", ""])
+
+        while session["table"].balance >= 1:
+            initial_bet = await get_bet(session)
+            await play_round(session, initial_bet)
+
+            session["rounds"] += 1
+            server_state["rounds"] += 1
+
+        await send(session, ["You have no money left. Goodbye!"])
+    except SessionClosed:
+        pass
+    finally:
+        server_state["active"] -= 1
+        server_state["closed"] += 1
+
+        writer.close()
+
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def report(server_state: dict, interval: float):
+    '''Display the connection and latency statistics of the server, and the
+    number of connections closed since the last report, every interval seconds.'''
+
+    reported_closed = 0
+
+    while True:
+        await asyncio.sleep(interval)
+
+        closed = server_state["closed"] - reported_closed
+        reported_closed = server_state["closed"]
+
+        print(
+            f"Active connections: {server_state['active']}, total: {server_state['connections']}, "
+            f"closed since the last report: {closed}, rounds: {server_state['rounds']}, "
+            f"latency: {latency_summary(server_state['latency'])}"
+        )
+
+
+async def serve(host: str, port: int, server_state: dict, report_interval: float=None):
+    '''Accept connections on host and port forever, hosting
+    a separate table for each of them.
+
+    If report_interval is given, the statistics are reported every
+    report_interval seconds until the server shuts down.
+    '''
+
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(reader, writer, server_state),
+        host,
+        port,
+        limit=LINE_LIMIT,
+        backlog=BACKLOG
+    )
+
+    report_task = asyncio.create_task(report(server_state, report_interval)) if report_interval else None
+
+    print(f"Serving Blackjack on {', '.join(str(socket.getsockname()) for socket in server.sockets)}")
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if report_task is not None:
+            report_task.cancel()
+
+            try:
+                await report_task
+            except asyncio.CancelledError:
+                pass
+
+
+def main_cli():
+    '''Parse the command line arguments and run the server.'''
+
+    parser = argparse.ArgumentParser(description="Host Blackjack tables over TCP.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--balance", type=float, default=1000.0, help="starting balance of each table")
+    parser.add_argument("--seed", type=int, default=None, help="seed the tables are derived from")
+    parser.add_argument("--idle-timeout", type=float, default=300.0, help="seconds before a silent client is disconnected")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="seconds between statistics reports (0 to disable)")
+    simulation.add_rule_arguments(parser)
+
+    args = parser.parse_args()
+
+    server_state = new_server_state(simulation.rules_from_arguments(args), args.balance, args.seed, args.idle_timeout)
+
+    try:
+        asyncio.run(serve(args.host, args.port, server_state, args.report_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,247 @@
+'''Contain the functions for a physical Blackjack shoe: a pre-shuffled
+array of every card in the decks with a cursor pointing at the next card
+to deal and a cut card marking when the shoe must be reshuffled.
+
+Drawing a card only moves the cursor and updates the remaining card counts,
+so it takes constant time and allocates nothing. The cards are stored
+packed as integers (see packed.py) in a models.Shoe.
+
+Every draw and shuffle also keeps an index of the shoe up to date: the
+running count under a card counting system from COUNT_SYSTEMS and the number
+of ten-value cards left. Every question about the shoe (the running count,
+the decks remaining, the true count, and the ten-density) is then answered
+in constant time, without scanning the cards. Every dealt card is counted as
+soon as it is dealt, including the dealer's hidden card.
+
+A shoe can also be a continuous shuffling machine (CSM), which is never
+reshuffled. Its undealt cards are kept after the cursor in no particular
+order, and a card is drawn by swapping a random undealt card to the cursor
+and moving the cursor past it. return_cards puts every dealt card back into
+the machine at the end of a round by moving the cursor back to the top.
+Both take constant time per card. The cards dealt in a round stay out of the
+machine until it ends, so a round can never be dealt the same card twice.
+'''
+
+
+__author__ = "U Ahsan"
+
+
+import metrics
+import models
+import packed
+
+
+## Constants ##
+# The tag of each card value (an ace is 1 and every ten-value card
+# is 10) under each card counting system, from index 1 to 10.
+COUNT_SYSTEMS = {
+    "hi_lo":    [0, -1, 1, 1, 1, 1, 1, 0, 0, 0, -1],
+    "ko":       [0, -1, 1, 1, 1, 1, 1, 1, 0, 0, -1],
+    "hi_opt_1": [0, 0, 0, 1, 1, 1, 1, 0, 0, 0, -1],
+    "hi_opt_2": [0, 0, 1, 1, 2, 2, 1, 1, 0, 0, -2],
+    "omega_2":  [0, 0, 1, 1, 2, 2, 2, 1, 0, -1, -2],
+    "zen":      [0, -1, 1, 1, 2, 2, 2, 1, 0, 0, -2],
+}
+
+DEFAULT_COUNT_SYSTEM = "hi_lo"
+
+DECK_SIZE = 52
+
+
+def _rank_tags(system: str) -> [int]:
+    '''Return the tags of the count system indexed by rank instead of by value.'''
+
+    value_tags = COUNT_SYSTEMS[system]
+
+    return [value_tags[min(rank, 10)] for rank in range(models.RANK_SLOTS)]
+
+
+# The tags of every count system indexed by rank,
+# shared by every shoe using that system.
+RANK_TAGS = {system: _rank_tags(system) for system in COUNT_SYSTEMS}
+
+
+def new_shoe(ranks: [int], suits: [str], deck_count: int, penetration: float=1.0, rng=None, count_system: str=DEFAULT_COUNT_SYSTEM, continuous: bool=False) -> models.Shoe:
+    '''Create, shuffle, and return a new shoe containing deck_count
+    decks of every rank in ranks and suit in suits.
+
+    The penetration is the fraction of the shoe (0 < penetration <= 1)
+    that is dealt before the cut card is reached and the shoe is reshuffled.
+    The rng can be the random module, any random.Random instance, or a
+    streams.RandomStream, and is used for every shuffle of this shoe.
+
+    Each card in the shoe is a packed integer. The shoe also keeps
+    remaining_cards (the number of undealt cards of each rank, indexed by
+    rank) and remaining_suits (the number of undealt cards of each rank and
+    suit, indexed by the packed card) up to date with every card drawn,
+    along with the running count under count_system (see COUNT_SYSTEMS).
+
+    If continuous is true, the shoe is a continuous shuffling machine (see
+    the module docstring), and the penetration does nothing.
+    '''
+
+    cards = []
+
+    for rank in ranks:
+        for suit in suits:
+            cards.extend([packed.encode(rank, suit)] * deck_count)
+
+    new = models.Shoe(cards, max(1, round(len(cards) * penetration)), rng, deck_count, RANK_TAGS[count_system], continuous)
+    shuffle(new)
+
+    return new
+
+
+def shuffle(shoe: models.Shoe):
+    '''Shuffle every card back into shoe, move the cursor back to the top,
+    and recount the remaining cards.'''
+
+    shoe.rng.shuffle(shoe.cards)
+    shoe.cursor = 0
+
+    if metrics.enabled:
+        metrics.count("reshuffles")
+        metrics.count("rng_calls", len(shoe.cards) - 1)
+
+    deck_count = shoe.deck_count
+    remaining_cards = shoe.remaining_cards
+    remaining_suits = shoe.remaining_suits
+
+    remaining_cards[:] = [0] * len(remaining_cards)
+    remaining_suits[:] = [0] * len(remaining_suits)
+
+    # Every distinct card appears once in each deck
+    for card in set(shoe.cards):
+        remaining_cards[packed.CARD_RANKS[card]] += deck_count
+        remaining_suits[card] = deck_count
+
+    shoe.running_count = 0
+    shoe.tens_left = sum(remaining_cards[10:])
+
+
+def draw(shoe: models.Shoe) -> int:
+    '''Deal the next card in shoe and return it as a packed integer,
+    reshuffling first if the cut card has been reached.
+
+    A continuous shuffling machine deals a random undealt card instead.
+    Its dealt cards are the cards of the round in play, which are only put
+    back once the round ends (see return_cards), so a ValueError is raised
+    if the round has been dealt every card.
+    '''
+
+    cards = shoe.cards
+    cursor = shoe.cursor
+
+    if shoe.continuous:
+        if cursor == len(cards):
+            raise ValueError(f"The round has been dealt all {len(cards)} cards of the continuous shuffling machine.")
+
+        # Swap a random undealt card to the cursor
+        chosen = cursor + shoe.rng.randrange(len(cards) - cursor)
+        cards[cursor], cards[chosen] = cards[chosen], cards[cursor]
+
+        if metrics.enabled:
+            metrics.count("rng_calls")
+    elif cursor >= shoe.cut:
+        shuffle(shoe)
+        cursor = 0
+
+    card = cards[cursor]
+    shoe.cursor = cursor + 1
+
+    if metrics.enabled:
+        metrics.count("card_draws")
+
+    rank = packed.CARD_RANKS[card]
+    shoe.remaining_cards[rank] -= 1
+    shoe.remaining_suits[card] -= 1
+
+    shoe.running_count += shoe.count_tags[rank]
+
+    if rank >= 10:
+        shoe.tens_left -= 1
+
+    return card
+
+
+def return_cards(shoe: models.Shoe):
+    '''Put every card dealt from the continuous shuffling machine shoe back
+    into it, uncounting each of them, without shuffling.'''
+
+    cards = shoe.cards
+    remaining_cards = shoe.remaining_cards
+    remaining_suits = shoe.remaining_suits
+    count_tags = shoe.count_tags
+
+    for i in range(shoe.cursor):
+        card = cards[i]
+        rank = packed.CARD_RANKS[card]
+
+        remaining_cards[rank] += 1
+        remaining_suits[card] += 1
+        shoe.running_count -= count_tags[rank]
+
+        if rank >= 10:
+            shoe.tens_left += 1
+
+    shoe.cursor = 0
+
+
+def cards_left(shoe: models.Shoe) -> int:
+    '''Return the number of undealt cards left in shoe, including the
+    cards behind the cut card.'''
+
+    return len(shoe.cards) - shoe.cursor
+
+
+def set_count_system(shoe: models.Shoe, count_system: str):
+    '''Switch shoe to count_system (see COUNT_SYSTEMS), recounting
+    the cards dealt since the last shuffle.'''
+
+    shoe.count_tags = RANK_TAGS[count_system]
+    shoe.running_count = 0
+
+    for card in shoe.cards[:shoe.cursor]:
+        shoe.running_count += shoe.count_tags[packed.CARD_RANKS[card]]
+
+
+def running_count(shoe: models.Shoe) -> int:
+    '''Return the running count of the cards dealt from shoe since the last shuffle.'''
+
+    return shoe.running_count
+
+
+def decks_remaining(shoe: models.Shoe) -> float:
+    '''Return the number of decks left in shoe, including the
+    cards behind the cut card, as a fraction.'''
+
+    return cards_left(shoe) / DECK_SIZE
+
+
+def true_count(shoe: models.Shoe) -> float:
+    '''Return the true count of shoe: its running count divided
+    by the number of decks remaining.'''
+
+    decks = decks_remaining(shoe)
+
+    if decks == 0:
+        return 0.0
+
+    return shoe.running_count / decks
+
+
+def tens_left(shoe: models.Shoe) -> int:
+    '''Return the number of ten-value cards (10, Jack, Queen, and King) left in shoe.'''
+
+    return shoe.tens_left
+
+
+def ten_density(shoe: models.Shoe) -> float:
+    '''Return the fraction of the cards left in shoe that are ten-value cards.'''
+
+    left = cards_left(shoe)
+
+    if left == 0:
+        return 0.0
+
+    return shoe.tens_left / left
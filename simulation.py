@@ -0,0 +1,846 @@
+'''Headless simulation engine for Blackjack that plays complete rounds
+with the same rules as the interactive game, without any input, output,
+or pauses.
+
+Each round is played by round_flow, a generator that follows the exact
+flow of start_game, play_user, and play_dealer in main.py. Every time the
+user would be prompted, the generator yields the hand, the dealer's hand,
+and the available choices, and expects the decision to be sent back.
+Since the rules are written twice, test_simulation.py plays the game and
+round_flow on the same seeded shoes and checks that every round has the
+same outcome.
+
+A policy is any function called as policy(hand, upcard, choices, shoe) that
+returns a decision from the choices, given the hand, the packed upcard of the
+dealer, and the shoe of the table (None in true random mode). A subclass of
+Policy can also decide for many hands at once, which simulate_batch uses to
+decide a whole batch of tables in lockstep with a single call per step.
+
+The hands are the same models.Hand as the hands created by main.new_hand,
+but hold packed integer cards (see packed.py) instead of strings.
+'''
+
+
+__author__ = "U Ahsan"
+
+
+import argparse
+import hashlib
+import math
+import multiprocessing
+import os
+import random
+import time
+
+import history
+import main
+import metrics
+import models
+import odds
+import packed
+import shoe
+import streams
+import util
+
+
+## Constants ##
+RESPLIT_CHOICES = ['s', "sp"]
+
+# Ranks the simple_policy will always split.
+SPLIT_RANKS = (1, 8)
+
+# Every card in a single deck, used to draw in true random mode.
+DECK = [packed.encode(rank, suit) for rank in main.ranks for suit in main.SUITS]
+
+# The number of tables simulate_batch plays in lockstep by default.
+BATCH_TABLES = 256
+
+# Settings that only change what the game displays, which are not rules.
+DISPLAY_SETTINGS = ["odds_hud"]
+
+
+def rules_from_settings(settings: dict) -> dict:
+    '''Return a dictionary mapping the name of each true setting in settings
+    to its current value, or its default value if no value has been assigned yet.
+
+    The display-only settings (such as 'reset', 'return', and those in
+    DISPLAY_SETTINGS) are excluded.
+
+    >>> rules_from_settings(main.settings)["deck_count"]
+    6
+    '''
+
+    rules = {}
+
+    for name, setting in settings.items():
+        if type(setting["default"]) in (bool, int) and name not in DISPLAY_SETTINGS:
+            rules[name] = setting.get("value", setting["default"])
+
+    return rules
+
+
+def new_table(rules: dict, seed: int=None, balance: float=math.inf, stream: int=0) -> models.Table:
+    '''Create and return a new table (see models.Table) with its own
+    rules, random number generator, balance, and freshly shuffled deck.
+
+    The random number generator is the stream numbered stream derived from
+    seed (see streams.RandomStream), so tables sharing a seed with different
+    stream numbers deal independent cards. The balance is infinite by default
+    so that doubling is always affordable, which is what a rule simulation
+    usually wants. The shoe is a continuous shuffling machine if the
+    continuous_shuffle rule is true.
+    '''
+
+    rng = streams.RandomStream(seed, stream)
+    table_shoe = shoe.new_shoe(main.ranks, main.SUITS, rules["deck_count"], rules["penetration"] / 100, rng, continuous=rules.get("continuous_shuffle", False))
+
+    return models.Table(rules, rng, balance, table_shoe)
+
+
+def draw(table: models.Table) -> int:
+    '''Draw a random card from the deck of table and return it as a packed
+    integer using the same weighting as main.draw_card.
+
+    In true random mode, a single choice from DECK picks
+    both the rank and the suit uniformly.
+    '''
+
+    if table.rules["true_random"] == True:
+        if metrics.enabled:
+            metrics.count("card_draws")
+            metrics.count("rng_calls")
+
+        card = table.rng.choice(DECK)
+    else:
+        card = shoe.draw(table.shoe)
+
+    if table.dealt is not None:
+        table.dealt.append(card)
+
+    return card
+
+
+def new_hand(bet: float, cards: [int]) -> models.Hand:
+    '''Create and return a new hand holding the packed cards in cards,
+    with the same running totals as main.new_hand.'''
+
+    hand = models.Hand(bet, cards)
+
+    for card in cards:
+        count_card(hand, card)
+
+    return hand
+
+
+def count_card(hand: models.Hand, card: int, direction: int=1):
+    '''Update the running totals of hand for the packed card being
+    added to it, or removed from it if direction is -1, exactly
+    like util.count_card.'''
+
+    value = packed.CARD_VALUES[card]
+
+    hand.hard_value += value * direction
+    hand.card_count += direction
+
+    if value == 1:
+        hand.ace_count += direction
+
+
+def hit(table: models.Table, hand: models.Hand):
+    '''Draw and insert a new card into hand without any output, exactly like main.hit.'''
+
+    card = draw(table)
+    hand.cards.insert(0, card)
+    count_card(hand, card)
+
+
+def split(hand: models.Hand, user_hands: [models.Hand]):
+    '''Split hand into two individual hands without any output, exactly like main.split.'''
+
+    second_card = hand.cards.pop()
+    count_card(hand, second_card, -1)
+    hand.bet /= 2
+    hand.is_split = True
+
+    split_hand = new_hand(hand.bet, [second_card])
+    split_hand.is_split = True
+    user_hands.append(split_hand)
+
+
+def end_round(table: models.Table):
+    '''Put the cards of the round that just ended back into the
+    shoe of table if it is a continuous shuffling machine.'''
+
+    if table.shoe.continuous:
+        shoe.return_cards(table.shoe)
+
+
+def round_flow(table: models.Table, initial_bet: float, user_hands: [models.Hand]=None, expected_dealer: bool=False):
+    '''Play a single round at table with initial_bet, yielding
+    (hand, dealer_hand, choices) at every decision and returning
+    the net outcome of the round for the user.
+
+    The decision sent back must be one of the choices. The flow, including
+    splitting, doubling, surrendering, and the dealer's turn, mirrors
+    start_game, play_user, and play_dealer.
+
+    If user_hands is given, the hands of the user are added to it, so
+    that they can be inspected once the round is over.
+
+    If expected_dealer is true in true random mode, the dealer's turn is not
+    played. Instead, the hands are settled at their expected return against
+    every outcome of the upcard (see odds.INFINITE_STAND_EVS), which the cards
+    of an infinite deck do not depend on. The net outcome is then the expected
+    net outcome of the round given the user's hands and the upcard.
+
+    Once the round is over, its cards go back into a continuous shuffling
+    machine (see end_round).
+    '''
+
+    rules = table.rules
+
+    table.balance -= initial_bet
+    total_bet = initial_bet
+
+    if user_hands is None:
+        user_hands = []
+
+    user_hands.append(new_hand(initial_bet, [draw(table), draw(table)]))
+    dealer_hand = new_hand(0, [draw(table), draw(table) | packed.HIDDEN])
+
+    forfeited = False
+    busted = False
+    doubled = False
+
+    ## User's turn (play_user) ##
+    i = 0
+    while (not forfeited) and (not busted) and i < len(user_hands):
+        hand_complete = False
+        turn = 0
+        hand = user_hands[i]
+        cards = hand.cards
+
+        while (not hand_complete) and (not forfeited):
+            turn += 1
+
+            if hand.is_split == True or hand.double_bet == True:
+                hit(table, hand)
+
+                if hand.is_split and (cards[0] & packed.RANK_MASK) == (cards[1] & packed.RANK_MASK):
+                    decision = yield hand, dealer_hand, RESPLIT_CHOICES
+
+                    if decision == "sp":
+                        split(hand, user_hands)
+                        continue
+
+                hand_complete = True
+            else:
+                choices = ['h', 's']
+
+                if turn == 1:
+                    if rules["splitting"] == True and (cards[0] & packed.RANK_MASK) == (cards[1] & packed.RANK_MASK):
+                        choices.append("sp")
+
+                    if rules["doubling"] == True and table.balance >= initial_bet:
+                        choices.append('d')
+
+                    if rules["surrendering"] == True:
+                        choices.append('f')
+
+                decision = yield hand, dealer_hand, choices
+
+                if decision == 's':
+                    hand_complete = True
+
+                elif decision == 'h':
+                    hit(table, hand)
+
+                elif decision == 'd':
+                    table.balance -= hand.bet
+                    hand.bet *= 2
+                    hand.double_bet = True
+                    doubled = True
+
+                elif decision == "sp":
+                    split(hand, user_hands)
+
+                elif decision == 'f':
+                    table.balance += initial_bet / 2
+                    hand_complete = True
+                    forfeited = True
+
+            # The hard value is always the lowest hand value
+            if hand.hard_value > 21:
+                busted = True
+                hand_complete = True
+
+        i += 1
+
+    if doubled:
+        total_bet *= 2
+
+    if forfeited:
+        end_round(table)
+        return -total_bet / 2.0
+
+    if busted:
+        end_round(table)
+        return -total_bet
+
+    if expected_dealer and rules["true_random"] == True:
+        stand_evs = odds.INFINITE_STAND_EVS[rules["soft_17_hit"]][packed.CARD_VALUES[dealer_hand.cards[0]]]
+
+        profit = 0
+        for hand in user_hands:
+            profit += hand.bet * (1 + stand_evs[max(util.hand_values(hand))])
+
+        table.balance += profit
+        end_round(table)
+
+        return profit - total_bet
+
+    ## Dealer's turn (play_dealer) ##
+    dealer_cards = dealer_hand.cards
+    hidden_card = dealer_cards[1]
+    dealer_cards[1] = packed.reveal(hidden_card)
+    count_card(dealer_hand, hidden_card, -1)
+    count_card(dealer_hand, dealer_cards[1])
+    dealer_values = util.hand_values(dealer_hand)
+
+    while util.dealer_should_hit(dealer_values, rules["soft_17_hit"]):
+        hit(table, dealer_hand)
+        dealer_values = util.hand_values(dealer_hand)
+
+    ## Results (start_game) ##
+    profit = 0
+    for hand in user_hands:
+        profit += util.hand_return(util.hand_values(hand), dealer_values, hand.bet)
+
+    table.balance += profit
+    end_round(table)
+
+    return profit - total_bet
+
+
+class Policy:
+    '''Base class of policies that can decide for many hands at once.
+
+    A request is a tuple of (hand, upcard, choices, shoe), the arguments
+    a policy function is called with. Subclasses override decide,
+    decide_batch, or both; each is implemented using the other.
+    Instances are callable like policy functions.
+    '''
+
+    def decide(self, hand: models.Hand, upcard: int, choices: [str], shoe: models.Shoe) -> str:
+        '''Return the decision from choices for hand against upcard.'''
+
+        return self.decide_batch([(hand, upcard, choices, shoe)])[0]
+
+    def decide_batch(self, requests: [tuple]) -> [str]:
+        '''Return the decision for every request in requests, in order.'''
+
+        return [self.decide(*request) for request in requests]
+
+    def __call__(self, hand: models.Hand, upcard: int, choices: [str], shoe: models.Shoe) -> str:
+        return self.decide(hand, upcard, choices, shoe)
+
+
+def decide_batch(policy, requests: [tuple]) -> [str]:
+    '''Return the decision of policy for every request in requests, with a
+    single call if policy can decide a batch (see Policy), or with one
+    call per request if it is a policy function.'''
+
+    batch = getattr(policy, "decide_batch", None)
+
+    if batch is not None:
+        return batch(requests)
+
+    return [policy(*request) for request in requests]
+
+
+def policy_shoe(table: models.Table) -> models.Shoe:
+    '''Return the shoe of table given to policies, or None in true random mode.'''
+
+    if table.rules["true_random"] == True:
+        return None
+
+    return table.shoe
+
+
+def play_round(table: models.Table, policy, initial_bet: float, expected_dealer: bool=False) -> float:
+    '''Play a single round at table with initial_bet, asking policy for
+    every decision, and return the net outcome of the round for the user
+    (see round_flow for expected_dealer).'''
+
+    flow = round_flow(table, initial_bet, expected_dealer=expected_dealer)
+    table_shoe = policy_shoe(table)
+
+    try:
+        hand, dealer_hand, choices = next(flow)
+
+        while True:
+            hand, dealer_hand, choices = flow.send(policy(hand, dealer_hand.cards[0], choices, table_shoe))
+    except StopIteration as result:
+        return result.value
+
+
+def record_round(table: models.Table, policy, initial_bet: float) -> history.Record:
+    '''Play a single round at table with initial_bet exactly like
+    play_round, and return its history record.'''
+
+    if table.rules["true_random"] == True:
+        shoe_position = history.NO_POSITION
+    else:
+        shoe_position = table.shoe.cursor
+
+    record = history.Record(shoe_position, table.balance, initial_bet, history.rule_flags(table.rules))
+
+    table.dealt = record.cards
+    table_shoe = policy_shoe(table)
+    user_hands = []
+    flow = round_flow(table, initial_bet, user_hands)
+
+    try:
+        hand, dealer_hand, choices = next(flow)
+
+        while True:
+            decision = policy(hand, dealer_hand.cards[0], choices, table_shoe)
+            record.decisions.append(decision)
+            hand, dealer_hand, choices = flow.send(decision)
+    except StopIteration as result:
+        record.net = result.value
+
+    table.dealt = None
+    record.hands = [dealer_hand.cards] + [hand.cards for hand in user_hands]
+
+    return record
+
+
+class _ExhaustedRandom:
+    '''Stand-in random number generator of a replayed shoe, which is
+    only ever asked to shuffle once every recorded card has been drawn.'''
+
+    def shuffle(self, cards):
+        raise history.HistoryError("The round drew more cards than were recorded.")
+
+
+def replay_round(record: history.Record) -> (float, models.Hand, [models.Hand]):
+    '''Replay the round of record through round_flow, dealing the recorded
+    cards in order and sending the recorded decisions, without any output.
+    Return the net outcome, the dealer's hand, and the user's hands.
+
+    Raises history.HistoryError if a recorded decision was not available
+    or if the round does not use exactly the recorded cards and decisions.
+    '''
+
+    rules = history.rules_from_flags(record.rules)
+
+    # The recorded cards are dealt in order, even if they were drawn at random
+    rules["true_random"] = False
+
+    scripted_shoe = models.Shoe(record.cards, len(record.cards), _ExhaustedRandom(), 1)
+    table = models.Table(rules, None, record.balance, scripted_shoe)
+
+    user_hands = []
+    flow = round_flow(table, record.initial_bet, user_hands)
+    decisions = iter(record.decisions)
+
+    try:
+        hand, dealer_hand, choices = next(flow)
+
+        while True:
+            decision = next(decisions, None)
+
+            if decision not in choices:
+                raise history.HistoryError(f"The recorded decision {decision!r} is not one of {choices}.")
+
+            hand, dealer_hand, choices = flow.send(decision)
+    except StopIteration as result:
+        net = result.value
+
+    if next(decisions, None) is not None:
+        raise history.HistoryError("The round ended before every recorded decision was made.")
+
+    if scripted_shoe.cursor != len(record.cards):
+        raise history.HistoryError("The round ended before every recorded card was drawn.")
+
+    return net, dealer_hand, user_hands
+
+
+def audit_history(path: str) -> dict:
+    '''Replay every round in the history file at path and check that
+    its net outcome and final hands match the recorded ones. Return the
+    results as a dictionary, including the index of every round that
+    does not match (in 'mismatches') or does not replay (in 'errors').'''
+
+    rounds = 0
+    net = 0.0
+    mismatches = []
+    errors = []
+    start = time.perf_counter()
+
+    for index, record in enumerate(history.read_records(path)):
+        rounds += 1
+        net += record.net
+
+        try:
+            replayed_net, dealer_hand, user_hands = replay_round(record)
+        except history.HistoryError:
+            errors.append(index)
+            continue
+
+        # The hole card is only revealed when the dealer plays
+        replayed_hands = [[packed.reveal(card) for card in hand.cards] for hand in [dealer_hand] + user_hands]
+        recorded_hands = [[packed.reveal(card) for card in cards] for cards in record.hands]
+
+        if replayed_net != record.net or replayed_hands != recorded_hands:
+            mismatches.append(index)
+
+    elapsed = time.perf_counter() - start
+
+    return {
+        "rounds": rounds,
+        "net": net,
+        "mismatches": mismatches,
+        "errors": errors,
+        "seconds": elapsed,
+        "rounds_per_second": rounds / elapsed if elapsed > 0 else math.inf,
+    }
+
+
+def simple_policy(hand: models.Hand, upcard: int, choices: [str], shoe: models.Shoe=None) -> str:
+    '''Return a reasonable decision from choices for hand against the
+    packed upcard using a handful of well-known rules of thumb.
+
+    The policy splits aces and eights, doubles on 10 and 11, forfeits
+    16 against a 10 or an ace, and otherwise stands on 17 or more
+    (or on 13 or more against a weak dealer card).
+    '''
+
+    cards = hand.cards
+
+    if "sp" in choices and packed.CARD_RANKS[cards[0]] in SPLIT_RANKS:
+        return "sp"
+
+    if 'h' not in choices:
+        return 's'
+
+    value = max(util.hand_values(hand))
+    dealer_value = packed.CARD_VALUES[upcard]
+
+    if dealer_value == 1:
+        dealer_value = 11
+
+    if 'd' in choices and value in (10, 11):
+        return 'd'
+
+    if 'f' in choices and value == 16 and dealer_value in (10, 11):
+        return 'f'
+
+    if value >= 17 or (value >= 13 and dealer_value <= 6):
+        return 's'
+
+    return 'h'
+
+
+def simulate(rounds: int, rules: dict=None, policy=simple_policy, seed: int=None, initial_bet: float=10.0, history_writer: history.HistoryWriter=None, expected_dealer: bool=False) -> dict:
+    '''Play rounds rounds on a new table with rules (or the default settings)
+    using policy for every decision, and return the results as a dictionary.
+
+    The results contain the number of rounds, the net outcome, the sum of
+    the squared outcomes, the house edge as a fraction of the initial bet,
+    the elapsed seconds, and the rounds played per second.
+
+    If history_writer is given, the record of every round is written to it.
+
+    If expected_dealer is true in true random mode, the dealer's turn is
+    replaced by its closed-form outcome (see round_flow), which is faster
+    and lowers the variance of the results without changing their mean.
+    Rounds settled that way cannot be recorded.
+    '''
+
+    if rules is None:
+        rules = rules_from_settings(main.settings)
+
+    if history_writer is not None and expected_dealer:
+        raise ValueError("Rounds settled at their expected outcome cannot be recorded.")
+
+    table = new_table(rules, seed)
+
+    net = 0.0
+    net_squared = 0.0
+    start = time.perf_counter()
+
+    for _ in range(rounds):
+        if history_writer is None:
+            outcome = play_round(table, policy, initial_bet, expected_dealer)
+        else:
+            record = record_round(table, policy, initial_bet)
+            history_writer.write(record)
+            outcome = record.net
+
+        net += outcome
+        net_squared += outcome * outcome
+
+    elapsed = time.perf_counter() - start
+
+    return summarize(rounds, net, net_squared, initial_bet, elapsed)
+
+
+def simulate_batch(rounds: int, rules: dict=None, policy=simple_policy, seed: int=None, initial_bet: float=10.0, tables: int=BATCH_TABLES, expected_dealer: bool=False) -> dict:
+    '''Play rounds rounds spread over tables tables with rules (or the default
+    settings) in lockstep, and return the results in the same form as simulate.
+
+    At every step, the pending decision of every table is collected into a
+    single batch and decided with one call to policy (see decide_batch), so
+    a policy deciding a batch at once costs one call per step instead of one
+    call per decision. A table starts its next round as soon as its previous
+    one is over, until rounds rounds have been started.
+
+    Each table plays on its own stream of seed, numbered by the table.
+    The results are identical for a given seed and number of tables. If seed
+    is None, a random master seed is chosen, and it is included in the results
+    as "seed" either way, along with the number of tables and of policy calls.
+    See simulate for expected_dealer.
+    '''
+
+    if rules is None:
+        rules = rules_from_settings(main.settings)
+
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+
+    net = 0.0
+    net_squared = 0.0
+    calls = 0
+    start = time.perf_counter()
+
+    # The table, round, and pending request of every table playing a round
+    active_tables = [new_table(rules, seed, stream=number) for number in range(min(tables, rounds))]
+    flows = []
+    requests = []
+
+    for table in active_tables:
+        flow = round_flow(table, initial_bet, expected_dealer=expected_dealer)
+        hand, dealer_hand, choices = next(flow)
+
+        flows.append(flow)
+        requests.append((hand, dealer_hand.cards[0], choices, policy_shoe(table)))
+
+    started = len(active_tables)
+
+    while requests:
+        decisions = decide_batch(policy, requests)
+        calls += 1
+
+        next_tables = []
+        next_flows = []
+        next_requests = []
+
+        for table, flow, decision in zip(active_tables, flows, decisions):
+            try:
+                hand, dealer_hand, choices = flow.send(decision)
+            except StopIteration as result:
+                net += result.value
+                net_squared += result.value * result.value
+
+                if started == rounds:
+                    continue
+
+                started += 1
+                flow = round_flow(table, initial_bet, expected_dealer=expected_dealer)
+                hand, dealer_hand, choices = next(flow)
+
+            next_tables.append(table)
+            next_flows.append(flow)
+            next_requests.append((hand, dealer_hand.cards[0], choices, policy_shoe(table)))
+
+        active_tables = next_tables
+        flows = next_flows
+        requests = next_requests
+
+    elapsed = time.perf_counter() - start
+
+    results = summarize(rounds, net, net_squared, initial_bet, elapsed)
+    results["seed"] = seed
+    results["tables"] = min(tables, rounds)
+    results["policy_calls"] = calls
+
+    return results
+
+
+def summarize(rounds: int, net: float, net_squared: float, initial_bet: float, elapsed: float) -> dict:
+    '''Return the results dictionary of a simulation of rounds rounds with the
+    net outcome net, the sum of squared outcomes net_squared, and initial_bet,
+    which took elapsed seconds.'''
+
+    return {
+        "rounds": rounds,
+        "net": net,
+        "net_squared": net_squared,
+        "house_edge": -net / (rounds * initial_bet) if rounds else 0.0,
+        "seconds": elapsed,
+        "rounds_per_second": rounds / elapsed if elapsed > 0 else math.inf,
+    }
+
+
+def worker_seed(seed: int, worker: int) -> int:
+    '''Derive and return the seed of the worker numbered worker from the master
+    seed, so that every worker has its own independent random number generator.
+
+    The derivation only depends on its arguments, so it is the same on every run and platform.
+    '''
+
+    digest = hashlib.sha256(f"{seed}:{worker}".encode()).digest()
+
+    return int.from_bytes(digest[:8], "big")
+
+
+def simulate_parallel(rounds: int, rules: dict=None, policy=simple_policy, seed: int=None, initial_bet: float=10.0, workers: int=None, expected_dealer: bool=False) -> dict:
+    '''Shard rounds rounds across a pool of workers processes (every core by
+    default), each playing on its own table with its own shoe and a random
+    number generator seeded by worker_seed, and return the merged results
+    in the same form as simulate.
+
+    The policy must be picklable (such as a module-level function). The merged
+    results (apart from the timings) are bit-identical for a given seed and
+    number of workers. If seed is None, a random master seed is chosen,
+    and it is included in the results as "seed" either way.
+    See simulate for expected_dealer.
+    '''
+
+    if rules is None:
+        rules = rules_from_settings(main.settings)
+
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+
+    # Spread the remainder over the first workers
+    tasks = []
+    for worker in range(workers):
+        worker_rounds = rounds // workers + (1 if worker < rounds % workers else 0)
+        tasks.append((worker_rounds, rules, policy, worker_seed(seed, worker), initial_bet, None, expected_dealer))
+
+    start = time.perf_counter()
+
+    with multiprocessing.Pool(workers) as pool:
+        worker_results = pool.starmap(simulate, tasks)
+
+    elapsed = time.perf_counter() - start
+
+    # Merge in worker order so the floating point sums are always identical
+    net = 0.0
+    net_squared = 0.0
+    for result in worker_results:
+        net += result["net"]
+        net_squared += result["net_squared"]
+
+    results = summarize(rounds, net, net_squared, initial_bet, elapsed)
+    results["seed"] = seed
+    results["workers"] = workers
+
+    return results
+
+
+def parse_bool(text: str) -> bool:
+    '''Convert text such as "1", "true", "0", or "false" to a boolean.'''
+
+    text = text.lower()
+
+    if text in ("1", "true", "yes", "y"):
+        return True
+    elif text in ("0", "false", "no", "n"):
+        return False
+
+    raise argparse.ArgumentTypeError(f"Expected a boolean value, got '{text}'.")
+
+
+def add_rule_arguments(parser: argparse.ArgumentParser):
+    '''Add an option to parser for each rule in the settings, defaulting
+    to the default value of that setting.'''
+
+    for name, value in rules_from_settings(main.settings).items():
+        parser.add_argument(
+            f"--{name}",
+            type=parse_bool if type(value) is bool else int,
+            default=value,
+            # argparse formats help with %, so a literal one must be escaped
+            help=main.settings[name]["display_name"].replace("%", "%%")
+        )
+
+
+def rules_from_arguments(args: argparse.Namespace) -> dict:
+    '''Return the rules given by the options added with add_rule_arguments.'''
+
+    rules = {}
+
+    for name in rules_from_settings(main.settings):
+        rules[name] = getattr(args, name)
+
+    return rules
+
+
+def main_cli():
+    '''Parse the command line arguments, run the simulation, and display the results.'''
+
+    parser = argparse.ArgumentParser(description="Simulate Blackjack rounds without any input or output.")
+    parser.add_argument("--rounds", type=int, default=100000, help="number of rounds to play")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random number generator")
+    parser.add_argument("--bet", type=float, default=10.0, help="initial bet of each round")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes (0 for every core)")
+    parser.add_argument("--tables", type=int, default=1, help="number of tables played in lockstep with batched decisions (with one worker)")
+    parser.add_argument("--history", help="append the record of every round to this history file (with one worker)")
+    parser.add_argument("--expected-dealer", action="store_true", help="in true random mode, settle every round at its closed-form expected outcome instead of playing the dealer's turn")
+    parser.add_argument("--audit", help="replay every round in this history file and check its payouts instead of simulating")
+    add_rule_arguments(parser)
+
+    args = parser.parse_args()
+    rules = rules_from_arguments(args)
+
+    if args.audit is not None:
+        results = audit_history(args.audit)
+
+        print(f"Rounds: {results['rounds']}")
+        print(f"Recorded net outcome: ${results['net']:.2f}")
+        print(f"Mismatched rounds: {len(results['mismatches'])}")
+        print(f"Rounds that could not be replayed: {len(results['errors'])}")
+        print(f"Elapsed: {results['seconds']:.2f}s")
+        print(f"Rounds per second: {results['rounds_per_second']:.0f}")
+
+        return
+
+    if args.history is not None:
+        if args.workers != 1:
+            parser.error("--history can only be used with one worker")
+
+        if args.expected_dealer:
+            parser.error("--history cannot be used with --expected-dealer")
+
+        with history.HistoryWriter(args.history) as history_writer:
+            results = simulate(args.rounds, rules, seed=args.seed, initial_bet=args.bet, history_writer=history_writer)
+    elif args.tables > 1:
+        if args.workers != 1:
+            parser.error("--tables can only be used with one worker")
+
+        results = simulate_batch(args.rounds, rules, seed=args.seed, initial_bet=args.bet, tables=args.tables, expected_dealer=args.expected_dealer)
+
+        print(f"Tables: {results['tables']} (master seed {results['seed']}), policy calls: {results['policy_calls']}")
+    elif args.workers == 1:
+        results = simulate(args.rounds, rules, seed=args.seed, initial_bet=args.bet, expected_dealer=args.expected_dealer)
+    else:
+        results = simulate_parallel(args.rounds, rules, seed=args.seed, initial_bet=args.bet, workers=args.workers, expected_dealer=args.expected_dealer)
+
+        print(f"Workers: {results['workers']} (master seed {results['seed']})")
+
+    print(f"Rounds: {results['rounds']}")
+    print(f"Net outcome: ${results['net']:.2f}")
+    print(f"House edge: {results['house_edge'] * 100:.3f}%")
+    print(f"Elapsed: {results['seconds']:.2f}s")
+    print(f"Rounds per second: {results['rounds_per_second']:.0f}")
+
+
+if __name__ == "__main__":
+    main_cli()
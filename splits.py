@@ -0,0 +1,203 @@
+'''Contain an exact calculator for the EV of splitting a pair under the
+rules of this game: splitting halves the bet between both hands, each split
+hand receives exactly one more card, and a split hand whose new card has the
+same rank as the pair may be split again, halving its bet once more, with no
+limit other than the cards in the shoe. A split hand never doubles or
+surrenders, and can never bust.
+
+The user's cards are drawn from a composition (see odds.py), and every hand is
+settled against the dealer's outcomes for the composition left once every
+split hand is complete. Since the dealer's hidden card is never seen before
+then, it is treated as one of the cards left, which is exact.
+
+A subgame is the composition left and the queue of split hands still waiting
+for their card, each with its bet. The EV of every subgame is computed once
+and memoized, along with the expected distribution of the dealer's outcomes
+at its end, so the hands already completed before it can be settled
+without walking it again. Resplits are decided by what maximizes the EV of the
+hands still in the queue.
+'''
+
+
+__author__ = "U Ahsan"
+
+
+import odds
+
+
+## Constants ##
+# The resplits allowed by default. The game never caps resplits, but every
+# resplit allowed multiplies the number of subgames, while each one changes
+# the EV about a tenth as much as the one before it. In a 6-deck shoe, the
+# second resplit changes the EV of A,A by up to 0.005 of the bet and the
+# third by up to 0.0006, so past this cap the EV is within about 0.0001 of
+# the uncapped EV (see test_splits.py).
+DEFAULT_MAX_RESPLITS = 3
+
+# PAYOFFS[total] is the payoff of standing on total against each dealer
+# outcome in odds.OUTCOMES, in units of the bet.
+PAYOFFS = []
+
+for _total in range(22):
+    PAYOFFS.append(tuple(
+        1.0 if outcome == "bust" or _total > outcome else (-1.0 if _total < outcome else 0.0)
+        for outcome in odds.OUTCOMES
+    ))
+
+del _total
+
+
+def best_total(hard_value: int, has_ace: bool) -> int:
+    '''Return the best hand value of a hand with hard_value and has_ace.'''
+
+    if has_ace and hard_value + 10 <= 21:
+        return hard_value + 10
+
+    return hard_value
+
+
+def infinite_split_ev(pair_value: int, upcard_value: int, soft_17_hit: bool) -> float:
+    '''Return the EV of splitting a pair of pair_value against upcard_value,
+    with unlimited resplits, when every card is drawn from an infinite deck
+    (as in true random mode).
+
+    The composition never changes, so every split hand is worth the same
+    per unit of bet, whatever the others draw, and the EV has a closed form.
+    '''
+
+    probabilities = odds.INFINITE_PROBABILITIES
+    stand_evs = odds.INFINITE_STAND_EVS[soft_17_hit][upcard_value]
+
+    same_rank_probability = probabilities[pair_value] / (4 if pair_value == 10 else 1)
+    same_rank_stand = stand_evs[best_total(2 * pair_value, pair_value == 1)]
+
+    # The EV of a hand drawing a card of another rank
+    other = 0.0
+    for value in odds.VALUES:
+        other += probabilities[value] * stand_evs[best_total(pair_value + value, pair_value == 1 or value == 1)]
+
+    other -= same_rank_probability * same_rank_stand
+
+    # Resplitting every time makes the EV x of a split hand (per unit of its bet)
+    # satisfy x = other + q * x, since both halves are worth x each
+    resplit = other / (1 - same_rank_probability)
+
+    return max(resplit, other + same_rank_probability * same_rank_stand)
+
+
+class _Subgames:
+    '''The memoized subgames of splitting a single pair against a single upcard.'''
+
+    __slots__ = ("pair_value", "upcard_value", "soft_17_hit", "memo")
+
+    def __init__(self, pair_value: int, upcard_value: int, soft_17_hit: bool):
+        self.pair_value = pair_value
+        self.upcard_value = upcard_value
+        self.soft_17_hit = soft_17_hit
+        self.memo = {}
+
+    def solve(self, signature: int, total: int, queue: tuple, resplits_left: int) -> (float, tuple):
+        '''Return the EV of the hands in queue (a tuple holding the number
+        of times the bet of each hand waiting for its card has been halved,
+        in the order they are dealt to) drawing from the composition
+        signature of total cards, and the expected probability of each
+        final dealer total once they are complete.'''
+
+        key = (signature, queue, resplits_left)
+        result = self.memo.get(key)
+
+        if result is not None:
+            return result
+
+        if not queue:
+            result = (0.0, odds.dealer_signature_probabilities(self.upcard_value, signature, self.soft_17_hit))
+            self.memo[key] = result
+
+            return result
+
+        # Treat an exhausted composition as a reshuffle into a fresh deck
+        if total == 0:
+            signature = odds.FRESH_DECK
+            total = odds.signature_total(signature)
+
+        pair_value = self.pair_value
+        halvings = queue[0]
+        bet = 0.5 ** halvings
+        rest = queue[1:]
+
+        ev = 0.0
+        dealer = [0.0] * len(odds.OUTCOMES)
+
+        for value in odds.VALUES:
+            count = odds.signature_count(signature, value)
+
+            if count == 0:
+                continue
+
+            probability = count / total
+            next_signature = signature - odds.UNITS[value]
+
+            rest_ev, rest_dealer = self.solve(next_signature, total - 1, rest, resplits_left)
+            payoffs = PAYOFFS[best_total(pair_value + value, pair_value == 1 or value == 1)]
+            stand_ev = rest_ev
+
+            for i, payoff in enumerate(payoffs):
+                stand_ev += bet * payoff * rest_dealer[i]
+
+            chosen_ev = stand_ev
+            chosen_dealer = rest_dealer
+            same_rank_probability = 0.0
+
+            if value == pair_value:
+                # Only a card of the same rank (not just the same value) can be split again
+                same_rank_probability = probability / 4 if value == 10 else probability
+
+                if resplits_left > 0:
+                    resplit_queue = (halvings + 1,) + rest + (halvings + 1,)
+                    resplit_ev, resplit_dealer = self.solve(next_signature, total - 1, resplit_queue, resplits_left - 1)
+
+                    if resplit_ev > stand_ev:
+                        chosen_ev = resplit_ev
+                        chosen_dealer = resplit_dealer
+
+            other_probability = probability - same_rank_probability
+            ev += other_probability * stand_ev + same_rank_probability * chosen_ev
+
+            for i in range(len(dealer)):
+                dealer[i] += other_probability * rest_dealer[i] + same_rank_probability * chosen_dealer[i]
+
+        result = (ev, tuple(dealer))
+        self.memo[key] = result
+
+        return result
+
+
+def split_ev(pair_value: int, upcard_value: int, counts: [int], soft_17_hit: bool, max_resplits: int=DEFAULT_MAX_RESPLITS, deplete: bool=True) -> float:
+    '''Return the exact EV, in units of the initial bet, of splitting a pair
+    of pair_value against upcard_value, drawing from counts (the number of
+    cards left of each value, indexed by value), or from an infinite deck if
+    counts is None. At most max_resplits resplits are made in a shoe (no
+    limit if None, which is only practical for a single deck), and there
+    is no limit for an infinite deck.
+
+    If deplete is true, the pair and the upcard are removed from counts first.
+    '''
+
+    if counts is None:
+        return infinite_split_ev(pair_value, upcard_value, soft_17_hit)
+
+    counts = list(counts)
+
+    if deplete:
+        counts[pair_value] -= 2
+        counts[upcard_value] -= 1
+
+    if max_resplits is None:
+        max_resplits = counts[pair_value]
+
+    signature = sum(odds.UNITS[value] * counts[value] for value in odds.VALUES)
+    subgames = _Subgames(pair_value, upcard_value, soft_17_hit)
+
+    ev, _ = subgames.solve(signature, sum(counts[1:]), (1, 1), max_resplits)
+
+    return ev
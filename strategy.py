@@ -0,0 +1,589 @@
+'''Generate basic strategy tables containing the expected value (EV) of
+every decision and the optimal decision for every starting hand against
+every dealer upcard, under a given set of rules.
+
+The EVs are measured in units of the initial bet and follow the rules of
+this game: a win pays even money (including a two-card 21), the dealer
+never peeks for blackjack, doubling and surrendering are only allowed on
+the first decision, and splitting halves the bet between both hands, each
+of which receives exactly one more card (and may be split again if that
+card has the same rank).
+
+Each cell averages over every two-card combination that makes the hand,
+weighted by how likely it is to be dealt. The dealer's outcomes come from
+the exact calculator in odds.py using the shoe with the user's cards and
+the upcard removed. The user's own draws are taken from that same
+composition without further removal. Splits use a closed form that
+assumes every split hand draws from that same composition, or, for exact
+tables, the exact split engine in splits.py with at most EXACT_SPLIT_RESPLITS
+resplits. In true random mode, every card is
+drawn from an infinite deck, so the dealer's outcomes are read from
+odds.INFINITE_DEALER and nothing is ever removed.
+
+Generated tables are cached on disk as JSON, keyed by a hash of the rule
+values, so loading a table for a rule set that was already generated
+only takes a few milliseconds.
+'''
+
+
+__author__ = "U Ahsan"
+
+
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import time
+
+import models
+import odds
+import packed
+import simulation
+import splits
+
+
+## Constants ##
+ACTIONS = ['h', 's', 'd', "sp", 'f']
+
+# The rules that affect a strategy table. The penetration does not,
+# since every cell is computed from the top of the shoe.
+STRATEGY_RULES = ["deck_count", "soft_17_hit", "doubling", "splitting", "surrendering", "true_random"]
+
+# The values each rule can take when generating every table.
+RULE_CHOICES = {
+    "deck_count": list(range(1, 13)),
+    "soft_17_hit": [False, True],
+    "doubling": [False, True],
+    "splitting": [False, True],
+    "surrendering": [False, True],
+    "true_random": [False, True],
+}
+
+# Increase this whenever the EV model changes so stale cached tables are ignored.
+TABLE_VERSION = 3
+
+# The resplits allowed by the split engine for exact tables. The game does
+# not cap resplits, but this keeps generating a 6-deck table to about two
+# minutes, and the split EVs stay within about 0.001 of the bet of the
+# uncapped ones (see splits.DEFAULT_MAX_RESPLITS).
+EXACT_SPLIT_RESPLITS = 2
+
+UPCARDS = odds.VALUES
+
+CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "strategy")
+
+# The EVs of every action for each (deck_count, soft_17_hit, true_random, exact_splits),
+# shared between rule sets that only differ in which actions are allowed.
+_generated_evs = {}
+
+
+def strategy_rules(rules: dict) -> dict:
+    '''Return only the rules in rules that affect a strategy table.'''
+
+    return {name: rules[name] for name in STRATEGY_RULES}
+
+
+def rule_key(rules: dict, exact_splits: bool=False) -> str:
+    '''Return a hash of the values of the rules that affect a strategy table,
+    and whether its splits are exact, used as the name of the table's cache file.'''
+
+    key = [TABLE_VERSION, strategy_rules(rules)]
+
+    if exact_splits:
+        key.append("exact_splits")
+
+    encoded = json.dumps(key, sort_keys=True)
+
+    return hashlib.sha256(encoded.encode()).hexdigest()[:24]
+
+
+def best_total(hard_value: int, has_ace: bool) -> int:
+    '''Return the best hand value of a hand with hard_value and has_ace.'''
+
+    if has_ace and hard_value + 10 <= 21:
+        return hard_value + 10
+
+    return hard_value
+
+
+def stand_ev(total: int, dealer: tuple) -> float:
+    '''Return the EV of standing on total against dealer, a tuple of the
+    probability of each final dealer total in odds.OUTCOMES.'''
+
+    if total > 21:
+        return -1.0
+
+    ev = dealer[odds.BUST_INDEX]
+
+    for i in range(odds.BUST_INDEX):
+        dealer_total = odds.OUTCOMES[i]
+
+        if total > dealer_total:
+            ev += dealer[i]
+        elif total < dealer_total:
+            ev -= dealer[i]
+
+    return ev
+
+
+def _best_ev(hard_value: int, has_ace: bool, probabilities: [float], dealer: tuple, memo: dict) -> float:
+    '''Return the EV of playing on optimally (hitting or standing)
+    with a hand of hard_value and has_ace.'''
+
+    if hard_value > 21:
+        return -1.0
+
+    key = (hard_value, has_ace)
+
+    if key not in memo:
+        stand = stand_ev(best_total(hard_value, has_ace), dealer)
+        memo[key] = max(stand, _hit_ev(hard_value, has_ace, probabilities, dealer, memo))
+
+    return memo[key]
+
+
+def _hit_ev(hard_value: int, has_ace: bool, probabilities: [float], dealer: tuple, memo: dict) -> float:
+    '''Return the EV of hitting once, then playing on optimally,
+    with a hand of hard_value and has_ace.'''
+
+    ev = 0.0
+
+    for value in odds.VALUES:
+        if probabilities[value] > 0:
+            ev += probabilities[value] * _best_ev(hard_value + value, has_ace or value == 1, probabilities, dealer, memo)
+
+    return ev
+
+
+def _double_ev(hard_value: int, has_ace: bool, probabilities: [float], dealer: tuple) -> float:
+    '''Return the EV of doubling (drawing exactly one card on twice
+    the bet) with a hand of hard_value and has_ace.'''
+
+    ev = 0.0
+
+    for value in odds.VALUES:
+        new_hard_value = hard_value + value
+
+        if new_hard_value > 21:
+            ev -= probabilities[value]
+        else:
+            ev += probabilities[value] * stand_ev(best_total(new_hard_value, has_ace or value == 1), dealer)
+
+    return 2 * ev
+
+
+def _split_ev(pair_value: int, same_rank_probability: float, probabilities: [float], dealer: tuple) -> float:
+    '''Return the EV of splitting a pair of pair_value, where each split hand
+    draws one more card and is split again whenever that is better and the
+    card has the same rank (which happens with same_rank_probability).
+
+    Since the bet is halved between both hands, the EV of splitting in units
+    of the initial bet is the EV of a single split hand.
+    '''
+
+    no_resplit = 0.0
+
+    for value in odds.VALUES:
+        no_resplit += probabilities[value] * stand_ev(best_total(pair_value + value, pair_value == 1 or value == 1), dealer)
+
+    same_rank_stand = stand_ev(best_total(2 * pair_value, pair_value == 1), dealer)
+
+    # If splitting again is better than standing on a same-rank draw, the EV x
+    # of a split hand satisfies x = no_resplit - q * same_rank_stand + q * x.
+    if same_rank_probability < 1 and no_resplit > same_rank_stand:
+        return (no_resplit - same_rank_probability * same_rank_stand) / (1 - same_rank_probability)
+
+    return no_resplit
+
+
+def _combinations(deck_count: int) -> list:
+    '''Return a list of (kind, total, first_value, second_value, weight) for every
+    group of two-card starting hands, where kind is "hard", "soft", or "pair",
+    total is the hand's total (or the pair's value), and weight is proportional
+    to how likely the hand is to be dealt from deck_count fresh decks, or from
+    an infinite deck if deck_count is None.'''
+
+    if deck_count is None:
+        # Drawing with replacement, so n cards of a rank make n * n / 2 pairs
+        rank_count = 1
+        pair_count = lambda count: count * count / 2
+    else:
+        rank_count = 4 * deck_count
+        pair_count = lambda count: math.comb(count, 2)
+
+    combinations = []
+
+    for first_value, second_value in itertools.combinations_with_replacement(odds.VALUES, 2):
+        if first_value != second_value:
+            first_count = rank_count * (4 if first_value == 10 else 1)
+            second_count = rank_count * (4 if second_value == 10 else 1)
+            weight = first_count * second_count
+
+            if first_value == 1:
+                combinations.append(("soft", 11 + second_value, first_value, second_value, weight))
+            else:
+                combinations.append(("hard", first_value + second_value, first_value, second_value, weight))
+
+            continue
+
+        pair_weight = pair_count(rank_count)
+
+        if first_value == 10:
+            # Two different ten-value ranks (such as a Jack and a King) are not a pair.
+            combinations.append(("pair", 10, 10, 10, 4 * pair_weight))
+            combinations.append(("hard", 20, 10, 10, pair_count(4 * rank_count) - 4 * pair_weight))
+        else:
+            combinations.append(("pair", first_value, first_value, first_value, pair_weight))
+
+    return combinations
+
+
+def action_evs(first_value: int, second_value: int, upcard_value: int, counts: [int], soft_17_hit: bool, deplete: bool=True, exact_splits: bool=False) -> dict:
+    '''Return a dictionary of the EV of every action for a two-card hand of
+    first_value and second_value against upcard_value, drawing from counts
+    (the number of cards left of each value, indexed by value), or from an
+    infinite deck if counts is None.
+
+    If deplete is true, the user's cards and the upcard are removed from counts first.
+    The split EV is only included if both cards have the same value, and it
+    is computed with splits.split_ev if exact_splits is true.
+    '''
+
+    if counts is None:
+        probabilities = odds.INFINITE_PROBABILITIES
+        dealer = odds.INFINITE_DEALER[soft_17_hit][upcard_value]
+    else:
+        counts = list(counts)
+
+        if deplete:
+            counts[first_value] -= 1
+            counts[second_value] -= 1
+            counts[upcard_value] -= 1
+
+        total = sum(counts)
+        probabilities = [count / total for count in counts]
+
+        signature = sum(odds.UNITS[value] * counts[value] for value in odds.VALUES)
+        dealer = odds.dealer_signature_probabilities(upcard_value, signature, soft_17_hit)
+
+    pair_value = first_value if first_value == second_value else None
+    evs = hand_evs(first_value + second_value, first_value == 1 or second_value == 1, pair_value, probabilities, dealer)
+
+    # counts already has the pair and the upcard removed if deplete is true
+    if pair_value is not None and exact_splits:
+        evs["sp"] = splits.split_ev(pair_value, upcard_value, counts, soft_17_hit, EXACT_SPLIT_RESPLITS, deplete=False)
+
+    return evs
+
+
+def hand_evs(hard_value: int, has_ace: bool, pair_value: int, probabilities: [float], dealer: tuple) -> dict:
+    '''Return a dictionary of the EV of every action for a hand of hard_value
+    and has_ace (with any number of cards), drawing with probabilities (indexed
+    by value) against dealer, a tuple of the probability of each final dealer
+    total in odds.OUTCOMES.
+
+    The split EV is only included if pair_value (the value of a pair
+    of cards of the same rank) is not None.
+    '''
+
+    memo = {}
+
+    evs = {
+        'h': _hit_ev(hard_value, has_ace, probabilities, dealer, memo),
+        's': stand_ev(best_total(hard_value, has_ace), dealer),
+        'd': _double_ev(hard_value, has_ace, probabilities, dealer),
+        'f': -0.5,
+    }
+
+    if pair_value is not None:
+        # The chance of drawing the same rank (not just the same value) again
+        same_rank_probability = probabilities[pair_value]
+
+        if pair_value == 10:
+            same_rank_probability /= 4
+
+        evs["sp"] = _split_ev(pair_value, same_rank_probability, probabilities, dealer)
+
+    return evs
+
+
+def _generate_evs(deck_count: int, soft_17_hit: bool, true_random: bool, exact_splits: bool=False) -> dict:
+    '''Return a dictionary mapping (kind, total, upcard_value) to the weighted
+    average EV of every action for that cell, generating it only once
+    per (deck_count, soft_17_hit, true_random, exact_splits).
+
+    In true random mode, the deck count does nothing, and every
+    cell is computed in closed form for an infinite deck.
+    '''
+
+    if true_random:
+        deck_count = None
+
+    key = (deck_count, soft_17_hit, true_random, exact_splits)
+
+    if key in _generated_evs:
+        return _generated_evs[key]
+
+    if true_random:
+        counts = None
+    else:
+        counts = [0] + [4 * deck_count * (4 if value == 10 else 1) for value in odds.VALUES]
+
+    totals = {}
+    weights = {}
+
+    for kind, total, first_value, second_value, weight in _combinations(deck_count):
+        for upcard_value in UPCARDS:
+            evs = action_evs(first_value, second_value, upcard_value, counts, soft_17_hit, exact_splits=exact_splits)
+            cell = (kind, total, upcard_value)
+
+            cell_totals = totals.setdefault(cell, {})
+            weights[cell] = weights.get(cell, 0) + weight
+
+            for action, ev in evs.items():
+                cell_totals[action] = cell_totals.get(action, 0.0) + ev * weight
+
+    generated = {}
+
+    for cell, cell_totals in totals.items():
+        generated[cell] = {action: ev / weights[cell] for action, ev in cell_totals.items()}
+
+    _generated_evs[key] = generated
+
+    return generated
+
+
+def allowed_actions(kind: str, rules: dict) -> [str]:
+    '''Return the actions allowed on the first decision of a
+    starting hand of kind under rules.'''
+
+    actions = ['h', 's']
+
+    if kind == "pair" and rules["splitting"] == True:
+        actions.append("sp")
+
+    if rules["doubling"] == True:
+        actions.append('d')
+
+    if rules["surrendering"] == True:
+        actions.append('f')
+
+    return actions
+
+
+def generate_table(rules: dict, exact_splits: bool=False) -> dict:
+    '''Generate and return the strategy table for rules as a dictionary,
+    with exact split EVs (see splits.py) if exact_splits is true.
+
+    The table's "cells" map each kind of hand ("hard", "soft", or "pair") to
+    each total (or pair value) to each upcard value, as strings, and finally to
+    the cell's "decision" and the "ev" of every allowed action. An ace is 1.
+    '''
+
+    generated = _generate_evs(rules["deck_count"], rules["soft_17_hit"], rules["true_random"], exact_splits)
+
+    cells = {"hard": {}, "soft": {}, "pair": {}}
+
+    for (kind, total, upcard_value), evs in sorted(generated.items()):
+        allowed = {action: evs[action] for action in allowed_actions(kind, rules)}
+
+        cells[kind].setdefault(str(total), {})[str(upcard_value)] = {
+            "decision": max(allowed, key=allowed.get),
+            "ev": allowed,
+        }
+
+    return {
+        "version": TABLE_VERSION,
+        "rules": strategy_rules(rules),
+        "exact_splits": exact_splits,
+        "cells": cells,
+    }
+
+
+def cache_path(rules: dict, exact_splits: bool=False) -> str:
+    '''Return the path of the cache file of the strategy table for rules.'''
+
+    return os.path.join(CACHE_DIRECTORY, rule_key(rules, exact_splits) + ".json")
+
+
+def load_table(rules: dict, regenerate: bool=False, exact_splits: bool=False) -> dict:
+    '''Return the strategy table for rules (with exact splits if exact_splits
+    is true), loading it from the cache if it exists, or generating and
+    caching it otherwise.'''
+
+    path = cache_path(rules, exact_splits)
+
+    if not regenerate and os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+
+    table = generate_table(rules, exact_splits)
+
+    os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+
+    # Write to a temporary file first so a reader never sees a partial table
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        json.dump(table, file)
+
+    os.replace(temporary_path, path)
+
+    return table
+
+
+def every_rule_set(base_rules: dict) -> [dict]:
+    '''Return a list of base_rules combined with every combination of
+    the values in RULE_CHOICES.'''
+
+    rule_sets = []
+
+    for values in itertools.product(*RULE_CHOICES.values()):
+        rules = dict(base_rules)
+        rules.update(zip(RULE_CHOICES.keys(), values))
+        rule_sets.append(rules)
+
+    return rule_sets
+
+
+def lookup(table: dict, hand: models.Hand, upcard_value: int, choices: [str]) -> str:
+    '''Return the action from choices with the highest EV in table for hand,
+    which has the running totals kept by main.new_hand and packed cards,
+    against upcard_value.
+
+    Hands with more than two cards use the cell of a two-card hand with the
+    same total. If there is no such cell, the hand stands on 17 or more.
+    '''
+
+    cards = hand.cards
+    cells = table["cells"]
+    hard_value = hand.hard_value
+    has_ace = hand.ace_count > 0
+
+    if hand.card_count == 2 and packed.CARD_RANKS[cards[0]] == packed.CARD_RANKS[cards[1]]:
+        column = cells["pair"].get(str(min(packed.CARD_RANKS[cards[0]], 10)))
+    elif has_ace and hard_value + 10 <= 21:
+        column = cells["soft"].get(str(hard_value + 10))
+    else:
+        column = cells["hard"].get(str(hard_value))
+
+    if column is None:
+        return 's' if 's' in choices and best_total(hard_value, has_ace) >= 17 else choices[0]
+
+    evs = column[str(upcard_value)]["ev"]
+    available = [action for action in choices if action in evs]
+
+    return max(available, key=evs.get)
+
+
+class TablePolicy(simulation.Policy):
+    '''Policy playing every decision by looking it up in a strategy table.
+
+    A whole batch is decided in a single call, and the decision of every
+    distinct cell, upcard, and set of choices is cached, so most decisions
+    cost a single dictionary lookup. The policy is picklable, so it can be
+    used with simulation.simulate_parallel.
+    '''
+
+    def __init__(self, table: dict):
+        self.table = table
+        self.cache = {}
+
+    def decide(self, hand: models.Hand, upcard: int, choices: [str], shoe: models.Shoe=None) -> str:
+        cards = hand.cards
+        ranks = packed.CARD_RANKS
+        upcard_value = packed.CARD_VALUES[upcard]
+
+        # Only pairs, the hard value, and whether there is an ace affect the lookup
+        pair = hand.card_count == 2 and ranks[cards[0]] == ranks[cards[1]] and ranks[cards[0]]
+        key = (pair, hand.hard_value, hand.ace_count > 0, upcard_value, "".join(choices))
+
+        decision = self.cache.get(key)
+        if decision is None:
+            decision = self.cache[key] = lookup(self.table, hand, upcard_value, choices)
+
+        return decision
+
+    def decide_batch(self, requests: [tuple]) -> [str]:
+        # The same as decide, inlined for every request
+        table = self.table
+        cache = self.cache
+        ranks = packed.CARD_RANKS
+        values = packed.CARD_VALUES
+        decisions = []
+
+        for hand, upcard, choices, _ in requests:
+            cards = hand.cards
+            pair = hand.card_count == 2 and ranks[cards[0]] == ranks[cards[1]] and ranks[cards[0]]
+            key = (pair, hand.hard_value, hand.ace_count > 0, values[upcard], "".join(choices))
+
+            decision = cache.get(key)
+            if decision is None:
+                decision = cache[key] = lookup(table, hand, values[upcard], choices)
+
+            decisions.append(decision)
+
+        return decisions
+
+
+def table_policy(table: dict) -> TablePolicy:
+    '''Return a policy for simulation.play_round and simulation.simulate_batch
+    that plays every decision by looking it up in the strategy table.'''
+
+    return TablePolicy(table)
+
+
+def print_table(table: dict):
+    '''Display the decisions of table as a chart with a row for every
+    hand and a column for every upcard.'''
+
+    upcards = UPCARDS[1:] + UPCARDS[:1]
+    header = "".join(f"{packed.RANK_SYMBOLS[upcard]:>4}" for upcard in upcards)
+
+    for kind, cells in table["cells"].items():
+        print()
+        print(f"{kind.upper():<8}{header}")
+
+        for total, column in sorted(cells.items(), key=lambda item: int(item[0])):
+            label = packed.RANK_SYMBOLS[int(total)] if kind == "pair" else total
+            row = "".join(f"{column[str(upcard)]['decision']:>4}" for upcard in upcards)
+
+            print(f"{label:<8}{row}")
+
+
+def main_cli():
+    '''Parse the command line arguments, then generate (or load) and display
+    a strategy table, or generate every strategy table.'''
+
+    parser = argparse.ArgumentParser(description="Generate and cache Blackjack basic strategy tables.")
+    parser.add_argument("--all", action="store_true", help="generate the table of every combination of rules")
+    parser.add_argument("--regenerate", action="store_true", help="ignore cached tables")
+    parser.add_argument("--exact-splits", action="store_true", help="compute the EV of every split exactly (slow for large shoes)")
+    simulation.add_rule_arguments(parser)
+
+    args = parser.parse_args()
+    rules = simulation.rules_from_arguments(args)
+
+    if args.all:
+        rule_sets = every_rule_set(rules)
+        start = time.perf_counter()
+
+        for i, rule_set in enumerate(rule_sets):
+            load_table(rule_set, args.regenerate, args.exact_splits)
+            print(f"\r{i + 1}/{len(rule_sets)} tables ({time.perf_counter() - start:.1f}s)", end="", flush=True)
+
+        print()
+        return
+
+    start = time.perf_counter()
+    table = load_table(rules, args.regenerate, args.exact_splits)
+    elapsed = time.perf_counter() - start
+
+    print_table(table)
+    print()
+    print(f"Loaded in {elapsed * 1000:.1f}ms from {cache_path(rules, args.exact_splits)}")
+
+
+if __name__ == "__main__":
+    main_cli()
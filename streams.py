@@ -0,0 +1,248 @@
+'''Contain a seedable random number generator that generates its random
+numbers in large blocks and hands them out one at a time, for the card draws
+and shuffles of the game.
+
+A RandomStream is identified by a seed and a stream number, so every table
+can have its own independent stream derived from a single seed. Its random
+numbers form a fixed sequence of blocks: each block is generated from a seed
+derived from the seed, the stream number, and the block's number, so the
+stream can skip ahead to any position in constant time without generating
+the numbers before it.
+
+The blocks are generated with NumPy if it is installed, and with the
+random module otherwise. Each backend is reproducible on its own, but the
+two produce different sequences for the same seed.
+'''
+
+
+__author__ = "U Ahsan"
+
+
+import array
+import hashlib
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+## Constants ##
+# The number of random 32-bit integers generated at once.
+BLOCK_SIZE = 1024
+
+BACKENDS = ["numpy", "python"]
+DEFAULT_BACKEND = "numpy" if numpy is not None else "python"
+
+_WORD = 1 << 32
+_WORD_MASK = _WORD - 1
+
+
+def block_seed(seed: int, stream: int, block: int) -> int:
+    '''Derive and return the seed of the block numbered block of the stream
+    numbered stream from seed. The derivation only depends on its arguments,
+    so it is the same on every run and platform.'''
+
+    digest = hashlib.sha256(f"{seed}:{stream}:{block}".encode()).digest()
+
+    return int.from_bytes(digest[:8], "big")
+
+
+def _word_array() -> array.array:
+    '''Return an empty array of unsigned 32-bit integers (4 bytes each).'''
+
+    words = array.array('I')
+
+    if words.itemsize != 4:
+        words = array.array('L')
+
+    return words
+
+
+def generate_block(seed: int, size: int, backend: str=DEFAULT_BACKEND) -> array.array:
+    '''Return an array of size random 32-bit integers generated from seed with backend.
+
+    The block is kept as an array of 4-byte words rather than a list of
+    integer objects, so every stream (and so every table) only holds
+    4 bytes per random number.
+    '''
+
+    words = _word_array()
+
+    if backend == "numpy":
+        if numpy is None:
+            raise ValueError("The numpy backend needs NumPy, which is not installed.")
+
+        generator = numpy.random.Generator(numpy.random.PCG64(seed))
+        words.frombytes(generator.integers(0, _WORD, size, dtype=numpy.uint32).tobytes())
+
+        return words
+
+    words.frombytes(random.Random(seed).randbytes(words.itemsize * size))
+
+    return words
+
+
+class RandomStream:
+    '''A stream of random numbers generated in blocks (see the module docstring).
+
+    The stream can replace the random module or a random.Random instance
+    wherever the game only needs choice and shuffle, such as for a shoe
+    (see shoe.new_shoe) or a table (see simulation.new_table).
+    '''
+
+    __slots__ = ("seed", "stream", "block_size", "backend", "block", "values", "index")
+
+    def __init__(self, seed: int=None, stream: int=0, block_size: int=BLOCK_SIZE, backend: str=DEFAULT_BACKEND):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+
+        self.seed = seed
+        self.stream = stream
+        self.block_size = block_size
+        self.backend = backend
+        self.block = 0
+        self.values = generate_block(block_seed(seed, stream, 0), block_size, backend)
+        self.index = 0
+
+    def spawn(self, stream: int) -> "RandomStream":
+        '''Return a new, independent stream with the same seed,
+        block size, and backend, numbered stream.'''
+
+        return RandomStream(self.seed, stream, self.block_size, self.backend)
+
+    def position(self) -> int:
+        '''Return the number of random integers handed out so far.'''
+
+        return self.block * self.block_size + self.index
+
+    def seek(self, position: int):
+        '''Move the stream to position, so that the next random integer handed
+        out is the one at position, generating at most a single block.'''
+
+        block, self.index = divmod(position, self.block_size)
+
+        if block != self.block:
+            self.block = block
+            self.values = generate_block(block_seed(self.seed, self.stream, block), self.block_size, self.backend)
+
+    def skip(self, count: int):
+        '''Skip the next count random integers in constant time.'''
+
+        self.seek(self.position() + count)
+
+    def _next_block(self):
+        '''Move on to the next block.'''
+
+        self.block += 1
+        self.values = generate_block(block_seed(self.seed, self.stream, self.block), self.block_size, self.backend)
+        self.index = 0
+
+    def take(self, count: int) -> [int]:
+        '''Return a list of the next count random 32-bit integers.'''
+
+        taken = []
+
+        while count > 0:
+            if self.index == self.block_size:
+                self._next_block()
+
+            end = min(self.index + count, self.block_size)
+            taken.extend(self.values[self.index:end])
+
+            count -= end - self.index
+            self.index = end
+
+        return taken
+
+    def next_word(self) -> int:
+        '''Return the next random 32-bit integer.'''
+
+        if self.index == self.block_size:
+            self._next_block()
+
+        value = self.values[self.index]
+        self.index += 1
+
+        return value
+
+    def randbelow(self, n: int) -> int:
+        '''Return a random integer from 0 to n (exclusive), where
+        0 < n <= 2 ** 32, without any bias.
+
+        The integer is the high word of a random word times n, rejecting
+        the rare words that would make some results more likely (Lemire's method).
+        '''
+
+        if self.index == self.block_size:
+            self._next_block()
+
+        product = self.values[self.index] * n
+        self.index += 1
+
+        if (product & _WORD_MASK) < n:
+            product = self._reject(product, n)
+
+        return product >> 32
+
+    # randbelow takes the same single argument as random.randrange
+    randrange = randbelow
+
+    def _reject(self, product: int, n: int) -> int:
+        '''Return product, or the product of n and the next random words
+        until one is not rejected by randbelow.'''
+
+        threshold = (_WORD - n) % n
+
+        while (product & _WORD_MASK) < threshold:
+            product = self.next_word() * n
+
+        return product
+
+    def random(self) -> float:
+        '''Return a random float from 0 to 1 (exclusive) with 32 bits of precision.'''
+
+        return self.next_word() / _WORD
+
+    def choice(self, sequence):
+        '''Return a random item of the non-empty sequence.'''
+
+        return sequence[self.randbelow(len(sequence))]
+
+    def shuffle(self, items):
+        '''Shuffle the mutable sequence items in place with a Fisher-Yates shuffle.'''
+
+        # The same as calling randbelow(i + 1) for every i, reading the
+        # words from a list of just the ones needed (values[k] is word
+        # offset + k of the block), as each read of the array makes a new int
+        offset = self.index
+        values = self.values[offset:offset + len(items) - 1].tolist()
+        index = 0
+
+        for i in range(len(items) - 1, 0, -1):
+            if index == len(values):
+                self.index = offset + index
+
+                if self.index == self.block_size:
+                    self._next_block()
+
+                offset = self.index
+                values = self.values[offset:offset + i].tolist()
+                index = 0
+
+            n = i + 1
+            product = values[index] * n
+            index += 1
+
+            if (product & _WORD_MASK) < n:
+                self.index = offset + index
+                product = self._reject(product, n)
+                offset = self.index
+                values = self.values[offset:offset + i - 1].tolist()
+                index = 0
+
+            j = product >> 32
+            items[i], items[j] = items[j], items[i]
+
+        self.index = offset + index
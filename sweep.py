@@ -0,0 +1,451 @@
+'''Estimate the house edge of every combination of rules in the settings grid
+(every deck count crossed with every combination of the boolean rules), and
+how much each combination changes the edge from a baseline set of rules.
+
+Every variant is simulated with common random numbers: the rounds are grouped
+into segments, and segment number k of every variant starts from a freshly
+shuffled shoe dealt from the stream numbered k of the same seed (see
+streams.RandomStream). Each segment deals its shoe down to the cut card, like
+the game does, so the edges cover every depth of the shoe allowed by the
+penetration. In true random and continuous shuffling modes, there is no cut
+card and every round is dealt from the same cards, so each segment is a fixed
+number of rounds instead.
+
+Two variants dealing from the same cards (the same deck count, or both in
+true random mode) therefore deal the same cards until their decisions first
+differ, so the difference between their outcomes has a far lower variance
+than the difference between two independent simulations, and the standard
+error of their delta is measured from the paired segments. The cards stop
+lining up once the decisions differ, so the longer a segment, the smaller
+the reduction. The deltas of variants dealing from other cards than the
+baseline are not variance-reduced: they are compared as independent
+simulations.
+
+The segments of a shoe do not all have the same number of rounds, so the
+edges are ratio estimates (the net outcome over the total bet) whose
+standard errors are measured from the residual of every segment.
+
+Finished sweeps are cached on disk as JSON, keyed by a hash of their
+parameters, so asking for the same sweep again only reads the table.
+'''
+
+
+__author__ = "U Ahsan"
+
+
+import argparse
+import array
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import time
+
+import main
+import shoe
+import simulation
+import strategy
+import streams
+
+
+## Constants ##
+# Increase this whenever the simulation changes so stale cached sweeps are ignored.
+SWEEP_VERSION = 2
+
+DEFAULT_ROUNDS = 100000
+
+# The rounds of a segment in true random and continuous shuffling modes, whose
+# rounds do not depend on the depth of the shoe. Longer segments cost less to
+# set up, but their cards stop lining up sooner after the decisions of two
+# variants differ. 16 rounds gives the lowest variance of the deltas for a given time.
+DEFAULT_SEGMENT_ROUNDS = 16
+
+# The average number of cards dealt in a round, which turns the rounds to
+# play into a number of shoes dealt down to their cut card.
+ROUND_CARDS = 5.5
+
+# A fixed seed by default, so that a sweep is reproducible and can be cached.
+DEFAULT_SEED = 0
+
+CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "sweep")
+
+
+def strategy_policy(rules: dict) -> strategy.TablePolicy:
+    '''Return the policy playing the basic strategy table for rules.'''
+
+    return strategy.table_policy(strategy.load_table(rules))
+
+
+def simple_policy(rules: dict):
+    '''Return simulation.simple_policy, which is the same for every rule set.'''
+
+    return simulation.simple_policy
+
+
+# Functions returning the policy to play each rule set with, by name, so that
+# the workers only need the name and the cache key can include it.
+POLICIES = {
+    "strategy": strategy_policy,
+    "simple": simple_policy,
+}
+
+
+def sweep_rule_sets(base_rules: dict) -> [dict]:
+    '''Return every distinct rule set in the settings grid (see
+    strategy.RULE_CHOICES) with the other rules of base_rules.
+
+    The deck count does nothing in true random mode, so the rule sets
+    in true random mode all keep the deck count of base_rules.
+    '''
+
+    rule_sets = []
+    seen = set()
+
+    for rules in strategy.every_rule_set(base_rules):
+        if rules["true_random"] == True:
+            rules["deck_count"] = base_rules["deck_count"]
+
+        key = tuple(sorted(rules.items()))
+
+        if key not in seen:
+            seen.add(key)
+            rule_sets.append(rules)
+
+    return rule_sets
+
+
+def sweep_key(base_rules: dict, policy: str, rounds: int, segment_rounds: int, seed: int, initial_bet: float) -> str:
+    '''Return a hash of the parameters of a sweep, used as the name of its cache file.'''
+
+    encoded = json.dumps([SWEEP_VERSION, base_rules, policy, rounds, segment_rounds, seed, initial_bet], sort_keys=True)
+
+    return hashlib.sha256(encoded.encode()).hexdigest()[:24]
+
+
+def deals_to_cut(rules: dict) -> bool:
+    '''Return true if and only if the shoe of rules is dealt down to a cut
+    card, which is not the case in true random or continuous shuffling modes.'''
+
+    return rules["true_random"] != True and rules.get("continuous_shuffle", False) != True
+
+
+def same_cards(rules: dict, other_rules: dict) -> bool:
+    '''Return true if and only if rules and other_rules deal from the same cards,
+    so that their segments are paired by the common random numbers.'''
+
+    if rules["true_random"] == True or other_rules["true_random"] == True:
+        return rules["true_random"] == other_rules["true_random"]
+
+    return rules["deck_count"] == other_rules["deck_count"]
+
+
+def simulate_segments(rules: dict, policy: str, rounds: int, segment_rounds: int, seed: int, initial_bet: float) -> (array.array, array.array):
+    '''Play about rounds rounds in segments with rules and the policy named
+    policy (see POLICIES), and return the net outcome and the number of rounds
+    of every segment as arrays.
+
+    Each segment deals a shoe down to its cut card (reshuffling during its last
+    round, like the game), or plays segment_rounds rounds if the shoe has no
+    cut card (see deals_to_cut). The number of segments only depends on the
+    shoe, so every variant with the same cards plays the same number.
+
+    Segment number k always starts from a shoe shuffled from its original
+    order by the stream numbered k of seed, which gives every variant played
+    with the same seed the same cards (see the module docstring).
+    '''
+
+    table = simulation.new_table(rules, seed)
+    table_shoe = table.shoe
+    player_policy = POLICIES[policy](rules)
+    to_cut = deals_to_cut(rules)
+
+    if to_cut:
+        segments = max(2, math.ceil(rounds * ROUND_CARDS / table_shoe.cut))
+    else:
+        segments = max(2, math.ceil(rounds / segment_rounds))
+
+    # The order of the cards before every shuffle
+    original_cards = array.array('B', sorted(table_shoe.cards))
+
+    nets = array.array('d')
+    segment_counts = array.array('I')
+
+    for segment in range(segments):
+        table.rng = table_shoe.rng = streams.RandomStream(seed, segment)
+        table_shoe.cards[:] = original_cards
+        shoe.shuffle(table_shoe)
+
+        net = 0.0
+        played = 0
+        done = False
+
+        while not done:
+            cursor = table_shoe.cursor
+            net += simulation.play_round(table, player_policy, initial_bet)
+            played += 1
+
+            if to_cut:
+                # Stop at the cut card, or once the round reshuffled the shoe on reaching it
+                done = table_shoe.cursor >= table_shoe.cut or table_shoe.cursor < cursor
+            else:
+                done = played == segment_rounds
+
+        nets.append(net)
+        segment_counts.append(played)
+
+    return nets, segment_counts
+
+
+def _simulate_worker(arguments: tuple) -> (array.array, array.array):
+    '''Call simulate_segments with the tuple of arguments (for multiprocessing.Pool.imap).'''
+
+    return simulate_segments(*arguments)
+
+
+def variance(values) -> float:
+    '''Return the sample variance of values.'''
+
+    mean = math.fsum(values) / len(values)
+
+    return math.fsum((value - mean) ** 2 for value in values) / (len(values) - 1) if len(values) > 1 else 0.0
+
+
+def edge_residuals(nets: array.array, rounds: array.array, initial_bet: float) -> (float, [float]):
+    '''Return the house edge of the segments with the net outcomes nets and
+    numbers of rounds rounds, and the residual of every segment, whose variance
+    over the number of segments is the variance of the edge.'''
+
+    stake = math.fsum(rounds) * initial_bet
+    edge = -math.fsum(nets) / stake
+    mean_stake = stake / len(nets)
+
+    return edge, [(net + edge * count * initial_bet) / mean_stake for net, count in zip(nets, rounds)]
+
+
+def compare(nets: array.array, rounds: array.array, baseline_nets: array.array, baseline_rounds: array.array, initial_bet: float, paired: bool) -> dict:
+    '''Return the house edge and its standard error for the segments with
+    the net outcomes nets and numbers of rounds rounds, and its delta from the
+    house edge of the baseline segments with the standard error of the delta.
+
+    If paired is true, the segments were dealt the same cards as the baseline
+    segments (see same_cards), so the standard error of the delta is measured
+    from the paired segments, along with how many times lower its variance is
+    than with independent simulations. Otherwise, the variance reduction is None.
+    '''
+
+    edge, residuals = edge_residuals(nets, rounds, initial_bet)
+    baseline_edge, baseline_residuals = edge_residuals(baseline_nets, baseline_rounds, initial_bet)
+
+    edge_variance = variance(residuals) / len(residuals)
+    independent_variance = edge_variance + variance(baseline_residuals) / len(baseline_residuals)
+    reduction = None
+
+    if paired:
+        delta_variance = variance([residual - baseline_residual for residual, baseline_residual in zip(residuals, baseline_residuals)]) / len(residuals)
+
+        if delta_variance > 0:
+            reduction = independent_variance / delta_variance
+    else:
+        delta_variance = independent_variance
+
+    return {
+        "rounds": int(math.fsum(rounds)),
+        "house_edge": edge,
+        "standard_error": math.sqrt(edge_variance),
+        "delta": edge - baseline_edge,
+        "delta_standard_error": math.sqrt(delta_variance),
+        "variance_reduction": reduction,
+    }
+
+
+def run_sweep(
+    base_rules: dict=None,
+    policy: str="strategy",
+    rounds: int=DEFAULT_ROUNDS,
+    segment_rounds: int=DEFAULT_SEGMENT_ROUNDS,
+    seed: int=DEFAULT_SEED,
+    initial_bet: float=10.0,
+    workers: int=1,
+    progress=None
+) -> dict:
+    '''Simulate about rounds rounds (in whole segments, see simulate_segments)
+    of every rule set returned by sweep_rule_sets(base_rules) with common
+    random numbers, and return the sweep as a dictionary holding its parameters
+    and a list of variants, each with its rules and the results of compare
+    against base_rules (or the default settings).
+
+    The rule sets are spread across a pool of workers processes (every core
+    if workers is 0 or less), and progress, if given, is called with the
+    number of variants done and the total after each one. The results are
+    identical for a given seed, whatever the number of workers.
+    '''
+
+    if base_rules is None:
+        base_rules = simulation.rules_from_settings(main.settings)
+
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+
+    rule_sets = sweep_rule_sets(base_rules)
+    tasks = [(rules, policy, rounds, segment_rounds, seed, initial_bet) for rules in rule_sets]
+
+    # Generate every strategy table once, before the workers need them
+    if policy == "strategy":
+        for rules in rule_sets:
+            strategy.load_table(rules)
+
+    start = time.perf_counter()
+    # The net outcomes and numbers of rounds of the segments of every rule set
+    variant_segments = []
+
+    if workers == 1:
+        for task in tasks:
+            variant_segments.append(simulate_segments(*task))
+
+            if progress is not None:
+                progress(len(variant_segments), len(tasks))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            for segments in pool.imap(_simulate_worker, tasks):
+                variant_segments.append(segments)
+
+                if progress is not None:
+                    progress(len(variant_segments), len(tasks))
+
+    # The base rules are in the grid, unless their deck count is outside of it
+    baseline = None
+    for rules, segments in zip(rule_sets, variant_segments):
+        if rules == base_rules:
+            baseline = segments
+
+    if baseline is None:
+        baseline = simulate_segments(base_rules, policy, rounds, segment_rounds, seed, initial_bet)
+
+    variants = []
+    for rules, (nets, counts) in zip(rule_sets, variant_segments):
+        variant = {"rules": {name: rules[name] for name in strategy.RULE_CHOICES}}
+        variant.update(compare(nets, counts, *baseline, initial_bet, same_cards(rules, base_rules)))
+        variants.append(variant)
+
+    return {
+        "version": SWEEP_VERSION,
+        "base_rules": base_rules,
+        "policy": policy,
+        "rounds": rounds,
+        "segment_rounds": segment_rounds,
+        "seed": seed,
+        "bet": initial_bet,
+        "seconds": time.perf_counter() - start,
+        "variants": variants,
+    }
+
+
+def cache_path(base_rules: dict, policy: str, rounds: int, segment_rounds: int, seed: int, initial_bet: float) -> str:
+    '''Return the path of the cache file of the sweep with these parameters.'''
+
+    return os.path.join(CACHE_DIRECTORY, sweep_key(base_rules, policy, rounds, segment_rounds, seed, initial_bet) + ".json")
+
+
+def load_sweep(
+    base_rules: dict=None,
+    policy: str="strategy",
+    rounds: int=DEFAULT_ROUNDS,
+    segment_rounds: int=DEFAULT_SEGMENT_ROUNDS,
+    seed: int=DEFAULT_SEED,
+    initial_bet: float=10.0,
+    workers: int=1,
+    regenerate: bool=False,
+    progress=None
+) -> dict:
+    '''Return the sweep with these parameters (see run_sweep), loading it
+    from the cache if it exists, or running and caching it otherwise.'''
+
+    if base_rules is None:
+        base_rules = simulation.rules_from_settings(main.settings)
+
+    path = cache_path(base_rules, policy, rounds, segment_rounds, seed, initial_bet)
+
+    if not regenerate and os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+
+    sweep = run_sweep(base_rules, policy, rounds, segment_rounds, seed, initial_bet, workers, progress)
+
+    os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+
+    # Write to a temporary file first so a reader never sees a partial sweep
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        json.dump(sweep, file)
+
+    os.replace(temporary_path, path)
+
+    return sweep
+
+
+def print_sweep(sweep: dict):
+    '''Display every variant of sweep as a row with its rules, house edge,
+    and delta from the baseline, sorted by house edge.'''
+
+    names = list(strategy.RULE_CHOICES)
+    header = "".join(f"{name:>14}" for name in names)
+
+    print(f"{header}{'edge':>10}{'± se':>9}{'delta':>10}{'± se':>9}{'vr':>7}")
+
+    for variant in sorted(sweep["variants"], key=lambda variant: variant["house_edge"]):
+        rules = variant["rules"]
+        row = "".join(f"{str(rules[name]):>14}" for name in names)
+        reduction = variant["variance_reduction"]
+        reduction_text = f"{reduction:.1f}" if reduction is not None else "-"
+
+        print(
+            f"{row}{variant['house_edge'] * 100:>9.3f}%{variant['standard_error'] * 100:>8.3f}%"
+            f"{variant['delta'] * 100:>+9.3f}%{variant['delta_standard_error'] * 100:>8.3f}%{reduction_text:>7}"
+        )
+
+
+def main_cli():
+    '''Parse the command line arguments, then run (or load) and display a sweep.'''
+
+    parser = argparse.ArgumentParser(description="Estimate the house edge of every combination of Blackjack rules with common random numbers.")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="number of rounds to play with each rule set")
+    parser.add_argument("--segment-rounds", type=int, default=DEFAULT_SEGMENT_ROUNDS, help="rounds of each segment in true random and continuous shuffling modes, which have no cut card")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="seed shared by every rule set")
+    parser.add_argument("--bet", type=float, default=10.0, help="initial bet of each round")
+    parser.add_argument("--policy", choices=list(POLICIES), default="strategy", help="policy to play every rule set with")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes (0 for every core)")
+    parser.add_argument("--regenerate", action="store_true", help="ignore the cached sweep")
+    parser.add_argument("--output", help="write the sweep to this file as JSON")
+    simulation.add_rule_arguments(parser)
+
+    args = parser.parse_args()
+    base_rules = simulation.rules_from_arguments(args)
+
+    def progress(done: int, total: int):
+        print(f"\r{done}/{total} rule sets", end="", flush=True)
+
+    start = time.perf_counter()
+    sweep = load_sweep(base_rules, args.policy, args.rounds, args.segment_rounds, args.seed, args.bet, args.workers, args.regenerate, progress)
+    elapsed = time.perf_counter() - start
+
+    print()
+    print_sweep(sweep)
+    print()
+
+    if deals_to_cut(base_rules):
+        print(f"Rounds per rule set: about {sweep['rounds']}, dealing every shoe down to its cut card (seed {sweep['seed']})")
+    else:
+        print(f"Rounds per rule set: about {sweep['rounds']} in segments of {sweep['segment_rounds']} (seed {sweep['seed']})")
+
+    print("Only the deltas of variants dealing from the same cards as the baseline (the same deck count, or both in true")
+    print("random mode) are variance-reduced. The other deck counts (vr -) are compared as independent simulations.")
+    print(f"Loaded in {elapsed:.2f}s from {cache_path(base_rules, args.policy, args.rounds, args.segment_rounds, args.seed, args.bet)}")
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(sweep, file, indent=4)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,88 @@
+'''Tests for the constant-memory statistics in bankroll.py.'''
+
+
+__author__ = "U Ahsan"
+
+
+import random
+import statistics
+
+import pytest
+
+import bankroll
+
+
+def sample_values(count: int, seed: int=1) -> [float]:
+    '''Return count outcomes of rounds, spread like those of a 10 dollar bet.'''
+
+    rng = random.Random(seed)
+
+    return [rng.choice([-20.0, -10.0, -5.0, 0.0, 10.0, 15.0, 20.0]) + rng.random() for _ in range(count)]
+
+
+def running_stats(values: [float]) -> bankroll.RunningStats:
+    '''Return the running statistics of values.'''
+
+    stats = bankroll.RunningStats()
+
+    for value in values:
+        stats.add(value)
+
+    return stats
+
+
+def test_running_stats_match_statistics():
+    values = sample_values(5000)
+    stats = running_stats(values)
+
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(statistics.fmean(values))
+    assert stats.variance() == pytest.approx(statistics.variance(values))
+    assert stats.standard_error() == pytest.approx(statistics.stdev(values) / len(values) ** 0.5)
+    assert (stats.minimum, stats.maximum) == (min(values), max(values))
+
+
+def test_running_stats_are_stable_with_a_large_offset():
+    # The naive sum of squares loses every digit of this variance
+    values = [1e9 + value for value in sample_values(5000)]
+
+    assert running_stats(values).variance() == pytest.approx(statistics.variance(values), rel=1e-6)
+
+
+def test_merged_stats_match_a_single_stream():
+    values = sample_values(3001, seed=2)
+    merged = bankroll.RunningStats()
+
+    for start in range(0, len(values), 700):
+        merged.merge(running_stats(values[start:start + 700]))
+
+    merged.merge(bankroll.RunningStats())
+    single = running_stats(values)
+
+    assert merged.count == single.count
+    assert merged.mean == pytest.approx(single.mean)
+    assert merged.variance() == pytest.approx(single.variance())
+    assert (merged.minimum, merged.maximum) == (single.minimum, single.maximum)
+
+
+def test_empty_stats():
+    summary = bankroll.RunningStats().summary()
+
+    assert summary["count"] == 0
+    assert summary["variance"] == 0.0
+    assert summary["minimum"] is None
+
+
+def test_histogram_quantiles():
+    histogram = bankroll.Histogram(0.0, 100.0, 100)
+
+    for value in range(100):
+        histogram.add(value + 0.5)
+
+    histogram.add(-1.0)
+    histogram.add(200.0)
+
+    assert (histogram.below, histogram.above, histogram.total) == (1, 1, 102)
+    assert histogram.quantile(0.5) == pytest.approx(50.0, abs=1.0)
+    assert histogram.quantile(0.0) == 0.0
+    assert histogram.quantile(1.0) == 100.0
@@ -0,0 +1,107 @@
+'''Tests for the environments in env.py.'''
+
+
+__author__ = "U Ahsan"
+
+
+import pytest
+
+import env
+import main
+import simulation
+
+
+## Constants ##
+SEED = 7
+
+TABLES = 16
+
+
+def as_lists(results: tuple) -> tuple:
+    '''Return the results of VectorEnv.reset or VectorEnv.step as lists, whether or not they are NumPy arrays.'''
+
+    return tuple(result.tolist() if hasattr(result, "tolist") else list(result) for result in results)
+
+
+def first_legal(masks: list) -> [int]:
+    '''Return the index in env.ACTIONS of the first available action of every table.'''
+
+    return [list(mask).index(True) for mask in masks]
+
+
+def illegal_actions(masks: list) -> [int]:
+    '''Return the first available action of every table, except for the last
+    table whose action is one it cannot choose.'''
+
+    actions = first_legal(masks)
+    actions[-1] = list(masks[-1]).index(False)
+
+    return actions
+
+
+def test_env_plays_the_same_rounds_as_simulate():
+    rules = simulation.rules_from_settings(main.settings)
+    rounds = 500
+
+    single = env.Env(rules, SEED, initial_bet=10.0)
+    net = 0.0
+
+    for _ in range(rounds):
+        single.reset()
+        done = False
+
+        while not done:
+            action = simulation.simple_policy(single.hand, single.upcard, single.choices)
+            _, reward, done = single.step(action)
+
+        net += reward * 10.0
+
+    assert net == pytest.approx(simulation.simulate(rounds, rules, seed=SEED)["net"])
+
+
+def test_env_rejects_an_unavailable_action():
+    single = env.Env(seed=SEED)
+
+    with pytest.raises(ValueError):
+        single.step('s')
+
+    single.reset()
+    illegal = next(action for action in env.ACTIONS if action not in single.choices)
+
+    with pytest.raises(ValueError):
+        single.step(illegal)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_invalid_action_steps_no_table(workers):
+    with env.VectorEnv(TABLES, seed=SEED, workers=workers) as checked, env.VectorEnv(TABLES, seed=SEED, workers=workers) as reference:
+        _, masks = as_lists(checked.reset())
+        reference.reset()
+
+        with pytest.raises(ValueError):
+            checked.step(illegal_actions(masks))
+
+        # Every table is still at the decision it was at before the invalid step
+        assert as_lists(checked.step(first_legal(masks))) == as_lists(reference.step(first_legal(masks)))
+
+
+def test_wrong_number_of_actions_is_rejected():
+    vector = env.VectorEnv(TABLES, seed=SEED)
+    _, masks = as_lists(vector.reset())
+
+    with pytest.raises(ValueError):
+        vector.step(first_legal(masks)[:-1])
+
+
+def test_sharded_tables_match_local_tables():
+    with env.VectorEnv(TABLES, seed=SEED, workers=3) as sharded:
+        local = env.VectorEnv(TABLES, seed=SEED)
+
+        local_results = as_lists(local.reset())
+        assert as_lists(sharded.reset()) == local_results
+
+        for _ in range(50):
+            actions = first_legal(local_results[1])
+            local_results = as_lists(local.step(actions))
+
+            assert as_lists(sharded.step(actions)) == local_results
@@ -0,0 +1,113 @@
+'''Tests for the binary hand history in history.py and its audit in simulation.py.'''
+
+
+__author__ = "U Ahsan"
+
+
+import pytest
+
+import history
+import main
+import packed
+import simulation
+
+
+## Constants ##
+SEED = 5
+
+ROUNDS = 300
+
+
+def sample_record() -> history.Record:
+    '''Return the record of a split round with every field set.'''
+
+    record = history.Record(123, 990.5, 10.0, history.rule_flags(simulation.rules_from_settings(main.settings)))
+    record.net = -2.5
+    record.cards = [packed.encode(8, "s"), packed.encode(8, "c"), packed.encode(10, "h"), packed.encode(7, "d", True)]
+    record.decisions = ["sp", 'h', 's', 'd', 'f']
+    record.hands = [record.cards[2:], [record.cards[0]], [record.cards[1], packed.encode(1, "h")]]
+
+    return record
+
+
+def record_history(path, rules: dict, rounds: int=ROUNDS) -> dict:
+    '''Simulate rounds rounds with rules, recording them in the history file
+    at path, and return the results of the simulation.'''
+
+    with history.HistoryWriter(str(path)) as writer:
+        return simulation.simulate(rounds, rules, seed=SEED, history_writer=writer)
+
+
+def test_record_round_trip():
+    record = sample_record()
+    decoded, offset = history.decode(history.encode(record))
+
+    assert offset == len(history.encode(record))
+
+    for field in history.Record.__slots__:
+        assert getattr(decoded, field) == getattr(record, field)
+
+
+def test_rule_flags_round_trip():
+    rules = {"surrendering": True, "doubling": False, "splitting": True, "soft_17_hit": True, "true_random": False}
+
+    assert history.rules_from_flags(history.rule_flags(rules)) == rules
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, history.BUFFER_SIZE])
+def test_read_records_streams_across_chunks(tmp_path, chunk_size):
+    path = tmp_path / "rounds.bjh"
+    results = record_history(path, simulation.rules_from_settings(main.settings))
+
+    records = list(history.read_records(str(path), chunk_size))
+
+    assert len(records) == ROUNDS
+    assert sum(record.net for record in records) == pytest.approx(results["net"])
+
+
+@pytest.mark.parametrize("variant", [{}, {"true_random": True, "surrendering": True}, {"continuous_shuffle": True}])
+def test_recorded_rounds_pass_the_audit(tmp_path, variant):
+    path = tmp_path / "rounds.bjh"
+    record_history(path, dict(simulation.rules_from_settings(main.settings), **variant))
+
+    audit = simulation.audit_history(str(path))
+
+    assert audit["rounds"] == ROUNDS
+    assert audit["mismatches"] == []
+    assert audit["errors"] == []
+
+
+def test_audit_finds_tampered_rounds(tmp_path):
+    path = tmp_path / "rounds.bjh"
+    record_history(path, simulation.rules_from_settings(main.settings))
+    records = list(history.read_records(str(path)))
+
+    records[3].net += 10.0
+    records[7].decisions.append('h')
+
+    tampered = tmp_path / "tampered.bjh"
+    with history.HistoryWriter(str(tampered)) as writer:
+        for record in records:
+            writer.write(record)
+
+    audit = simulation.audit_history(str(tampered))
+
+    assert audit["mismatches"] == [3]
+    assert audit["errors"] == [7]
+
+
+def test_malformed_files_are_rejected(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a history file")
+
+    with pytest.raises(history.HistoryError):
+        list(history.read_records(str(path)))
+
+    with pytest.raises(history.HistoryError):
+        history.HistoryWriter(str(path))
+
+    truncated = tmp_path / "truncated.bjh"
+    truncated.write_bytes(history.MAGIC + history.encode(sample_record())[:-1])
+
+    with pytest.raises(history.HistoryError):
+        list(history.read_records(str(truncated)))
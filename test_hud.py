@@ -0,0 +1,86 @@
+'''Tests for the live odds panel in hud.py and its display in the game.'''
+
+
+__author__ = "U Ahsan"
+
+
+import io
+
+import pytest
+
+import hud
+import main
+import metrics
+import simulation
+import util
+
+
+## Constants ##
+SEED = 9
+
+ROUNDS = 20
+
+INITIAL_BET = 10.0
+
+
+@pytest.fixture
+def headless_game(monkeypatch):
+    '''Set up main to play headless rounds with the odds panel on, deciding
+    every hand with simulation.simple_policy, and return the stream the
+    screens are written to.'''
+
+    for name, setting in main.settings.items():
+        monkeypatch.setitem(setting, "value", setting["default"])
+
+    monkeypatch.setitem(main.settings["odds_hud"], "value", True)
+    monkeypatch.setattr(main, "player_policy", simulation.simple_policy)
+    monkeypatch.setattr(main, "history_writer", None)
+    monkeypatch.setattr(util, "no_wait", True)
+    monkeypatch.setattr(util, "decision_source", util.PolicySource(lambda message, choices: int(INITIAL_BET)))
+
+    output = io.StringIO()
+    monkeypatch.setattr(util, "renderer", util.FrameRenderer(output))
+
+    main.seed_random(SEED)
+    main.shuffle_deck()
+    monkeypatch.setattr(main, "current_balance", main.DEFAULT_BALANCE)
+
+    yield output
+
+    hud.clear_cache()
+
+
+@pytest.mark.parametrize("metrics_enabled", [False, True])
+def test_rounds_with_the_odds_panel(headless_game, metrics_enabled):
+    metrics.reset()
+
+    if metrics_enabled:
+        metrics.enable()
+
+    try:
+        for _ in range(ROUNDS):
+            main.start_game()
+    finally:
+        metrics.disable()
+
+    assert "Bust on a hit:" in headless_game.getvalue()
+
+    calls = metrics.snapshot()["phase_calls"]
+    metrics.reset()
+
+    assert (calls["odds_hud"] >= ROUNDS) == metrics_enabled
+
+
+def test_panel_probabilities_sum_to_one():
+    # The cards left of each rank in a 6-deck shoe, less the user's 10 and 2 and the upcard
+    remaining_cards = [0] + [24] * 13
+    remaining_cards[10] -= 1
+    remaining_cards[2] -= 1
+    remaining_cards[6] -= 1
+
+    signature = hud.unseen_signature(remaining_cards, 13)
+    panel = hud.hand_odds(12, False, None, 6, signature, False, ['h', 's', 'd'])
+
+    assert sum(panel["dealer"].values()) == pytest.approx(1.0)
+    assert 0.0 < panel["bust"] < 1.0
+    assert set(panel["evs"]) == {'h', 's', 'd'}
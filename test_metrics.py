@@ -0,0 +1,103 @@
+'''Tests for the instrumentation in metrics.py.'''
+
+
+__author__ = "U Ahsan"
+
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    '''Start every test with instrumentation enabled and every value at
+    zero, and leave it disabled and at zero afterwards.'''
+
+    metrics.reset()
+    metrics.enable()
+
+    yield
+
+    metrics.disable()
+    metrics.reset()
+
+
+def test_counters():
+    metrics.count("card_draws")
+    metrics.count("card_draws", 4)
+    metrics.count("reshuffles")
+
+    counters = metrics.snapshot()["counters"]
+
+    assert counters["card_draws"] == 5
+    assert counters["reshuffles"] == 1
+    assert counters["rng_calls"] == 0
+
+
+def test_phase_timings():
+    with metrics.phase("play_dealer"):
+        with metrics.phase("rendering"):
+            pass
+
+    with metrics.phase("play_dealer"):
+        pass
+
+    values = metrics.snapshot()
+
+    assert values["phase_calls"]["play_dealer"] == 2
+    assert values["phase_calls"]["rendering"] == 1
+    assert values["phase_calls"]["betting"] == 0
+    assert values["phase_seconds"]["play_dealer"] >= values["phase_seconds"]["rendering"] >= 0.0
+
+
+def test_timed_functions():
+    @metrics.timed("settlement")
+    def settle(value: int) -> int:
+        return value * 2
+
+    assert settle(3) == 6
+    assert metrics.snapshot()["phase_calls"]["settlement"] == 1
+
+
+def test_nothing_is_collected_while_disabled():
+    metrics.disable()
+
+    with metrics.phase("betting"):
+        pass
+
+    assert metrics.snapshot()["phase_calls"]["betting"] == 0
+
+
+@pytest.mark.parametrize("enabled", [False, True])
+def test_unknown_phases_are_rejected_when_used(enabled):
+    if not enabled:
+        metrics.disable()
+
+    with pytest.raises(ValueError):
+        with metrics.phase("no_such_phase"):
+            pass
+
+    with pytest.raises(ValueError):
+        metrics.timed("no_such_phase")
+
+
+def test_prometheus_dump(tmp_path):
+    metrics.count("hand_value_calls", 7)
+
+    with metrics.phase("initial_deal"):
+        pass
+
+    lines = metrics.render_prometheus().splitlines()
+
+    assert "# TYPE blackjack_hand_value_calls_total counter" in lines
+    assert "blackjack_hand_value_calls_total 7" in lines
+    assert 'blackjack_phase_calls_total{phase="initial_deal"} 1' in lines
+
+    for name in metrics.PHASES:
+        assert any(line.startswith(f'blackjack_phase_seconds_total{{phase="{name}"}} ') for line in lines)
+
+    path = tmp_path / "metrics.prom"
+    metrics.write_prometheus(str(path))
+
+    assert path.read_text(encoding="utf-8") == metrics.render_prometheus()
@@ -0,0 +1,54 @@
+'''Tests for the packed card encoding in packed.py.'''
+
+
+__author__ = "U Ahsan"
+
+
+import random
+
+import packed
+import util
+
+
+## Constants ##
+EVERY_CARD = [
+    (rank, suit, hidden)
+    for rank in packed.RANKS
+    for suit in packed.SUITS
+    for hidden in (False, True)
+]
+
+
+def test_every_card_fits_the_tables():
+    cards = [packed.encode(rank, suit, hidden) for rank, suit, hidden in EVERY_CARD]
+
+    assert len(set(cards)) == len(EVERY_CARD)
+    assert all(0 <= card < packed.TABLE_SIZE for card in cards)
+
+
+def test_tables_match_the_string_format():
+    for rank, suit, hidden in EVERY_CARD:
+        card = packed.encode(rank, suit, hidden)
+        string = packed.to_str(card)
+
+        assert string == f"{rank}{suit}{int(hidden)}"
+        assert packed.from_str(string) == card
+        assert packed.CARD_RANKS[card] == util.get_rank(string) == rank
+        assert packed.CARD_SUITS[card] == util.get_suit(string) == suit
+        assert packed.CARD_VALUES[card] == util.card_value(string)
+        assert packed.is_hidden(card) == util.is_hidden(string) == hidden
+
+
+def test_reveal_clears_only_the_hidden_bit():
+    for rank, suit, _ in EVERY_CARD:
+        assert packed.reveal(packed.encode(rank, suit, True)) == packed.encode(rank, suit)
+        assert packed.reveal(packed.encode(rank, suit)) == packed.encode(rank, suit)
+
+
+def test_hand_value_matches_util():
+    rng = random.Random(3)
+
+    for _ in range(2000):
+        cards = [packed.encode(*rng.choice(EVERY_CARD)) for _ in range(rng.randint(1, 6))]
+
+        assert packed.hand_value(cards) == util.hand_value([packed.to_str(card) for card in cards])
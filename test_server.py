@@ -0,0 +1,118 @@
+'''Tests for the game server in server.py.'''
+
+
+__author__ = "U Ahsan"
+
+
+import asyncio
+
+import pytest
+
+import main
+import models
+import packed
+import server
+import simulation
+import streams
+
+
+class RecordingWriter:
+    '''Stand-in for an asyncio.StreamWriter keeping everything written to it.'''
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data: bytes):
+        self.data.extend(data)
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+def scripted_table(cards: [str]) -> models.Table:
+    '''Return a table with the default rules dealing the cards in
+    cards (such as "8s") in order.'''
+
+    packed_cards = [packed.encode(int(card[:-1]), card[-1]) for card in cards]
+    rules = simulation.rules_from_settings(main.settings)
+    rng = streams.RandomStream(0)
+
+    return models.Table(rules, rng, 1000.0, models.Shoe(packed_cards, len(packed_cards), rng, 1))
+
+
+def play_scripted_round(cards: [str], decisions: [str], initial_bet: float=10.0) -> (float, str):
+    '''Play a round of server.play_round dealing cards and answering with
+    decisions, and return the net outcome and everything sent to the client.'''
+
+    async def play():
+        reader = asyncio.StreamReader()
+        reader.feed_data("".join(decision + "\n" for decision in decisions).encode())
+        reader.feed_eof()
+
+        writer = RecordingWriter()
+        session = server.new_session(reader, writer, server.new_server_state(simulation.rules_from_settings(main.settings), 1000.0, 0))
+        session["table"] = scripted_table(cards)
+
+        outcome = await server.play_round(session, initial_bet)
+
+        return outcome, writer.data.decode()
+
+    return asyncio.run(play())
+
+
+def test_split_hands_without_decisions_are_shown():
+    # Both split hands draw a card of another rank, so neither asks for a decision
+    outcome, output = play_scripted_round(["8s", "8c", "10h", "7d", "13d", "5h"], ["sp"])
+    final_hands = output[output.index("Final hands:"):]
+
+    assert "Your hand (1/2)" in final_hands
+    assert "Your hand (2/2)" in final_hands
+    assert outcome == 0.0
+
+
+def test_single_hand_is_shown_once():
+    outcome, output = play_scripted_round(["10s", "9c", "10h", "7d"], ["s"])
+    final_hands = output[output.index("Final hands:"):]
+
+    assert final_hands.count("Your hand") == 1
+    assert outcome == 10.0
+
+
+def test_closed_connections_are_counted_in_the_report(capsys):
+    async def connect_and_quit(server_state: dict):
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"q\n")
+        reader.feed_eof()
+
+        await server.handle_connection(reader, RecordingWriter(), server_state)
+
+    server_state = server.new_server_state(simulation.rules_from_settings(main.settings), 1000.0, 0)
+
+    for _ in range(3):
+        asyncio.run(connect_and_quit(server_state))
+
+    assert (server_state["connections"], server_state["active"], server_state["closed"]) == (3, 0, 3)
+    assert capsys.readouterr().out == ""
+
+
+def test_serve_cancels_its_report_on_shutdown(capsys):
+    async def serve_briefly():
+        server_state = server.new_server_state(simulation.rules_from_settings(main.settings), 1000.0, 0)
+        serving = asyncio.create_task(server.serve("127.0.0.1", 0, server_state, 0.01))
+
+        await asyncio.sleep(0.1)
+        serving.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await serving
+
+        return asyncio.all_tasks() - {asyncio.current_task()}
+
+    assert asyncio.run(serve_briefly()) == set()
+    assert "closed since the last report: 0" in capsys.readouterr().out
@@ -0,0 +1,49 @@
+'''Tests for the shoe and continuous shuffling machine in shoe.py.'''
+
+
+__author__ = "U Ahsan"
+
+
+import pytest
+
+import main
+import shoe
+import streams
+
+
+## Constants ##
+SEED = 13
+
+
+def continuous_shoe(deck_count: int=1):
+    '''Return a continuous shuffling machine of deck_count decks.'''
+
+    return shoe.new_shoe(main.ranks, main.SUITS, deck_count, rng=streams.RandomStream(SEED), continuous=True)
+
+
+def test_continuous_shoe_runs_dry_without_dealing_a_card_twice():
+    machine = continuous_shoe()
+    every_card = sorted(machine.cards)
+
+    # A few ordinary rounds first, so the cards are no longer in their shuffled order
+    for _ in range(3):
+        for _ in range(10):
+            shoe.draw(machine)
+
+        shoe.return_cards(machine)
+
+    round_cards = [shoe.draw(machine) for _ in range(len(every_card))]
+
+    # A single deck has one of each card, so any duplicate would be dealt twice
+    assert sorted(round_cards) == every_card
+    assert sum(machine.remaining_cards) == 0
+    assert machine.tens_left == 0
+
+    with pytest.raises(ValueError):
+        shoe.draw(machine)
+
+    shoe.return_cards(machine)
+
+    assert sum(machine.remaining_cards) == len(every_card)
+    assert machine.running_count == 0
+    assert shoe.draw(machine) in every_card
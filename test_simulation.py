@@ -0,0 +1,131 @@
+'''Tests for the headless simulation engine in simulation.py.'''
+
+
+__author__ = "U Ahsan"
+
+
+import pytest
+
+import main
+import simulation
+import util
+
+
+## Constants ##
+SEED = 2024
+
+ROUNDS = 400
+
+INITIAL_BET = 10.0
+
+# Enough to always afford doubling, so that both games offer the same choices
+BALANCE = 1e9
+
+RULE_VARIANTS = [
+    {},
+    {"surrendering": True, "soft_17_hit": True, "deck_count": 1, "penetration": 75},
+    {"doubling": False, "splitting": False, "deck_count": 2},
+    {"true_random": True, "surrendering": True},
+    {"continuous_shuffle": True, "surrendering": True, "deck_count": 4},
+]
+
+
+def scattered_policy(hand, upcard: int, choices: [str], shoe) -> str:
+    '''Return a decision from choices that depends only on the cards of hand and the upcard,
+    so that every choice (including resplits and surrenders) is taken in some rounds.'''
+
+    return choices[(sum(hand.cards) * 31 + upcard * 7 + hand.card_count) % len(choices)]
+
+
+def play_game_rounds(monkeypatch, rules: dict, policy, rounds: int) -> [float]:
+    '''Play rounds rounds of main.start_game with rules, deciding every hand
+    with policy and without any output or pauses, and return the net
+    outcome of each round.'''
+
+    for name, setting in main.settings.items():
+        monkeypatch.setitem(setting, "value", rules.get(name, setting["default"]))
+
+    monkeypatch.setattr(main, "player_policy", policy)
+    monkeypatch.setattr(main, "history_writer", None)
+    monkeypatch.setattr(util, "renderer", util.NullRenderer())
+    monkeypatch.setattr(util, "no_wait", True)
+    monkeypatch.setattr(util, "decision_source", util.PolicySource(lambda message, choices: int(INITIAL_BET)))
+
+    main.seed_random(SEED)
+    main.shuffle_deck()
+    monkeypatch.setattr(main, "current_balance", BALANCE)
+
+    outcomes = []
+
+    for _ in range(rounds):
+        balance = main.current_balance
+        main.start_game()
+        outcomes.append(main.current_balance - balance)
+
+    return outcomes
+
+
+def play_flow_rounds(rules: dict, policy, rounds: int) -> [float]:
+    '''Play rounds rounds of simulation.round_flow with rules on a table dealing
+    the same cards as main, and return the net outcome of each round.'''
+
+    table = simulation.new_table(rules, SEED, BALANCE)
+
+    return [simulation.play_round(table, policy, INITIAL_BET) for _ in range(rounds)]
+
+
+@pytest.mark.parametrize("variant", RULE_VARIANTS)
+@pytest.mark.parametrize("policy", [simulation.simple_policy, scattered_policy])
+def test_round_flow_matches_the_game(monkeypatch, variant, policy):
+    rules = dict(simulation.rules_from_settings(main.settings), **variant)
+
+    assert play_game_rounds(monkeypatch, rules, policy, ROUNDS) == play_flow_rounds(rules, policy, ROUNDS)
+
+
+def test_simulate_is_reproducible():
+    rules = simulation.rules_from_settings(main.settings)
+
+    first = simulation.simulate(2000, rules, seed=SEED)
+    second = simulation.simulate(2000, rules, seed=SEED)
+
+    assert (first["net"], first["net_squared"]) == (second["net"], second["net_squared"])
+
+
+class CountingPolicy(simulation.Policy):
+    '''The simple policy deciding whole batches, counting its batches and decisions.'''
+
+    def __init__(self):
+        self.batches = 0
+        self.decisions = 0
+
+    def decide_batch(self, requests: [tuple]) -> [str]:
+        self.batches += 1
+        self.decisions += len(requests)
+
+        return [simulation.simple_policy(*request) for request in requests]
+
+
+class SingleDecisionPolicy(simulation.Policy):
+    '''The simple policy, overriding only decide.'''
+
+    def decide(self, hand, upcard: int, choices: [str], shoe) -> str:
+        return simulation.simple_policy(hand, upcard, choices, shoe)
+
+
+def test_batch_policies_decide_like_functions():
+    rules = simulation.rules_from_settings(main.settings)
+    expected = simulation.simulate_batch(3000, rules, simulation.simple_policy, SEED, tables=64)
+
+    policy = CountingPolicy()
+    batched = simulation.simulate_batch(3000, rules, policy, SEED, tables=64)
+    single = simulation.simulate_batch(3000, rules, SingleDecisionPolicy(), SEED, tables=64)
+
+    assert batched["net"] == single["net"] == expected["net"]
+    assert batched["policy_calls"] == policy.batches
+    assert policy.batches < policy.decisions
+
+
+def test_policy_instances_are_callable():
+    rules = simulation.rules_from_settings(main.settings)
+
+    assert simulation.simulate(1000, rules, SingleDecisionPolicy(), SEED)["net"] == simulation.simulate(1000, rules, seed=SEED)["net"]
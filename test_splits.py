@@ -0,0 +1,83 @@
+'''Tests for the exact split engine in splits.py and its use in strategy.py.'''
+
+
+__author__ = "U Ahsan"
+
+
+import pytest
+
+import odds
+import splits
+import strategy
+
+
+## Constants ##
+PAIRS = [1, 8]
+
+
+def shoe_counts(deck_count: int) -> [int]:
+    '''Return the number of cards of each value (indexed by value) in deck_count fresh decks.'''
+
+    return [0] + [4 * deck_count * (4 if value == 10 else 1) for value in odds.VALUES]
+
+
+@pytest.mark.parametrize("pair_value", PAIRS)
+def test_capped_resplits_approach_the_uncapped_ev(pair_value):
+    # A single deck is the only shoe small enough to split without a cap
+    counts = shoe_counts(1)
+
+    for upcard_value in odds.VALUES:
+        uncapped = splits.split_ev(pair_value, upcard_value, counts, False, None)
+        differences = [uncapped - splits.split_ev(pair_value, upcard_value, counts, False, cap) for cap in range(3)]
+
+        # Resplitting is never forced, so every cap can only lower the EV,
+        # and the difference shrinks with every resplit allowed
+        assert differences[0] >= differences[1] >= differences[2] >= -1e-12
+        assert differences[1] < 0.001
+
+        assert uncapped - splits.split_ev(pair_value, upcard_value, counts, False, strategy.EXACT_SPLIT_RESPLITS) < 0.001
+
+
+@pytest.mark.parametrize("pair_value", PAIRS)
+def test_next_resplit_in_six_decks_is_small(pair_value):
+    counts = shoe_counts(6)
+
+    # A ten upcard has the fewest dealer outcomes to walk, which keeps the deeper caps quick
+    evs = [splits.split_ev(pair_value, 10, counts, False, cap) for cap in range(strategy.EXACT_SPLIT_RESPLITS, splits.DEFAULT_MAX_RESPLITS + 2)]
+    differences = [deeper - shallower for shallower, deeper in zip(evs, evs[1:])]
+
+    assert all(difference >= -1e-12 for difference in differences)
+    assert differences[0] < 0.001
+    assert differences[-1] < 0.0001
+
+
+def test_no_cap_is_needed_without_pair_cards():
+    counts = shoe_counts(1)
+    counts[8] = 2
+
+    for upcard_value in odds.VALUES:
+        if upcard_value == 8:
+            continue
+
+        assert splits.split_ev(8, upcard_value, counts, False, 0) == pytest.approx(splits.split_ev(8, upcard_value, counts, False, None))
+
+
+@pytest.mark.parametrize("soft_17_hit", [False, True])
+def test_infinite_split_ev_matches_the_closed_form(soft_17_hit):
+    for pair_value in odds.VALUES:
+        same_rank_probability = odds.INFINITE_PROBABILITIES[pair_value] / (4 if pair_value == 10 else 1)
+
+        for upcard_value in odds.VALUES:
+            closed_form = strategy._split_ev(pair_value, same_rank_probability, odds.INFINITE_PROBABILITIES, odds.INFINITE_DEALER[soft_17_hit][upcard_value])
+
+            assert splits.split_ev(pair_value, upcard_value, None, soft_17_hit) == pytest.approx(closed_form)
+
+
+def test_exact_tables_deplete_the_pair_and_upcard_once():
+    counts = shoe_counts(1)
+
+    for pair_value in PAIRS:
+        for upcard_value in (1, 6, 10):
+            evs = strategy.action_evs(pair_value, pair_value, upcard_value, counts, False, exact_splits=True)
+
+            assert evs["sp"] == pytest.approx(splits.split_ev(pair_value, upcard_value, counts, False, strategy.EXACT_SPLIT_RESPLITS))
@@ -0,0 +1,123 @@
+'''Tests for the random streams in streams.py.'''
+
+
+__author__ = "U Ahsan"
+
+
+import array
+import collections
+
+import pytest
+
+import streams
+
+
+## Constants ##
+SEED = 11
+
+# A small block, so that the tests cross many block boundaries
+BLOCK_SIZE = 8
+
+
+def scripted_stream(words: [int]) -> streams.RandomStream:
+    '''Return a stream whose next random words are words.'''
+
+    stream = streams.RandomStream(SEED, block_size=len(words), backend="python")
+    stream.values = array.array(stream.values.typecode, words)
+
+    return stream
+
+
+def test_randbelow_maps_the_high_word():
+    # Half of the range of words maps to the middle of 0, 1, and 2
+    assert scripted_stream([1 << 31]).randbelow(3) == 1
+    assert scripted_stream([(1 << 32) - 1]).randbelow(3) == 2
+    assert scripted_stream([1]).randbelow(3) == 0
+
+
+def test_randbelow_rejects_biased_words():
+    # The word 0 is the only word rejected for 3, since 2 ** 32 % 3 == 1
+    stream = scripted_stream([0, 1 << 31])
+
+    assert stream.randbelow(3) == 1
+    assert stream.position() == 2
+
+    # For 3 * 2 ** 30, the low product of every multiple of 4 is below the threshold of 2 ** 30
+    n = 3 << 30
+    stream = scripted_stream([4, (1 << 31) + 1])
+
+    assert stream.randbelow(n) == (((1 << 31) + 1) * n) >> 32
+    assert stream.position() == 2
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 13, 52, 312])
+def test_randbelow_is_uniform(n):
+    stream = streams.RandomStream(SEED, backend="python")
+    draws = 2000 * n
+    counts = collections.Counter(stream.randbelow(n) for _ in range(draws))
+
+    assert set(counts) == set(range(n))
+
+    # A chi-squared statistic far beyond its 99.99th percentile would mean a bias
+    expected = draws / n
+    chi_squared = sum((count - expected) ** 2 / expected for count in counts.values())
+
+    assert chi_squared < n + 10 * n ** 0.5 + 20
+
+
+def test_shuffle_matches_randbelow():
+    shuffled = list(range(100))
+    streams.RandomStream(SEED, block_size=BLOCK_SIZE, backend="python").shuffle(shuffled)
+
+    expected = list(range(100))
+    stream = streams.RandomStream(SEED, block_size=BLOCK_SIZE, backend="python")
+
+    for i in range(len(expected) - 1, 0, -1):
+        j = stream.randbelow(i + 1)
+        expected[i], expected[j] = expected[j], expected[i]
+
+    assert shuffled == expected
+
+
+def test_shuffle_rejects_biased_words():
+    # The word 0 is rejected for the 3 places of the first swap, so the
+    # shuffle swaps with the middle item and then leaves the first two
+    stream = scripted_stream([0, 1 << 31, 1 << 31])
+    shuffled = ["a", "b", "c"]
+    stream.shuffle(shuffled)
+
+    assert shuffled == ["a", "c", "b"]
+    assert stream.position() == 3
+
+
+def test_blocks_hold_4_bytes_a_word():
+    stream = streams.RandomStream(SEED, backend="python")
+
+    assert isinstance(stream.values, array.array)
+    assert stream.values.itemsize == 4
+    assert len(stream.values) == streams.BLOCK_SIZE
+
+
+def test_seek_matches_taking():
+    words = streams.RandomStream(SEED, block_size=BLOCK_SIZE, backend="python").take(100)
+
+    for position in (0, 5, 8, 37, 99):
+        stream = streams.RandomStream(SEED, block_size=BLOCK_SIZE, backend="python")
+        stream.skip(position)
+
+        assert stream.next_word() == words[position]
+
+    stream = streams.RandomStream(SEED, block_size=BLOCK_SIZE, backend="python")
+    stream.take(60)
+    stream.seek(3)
+
+    assert stream.take(10) == words[3:13]
+
+
+def test_streams_are_reproducible_and_independent():
+    first = streams.RandomStream(SEED, 1, backend="python").take(50)
+
+    assert streams.RandomStream(SEED, 1, backend="python").take(50) == first
+    assert streams.RandomStream(SEED, backend="python").spawn(1).take(50) == first
+    assert streams.RandomStream(SEED, 2, backend="python").take(50) != first
+    assert streams.RandomStream(SEED + 1, 1, backend="python").take(50) != first
@@ -0,0 +1,87 @@
+'''Tests for the rule-variation sweep in sweep.py.'''
+
+
+__author__ = "U Ahsan"
+
+
+import array
+import math
+import statistics
+
+import pytest
+
+import main
+import simulation
+import sweep
+
+
+## Constants ##
+SEED = 3
+
+ROUNDS = 2000
+
+
+def base_rules(**overrides) -> dict:
+    '''Return the default rules with overrides.'''
+
+    return dict(simulation.rules_from_settings(main.settings), **overrides)
+
+
+@pytest.mark.parametrize("deck_count, penetration", [(1, 75), (6, 100)])
+def test_segments_deal_every_shoe_to_its_cut(deck_count, penetration):
+    rules = base_rules(deck_count=deck_count, penetration=penetration)
+    nets, counts = sweep.simulate_segments(rules, "simple", ROUNDS, sweep.DEFAULT_SEGMENT_ROUNDS, SEED, 10.0)
+    cut = round(52 * deck_count * penetration / 100)
+
+    assert len(nets) == len(counts) == math.ceil(ROUNDS * sweep.ROUND_CARDS / cut)
+    assert sum(counts) == pytest.approx(ROUNDS, rel=0.1)
+
+    # Each shoe is dealt about cut / ROUND_CARDS rounds deep, not a fixed number of rounds
+    assert statistics.fmean(counts) == pytest.approx(cut / sweep.ROUND_CARDS, rel=0.1)
+    assert len(set(counts)) > 1
+
+
+@pytest.mark.parametrize("overrides", [{"true_random": True}, {"continuous_shuffle": True}])
+def test_shoes_without_a_cut_play_fixed_segments(overrides):
+    _, counts = sweep.simulate_segments(base_rules(**overrides), "simple", ROUNDS, 16, SEED, 10.0)
+
+    assert set(counts) == {16}
+    assert len(counts) == math.ceil(ROUNDS / 16)
+
+
+def test_variants_with_the_same_cards_deal_the_same_segments():
+    rules = base_rules()
+    nets, counts = sweep.simulate_segments(rules, "simple", ROUNDS, 16, SEED, 10.0)
+    surrender_nets, surrender_counts = sweep.simulate_segments(dict(rules, surrendering=True), "simple", ROUNDS, 16, SEED, 10.0)
+
+    assert len(surrender_nets) == len(nets)
+
+    paired = sweep.compare(surrender_nets, surrender_counts, nets, counts, 10.0, True)
+    independent = sweep.compare(surrender_nets, surrender_counts, nets, counts, 10.0, False)
+
+    assert paired["delta"] == independent["delta"]
+    assert paired["variance_reduction"] > 1
+    assert paired["delta_standard_error"] < independent["delta_standard_error"]
+    assert independent["variance_reduction"] is None
+
+
+def test_same_cards():
+    rules = base_rules(deck_count=6)
+
+    assert sweep.same_cards(dict(rules, surrendering=True), rules)
+    assert not sweep.same_cards(dict(rules, deck_count=2), rules)
+    assert not sweep.same_cards(dict(rules, true_random=True), rules)
+    assert sweep.same_cards(dict(rules, true_random=True, deck_count=2), dict(rules, true_random=True))
+
+
+def test_fixed_segments_give_the_plain_standard_error():
+    nets = array.array('d', [12.0, -30.0, 5.0, 40.0, -10.0, 0.0])
+    counts = array.array('I', [16] * len(nets))
+    stake = 16 * len(nets) * 10.0
+
+    results = sweep.compare(nets, counts, nets, counts, 10.0, True)
+
+    assert results["house_edge"] == pytest.approx(-sum(nets) / stake)
+    assert results["standard_error"] == pytest.approx(math.sqrt(statistics.variance(nets) * len(nets)) / stake)
+    assert results["delta"] == 0.0
+    assert results["rounds"] == 16 * len(nets)
@@ -1,14 +1,25 @@
 '''Contain utility functions for Blackjack such as functions for 
 displaying graphical interfaces, calculating hand values, comparing hands, 
-and much more.'''
+and much more.
+
+All output goes through emit, which hands each line to the current 
+renderer. The ConsoleRenderer writes every line immediately like print,
+the FrameRenderer collects a whole screen and writes it at once whenever 
+the game waits for the user, and the NullRenderer skips the output 
+(and the formatting of the hands and cards) entirely.
+'''
 
 
 __author__ = "U Ahsan"
 
 
 import math
+import sys
 import time
 
+import metrics
+import models
+
 
 TITLE_WIDTH = 40
 
@@ -27,14 +38,194 @@ rank_symbols = {
 }
 
 
+## Renderers ##
+class ConsoleRenderer:
+    '''Write each line to the stream (standard output by default)
+    as soon as it is emitted, exactly like print.'''
+    
+    enabled = True
+    
+    def __init__(self, stream=None):
+        self.stream = stream
+    
+    def write(self, text: str):
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write(text + "\n")
+    
+    def flush(self):
+        pass
+
+
+class FrameRenderer:
+    '''Collect every emitted line of a screen in a buffer and write 
+    the complete screen to the stream in a single write when flushed.'''
+    
+    enabled = True
+    
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.lines = []
+    
+    def write(self, text: str):
+        self.lines.append(text)
+    
+    def flush(self):
+        if not self.lines:
+            return
+        
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write("\n".join(self.lines) + "\n")
+        stream.flush()
+        
+        self.lines.clear()
+
+
+class NullRenderer:
+    '''Discard every emitted line. The functions displaying hands and
+    cards return immediately without formatting anything.'''
+    
+    enabled = False
+    
+    def write(self, text: str):
+        pass
+    
+    def flush(self):
+        pass
+
+
+RENDERERS = {
+    "console": ConsoleRenderer,
+    "frame": FrameRenderer,
+    "null": NullRenderer,
+}
+
+renderer = ConsoleRenderer()
+
+
+def set_renderer(new_renderer):
+    '''Flush the current renderer and replace it with new_renderer.'''
+    
+    global renderer
+    
+    renderer.flush()
+    renderer = new_renderer
+
+
+def emit(text: str=""):
+    '''Output a line of text through the current renderer.'''
+    
+    renderer.write(text)
+
+
+def flush():
+    '''Write out anything the current renderer has buffered.'''
+    
+    renderer.flush()
+
+
+## Decision sources ##
+class ConsoleSource:
+    '''Read every answer from the user with input, exactly like the game always has.'''
+    
+    interactive = True
+    
+    def answer(self, message: str, choices) -> str:
+        return input(message)
+
+
+class ScriptSource:
+    '''Read every answer, in order, from the lines of stream, such as
+    a script file or a pipe. Lines starting with # are skipped.
+    
+    Raises EOFError once the stream has no answers left, exactly like
+    input does when standard input is closed.
+    '''
+    
+    interactive = False
+    
+    def __init__(self, stream):
+        self.stream = stream
+    
+    def answer(self, message: str, choices) -> str:
+        while True:
+            line = self.stream.readline()
+            
+            if not line:
+                raise EOFError("The script has no answers left.")
+            
+            line = line.rstrip("\r\n")
+            
+            if not line.startswith("#"):
+                return line
+
+
+class PolicySource:
+    '''Ask policy for every answer by calling policy(message, choices).
+    
+    The choices are the valid answers when they are known (a list of
+    decisions or a range of integers), otherwise None. The answer
+    can be any value and is converted to a string.
+    '''
+    
+    interactive = False
+    
+    def __init__(self, policy):
+        self.policy = policy
+    
+    def answer(self, message: str, choices) -> str:
+        return str(self.policy(message, choices))
+
+
+decision_source = ConsoleSource()
+
+# When true, await_continue and the pause of print_yield do nothing.
+no_wait = False
+
+
+def set_decision_source(new_source):
+    '''Replace the source of every answer given to prompt with new_source.'''
+    
+    global decision_source
+    
+    decision_source = new_source
+
+
+def set_no_wait(enabled: bool):
+    '''Enable or disable the no-wait mode, in which await_continue
+    and the pause of print_yield do nothing.'''
+    
+    global no_wait
+    
+    no_wait = enabled
+
+
+def prompt(message: str, choices=None) -> str:
+    '''Flush the current renderer so the complete screen is visible, 
+    then prompt the user with message and return their answer from the
+    current decision source, passing it the valid choices if known.
+    
+    Answers that do not come from the user are displayed
+    after message, so the output reads like a transcript.
+    '''
+    
+    renderer.flush()
+    
+    answer = decision_source.answer(message, choices)
+    
+    if not decision_source.interactive:
+        emit(message + answer)
+    
+    return answer
+
+
 def get_suit(card: str) -> str:
     '''Determine the suit initial of card and 
     return it as a string.
     
     >>> get_suit("11h0")
-    "h"
+    'h'
     >>> get_suit("1c0")
-    "c"
+    'c'
     '''
     
     return card[-2]
@@ -58,9 +249,9 @@ def get_rank(card: str) -> int:
     card and including all the characters up to but not including
     the second last character.
     
-    >>> is_hidden("12s0")
+    >>> get_rank("12s0")
     12
-    >>> is_hidden("3c1")
+    >>> get_rank("3c1")
     3
     '''
     
@@ -73,9 +264,9 @@ def get_rank_symbol(rank: int) -> str:
     as a string
     
     >>> get_rank_symbol(2)
-    "2"
+    '2'
     >>> get_rank_symbol(1)
-    "A"
+    'A'
     '''
     
     if rank in rank_symbols:
@@ -103,6 +294,9 @@ def hand_value(cards: [str]) -> [int]:
     [5]
     '''
 
+    if metrics.enabled:
+        metrics.count("hand_value_calls")
+
     has_ace = False
     primary_value = 0
 
@@ -135,24 +329,133 @@ def hand_value(cards: [str]) -> [int]:
     return values
 
 
-def graphical_hand_state(hand: dict) -> str:
+def card_value(card: str) -> int:
+    '''Return the value of card, counting an ace as 1,
+    or 0 if card is hidden.
+    
+    >>> card_value("12s0")
+    10
+    >>> card_value("1h0")
+    1
+    >>> card_value("7c1")
+    0
+    '''
+    
+    if is_hidden(card):
+        return 0
+    
+    return min(get_rank(card), 10)
+
+
+def count_card(hand: models.Hand, card: str, direction: int=1):
+    '''Update the running totals of hand (its hard value, number of aces,
+    and number of cards) for card being added to it, or removed from it
+    if direction is -1.
+    
+    The cards list of hand itself is not modified.
+    '''
+    
+    value = card_value(card)
+    
+    hand.hard_value += value * direction
+    hand.card_count += direction
+    
+    if value == 1:
+        hand.ace_count += direction
+
+
+def hand_values(hand: models.Hand) -> [int]:
+    '''Return the possible hand values of hand as an integer list, exactly
+    like hand_value, but read from the running totals of hand
+    instead of rescanning its cards.
+    
+    >>> from main import new_hand
+    >>> hand_values(new_hand(0, ["1c0", "2s0"]))
+    [3, 13]
+    >>> hand_values(new_hand(0, ["1c0", "10s0", "4d0"]))
+    [15]
+    '''
+    
+    if metrics.enabled:
+        metrics.count("hand_value_calls")
+    
+    hard_value = hand.hard_value
+    
+    # Only include the 'ace as an 11-value card' if it is below 21!
+    if hand.ace_count > 0 and hard_value + 10 <= 21:
+        return [hard_value, hard_value + 10]
+    
+    return [hard_value]
+
+
+def dealer_should_hit(values: [int], soft_17_hit: bool) -> bool:
+    '''Return true if and only if a dealer holding a hand with the
+    possible hand values in values must draw another card.
+    
+    The dealer only hits if their soft value is less than
+    or equalled to 17 AND soft_17_hit is true. 
+    The dealer must stand for any value higher than 17, 
+    whether it is soft or hard.
+    If soft_17_hit is false, the dealer will only
+    hit if the soft value is less than 17.
+    
+    >>> dealer_should_hit([7, 17], True)
+    True
+    >>> dealer_should_hit([7, 17], False)
+    False
+    >>> dealer_should_hit([16], False)
+    True
+    '''
+    
+    if soft_17_hit == True:
+        return min(values) < 17 and max(values) < 18
+    
+    return max(values) < 17
+
+
+def hand_return(user_values: [int], dealer_values: [int], bet: float) -> float:
+    '''Return the amount paid back to the user for a hand with the possible
+    hand values user_values and a bet of bet once the dealer has finished
+    with the possible hand values dealer_values.
+    
+    A win returns twice the bet, a push returns the bet, and
+    a loss (including a bust) returns nothing.
+    
+    >>> hand_return([20], [19], 10.0)
+    20.0
+    >>> hand_return([8, 18], [18], 10.0)
+    10.0
+    >>> hand_return([22], [26], 10.0)
+    0
+    '''
+    
+    if min(user_values) <= 21:
+        if max(user_values) == max(dealer_values):
+            return bet
+        elif max(dealer_values) > 21 or max(user_values) > max(dealer_values):
+            return bet * 2
+    
+    return 0
+
+
+def graphical_hand_state(hand: models.Hand) -> str:
     '''Determine and return, as a string, the state, hand value(s), and the bet 
     of hand in a graphical state that will be displayed in the output.
     
-    >>> graphical_hand_state( { "bet": 15, "cards": ["1s0", "10d0"], "is_split": False, "double_bet": False } )
-    "BLACKJACK - $15.00"
-    >>> graphical_hand_state( { "bet": 10.0, "cards": ["1s0", "5d0"], "is_split": False, "double_bet": False } )
-    "6 / 16 - $10.00"
-    >>> graphical_hand_state( { "bet": 20.0, "cards": ["2s0", "3d0"], "is_split": False, "double_bet": False } )
-    "5 - $20.00"
+    >>> from main import new_hand
+    >>> graphical_hand_state(new_hand(15, ["1s0", "10d0"]))
+    'BLACKJACK - $15.00'
+    >>> graphical_hand_state(new_hand(10.0, ["1s0", "5d0"]))
+    '6 / 16 - $10.00'
+    >>> graphical_hand_state(new_hand(20.0, ["2s0", "3d0"]))
+    '5 - $20.00'
     '''
 
-    cards = hand["cards"]
-    values = hand_value(cards)
+    values = hand_values(hand)
     
     state_display = ""
     
-    if len(cards) == 2 and max(values) == 21:
+    if hand.card_count == 2 and max(values) == 21:
         state_display += "BLACKJACK"
     elif min(values) > 21:
         state_display += f"{values[0]} (BUST)"
@@ -166,20 +469,20 @@ def graphical_hand_state(hand: dict) -> str:
             if i != (len(values) - 1):
                 state_display += " / "
     
-    if hand["bet"] > 0:
-        state_display += f" - ${hand['bet']:.2f}"
+    if hand.bet > 0:
+        state_display += f" - ${hand.bet:.2f}"
 
     return state_display
 
 
-def graphical_hand_comparison(primary_cards: [str], secondary_cards: [str], game_ended: bool) -> str:
+def graphical_hand_comparison(primary_hand: models.Hand, secondary_hand: models.Hand, game_ended: bool) -> str:
     '''Return, as a string to be displayed in the output, 
-    whether the hand value of primary_cards denotes that it is 
+    whether the hand value of primary_hand denotes that it is 
     currently winning, losing, or is in a tie (push) when compared to 
-    the hand value of secondary_cards, with a slight tense
+    the hand value of secondary_hand, with a slight tense
     modification if game_ended is true.
     
-    The returned string is empty if the hand value of primary_cards 
+    The returned string is empty if the hand value of primary_hand 
     denotes that it has busted.
 
     If game_ended is false, the tense of the state will be different
@@ -188,19 +491,20 @@ def graphical_hand_comparison(primary_cards: [str], secondary_cards: [str], game
     E.g. if game_ended is false, it will display "WINNING" or "LOSING"
     However, if game_ended is true, it will display "WIN" or "LOSE".
     
-    >>> graphical_hand_comparison(["1s0", "10d0"], ["2s0", "4c0"], False)
-    " (WINNING)"
-    >>> graphical_hand_comparison(["1s0", "8d0"], ["10s0", "12c0"], True)
-    " (LOSS)"
-    >>> graphical_hand_comparison(["7s0", "8d0", "10s0"], ["12s0", "6c0"], False)
-    ""
+    >>> from main import new_hand
+    >>> graphical_hand_comparison(new_hand(0, ["1s0", "10d0"]), new_hand(0, ["2s0", "4c0"]), False)
+    ' (WINNING)'
+    >>> graphical_hand_comparison(new_hand(0, ["1s0", "8d0"]), new_hand(0, ["10s0", "12c0"]), True)
+    ' (LOSS)'
+    >>> graphical_hand_comparison(new_hand(0, ["7s0", "8d0", "10s0"]), new_hand(0, ["12s0", "6c0"]), False)
+    ''
     '''
 
-    primary_values = hand_value(primary_cards)
+    primary_values = hand_values(primary_hand)
     
     # The maximum hand value of the secondary hand value(s)
     # is what the primary hand is compared to
-    secondary_value = max(hand_value(secondary_cards))
+    secondary_value = max(hand_values(secondary_hand))
 
     comparison = ""
         
@@ -222,40 +526,26 @@ def get_lines(drawings: [str]) -> [str]:
     It is assumed that each string in drawings has the same height
     (i.e. has the same number of newline characters).
     
-    >>> get_lines(["Drawing 1 - Row 1 \nDrawing 1 - Row 2 \nDrawing 1 - Row 3 ", "| Drawing 2 - Row 1\n| Drawing 2 - Row 2\n| Drawing 2 - Row 3"])
+    >>> get_lines(["Drawing 1 - Row 1 \\nDrawing 1 - Row 2 \\nDrawing 1 - Row 3 ", "| Drawing 2 - Row 1\\n| Drawing 2 - Row 2\\n| Drawing 2 - Row 3"])
     ['Drawing 1 - Row 1 | Drawing 2 - Row 1', 'Drawing 1 - Row 2 | Drawing 2 - Row 2', 'Drawing 1 - Row 3 | Drawing 2 - Row 3']
     '''
 
-    result = []
+    return join_lines([drawing.split('\n') for drawing in drawings])
+
+
+def join_lines(glyphs: [[str]]) -> [str]:
+    '''Return a list of strings describing what each line should output
+    if the drawings in glyphs, each already split into a list of lines,
+    were placed beside each other.
     
-    COMPLETED = False
+    Each line is joined in a single pass, so the time taken is linear in
+    the total size of the drawings.
     
-    while not COMPLETED:
-        current_line = ""
-        
-        for i in range(len(drawings)):
-            drawing = drawings[i]
-            
-            # Determine each line based on newline characters.
-            new_line_index = drawing.find('\n')
-            
-            # If no newline character is found, we know
-            # that we are on the final line of the drawings.
-            if new_line_index == -1:
-                COMPLETED = True
-                current_line += drawing
-            else:
-                # Include every character up to but not including the
-                # new line character.
-                current_line += drawing[:new_line_index]
-
-                # Then, remove those characters (including 
-                # the newline) from the original drawing.
-                drawings[i] = drawing[new_line_index + 1:]
-        
-        result.append(current_line)
+    >>> join_lines([["a", "b"], ["1", "2"]])
+    ['a1', 'b2']
+    '''
 
-    return result
+    return ["".join(row) for row in zip(*glyphs)]
 
 
 def full_card(hidden: bool) -> str:
@@ -263,10 +553,10 @@ def full_card(hidden: bool) -> str:
     an entire hidden card if and only if hidden is true, otherwise, return
     the graphical representation of an entire visible card.
 
-    >>> full_card(True)
-    "╔═══════════╗\n║        {:>2} ║\n║         {} ║\n║           ║\n║  ╚═════╗  ║\n║  ║  {}  ║  ║\n║  ╚═════╗  ║\n║           ║\n║ {}         ║\n║ {:<2}        ║\n╚═══════════╝"
     >>> full_card(False)
-    "╔═══════════╗\n║?╔═══════╗?║\n║ ║       ║ ║\n║ ║       ║ ║\n║ ║       ║ ║\n║ ║       ║ ║\n║ ║       ║ ║\n║ ║       ║ ║\n║ ║       ║ ║\n║?╚═══════╝?║\n╚═══════════╝"
+    '╔═══════════╗\\n║        {:>2} ║\\n║         {} ║\\n║           ║\\n║  ╚═════╗  ║\\n║  ║  {}  ║  ║\\n║  ╚═════╗  ║\\n║           ║\\n║ {}         ║\\n║ {:<2}        ║\\n╚═══════════╝'
+    >>> full_card(True)
+    '╔═══════════╗\\n║?╔═══════╗?║\\n║ ║       ║ ║\\n║ ║       ║ ║\\n║ ║       ║ ║\\n║ ║       ║ ║\\n║ ║       ║ ║\\n║ ║       ║ ║\\n║ ║       ║ ║\\n║?╚═══════╝?║\\n╚═══════════╝'
     '''
 
     if hidden == True:
@@ -301,9 +591,9 @@ def half_card(hidden: bool) -> str:
     the graphical representation of a visible half card.
     
     >>> half_card(True)
-    "═══╗\n═╗?║\n ║ ║\n ║ ║\n ║ ║\n ║ ║\n ║ ║\n ║ ║\n ║ ║\n═╝?║\n═══╝"
+    '═══╗\\n═╗?║\\n ║ ║\\n ║ ║\\n ║ ║\\n ║ ║\\n ║ ║\\n ║ ║\\n ║ ║\\n═╝?║\\n═══╝'
     >>> half_card(False)
-    "═══╗\n{:>2} ║\n {} ║\n   ║\n╗  ║\n║  ║\n╗  ║\n   ║\n   ║\n   ║\n═══╝"
+    '═══╗\\n{:>2} ║\\n {} ║\\n   ║\\n╗  ║\\n║  ║\\n╗  ║\\n   ║\\n   ║\\n   ║\\n═══╝'
     '''
     
     if hidden == True:
@@ -332,45 +622,65 @@ def half_card(hidden: bool) -> str:
 ═══╝"""
 
 
+def _build_glyphs() -> (dict, dict):
+    '''Format the full and half graphical representation of every possible
+    card once, returning two dictionaries that map each card string
+    to its drawing, already split into a list of lines.'''
+
+    full_glyphs = {}
+    half_glyphs = {}
+    
+    for rank in range(1, 14):
+        rank_symbol = get_rank_symbol(rank)
+        
+        for suit, suit_symbol in suit_symbols.items():
+            for hidden in (False, True):
+                card = f"{rank}{suit}{1 if hidden else 0}"
+                symbols = (rank_symbol, suit_symbol, suit_symbol, suit_symbol, rank_symbol)
+                
+                full_glyphs[card] = full_card(hidden).format(*symbols).split('\n')
+                half_glyphs[card] = half_card(hidden).format(*symbols).split('\n')
+    
+    return full_glyphs, half_glyphs
+
+
+# The pre-rendered lines of every card, looked up by its string.
+full_glyphs, half_glyphs = _build_glyphs()
+
+
 def print_cards(cards: [str]):
     '''Retrieve the graphical representation of each card in cards
     and display them side by side.'''
 
-    card_drawings = []
+    if not renderer.enabled:
+        return
     
-    for i in range(len(cards)):
-        card = cards[i]
-        suit_symbol = suit_symbols[get_suit(card)]
-        rank = get_rank(card)
-        hidden = is_hidden(card)
-        rank_symbol = get_rank_symbol(rank)
-        
-        if i == 0:
-            # Only display the full card if it is the top card
-            # in the deck
-            drawing = full_card(hidden)
-        else:
-            drawing = half_card(hidden)
-        
-        card_drawings.append(drawing.format(rank_symbol, suit_symbol, suit_symbol, suit_symbol, rank_symbol))
+    # Only display the full card if it is the top card
+    # in the deck
+    card_glyphs = [full_glyphs[cards[0]]]
+    
+    for card in cards[1:]:
+        card_glyphs.append(half_glyphs[card])
     
-    output_lines = get_lines(card_drawings)
+    output_lines = join_lines(card_glyphs)
     
-    for line in output_lines:
-        print(line)
+    emit("\n".join(output_lines))
 
 
-def print_dealer_hand(dealer_hand: dict):
+def print_dealer_hand(dealer_hand: models.Hand):
     '''Display information regarding dealer_hand such as the
     cards it contains and the total hand value.'''
 
-    print("Dealer's hand:")
-    print_cards(dealer_hand["cards"])
-    print("Value: " + graphical_hand_state(dealer_hand))
-    print()
+    if not renderer.enabled:
+        return
+
+    emit("Dealer's hand:")
+    print_cards(dealer_hand.cards)
+    emit("Value: " + graphical_hand_state(dealer_hand))
+    emit()
 
 
-def print_user_hand(user_hand: dict, dealer_hand: dict, game_ended: bool, hand_count_ratio: str=None):
+def print_user_hand(user_hand: models.Hand, dealer_hand: models.Hand, game_ended: bool, hand_count_ratio: str=None):
     '''Display, with a slight tense modification if game_ended is true,
     information regarding user_hand such as the cards
     it contains, the hand's value, the hand's state compared to 
@@ -387,6 +697,9 @@ def print_user_hand(user_hand: dict, dealer_hand: dict, game_ended: bool, hand_c
     However, if game_ended is true, it will display "WIN" or "LOSE".
     '''
 
+    if not renderer.enabled:
+        return
+
     hand_count_output = "Your hand"
     
     if hand_count_ratio != None:
@@ -397,16 +710,15 @@ def print_user_hand(user_hand: dict, dealer_hand: dict, game_ended: bool, hand_c
     if game_ended == True:
         pass
     
-    print(hand_count_output + ":")
+    emit(hand_count_output + ":")
     
-    user_cards = user_hand["cards"]
-    dealer_cards = dealer_hand["cards"]
-    print_cards(user_cards)
-    print("Value: " + graphical_hand_state(user_hand) + graphical_hand_comparison(user_cards, dealer_cards, game_ended))
-    print()
+    print_cards(user_hand.cards)
+    emit("Value: " + graphical_hand_state(user_hand) + graphical_hand_comparison(user_hand, dealer_hand, game_ended))
+    emit()
 
 
-def print_hands(dealer_hand: dict, user_hand: [dict], hand_count_ratio: str=None):
+@metrics.timed("rendering")
+def print_hands(dealer_hand: models.Hand, user_hand: [models.Hand], hand_count_ratio: str=None):
     '''Display the dealer_hand and the user_hand, accounting 
     for the hand_count_ratio, if applicable.'''
 
@@ -414,7 +726,32 @@ def print_hands(dealer_hand: dict, user_hand: [dict], hand_count_ratio: str=None
     print_user_hand(user_hand, dealer_hand, False, hand_count_ratio)
 
 
-def print_hands_all(dealer_hand: dict, user_hands: [dict], game_ended: bool=None):
+# The name of each action shown in the live odds panel.
+ACTION_NAMES = {'h': "(h)it", 's': "(s)tand", 'd': "(d)ouble", "sp": "(sp)lit", 'f': "(f)orfeit"}
+
+
+@metrics.timed("rendering")
+def print_odds_hud(panel: dict):
+    '''Display the live odds panel of the user's current hand (see hud.hand_odds):
+    the chance of busting on a hit, the chance of each final dealer total,
+    and the EV of every available action, with the best one marked.'''
+
+    if not renderer.enabled:
+        return
+
+    dealer = "  ".join(f"{outcome} {probability * 100:.1f}%" for outcome, probability in panel["dealer"].items())
+    best = max(panel["evs"], key=panel["evs"].get)
+    evs = "  ".join(f"{ACTION_NAMES[action]} {ev:+.3f}{'*' if action == best else ''}" for action, ev in panel["evs"].items())
+
+    emit("Odds:")
+    emit(f"  Bust on a hit: {panel['bust'] * 100:.1f}%")
+    emit(f"  Dealer finishes: {dealer}")
+    emit(f"  EV per bet: {evs}")
+    emit()
+
+
+@metrics.timed("rendering")
+def print_hands_all(dealer_hand: models.Hand, user_hands: [models.Hand], game_ended: bool=None):
     '''Display all of the hands in user_hands, comapring them to dealer_hand and
     displaying with a slight tense modification if game_ended is true.
     
@@ -428,17 +765,20 @@ def print_hands_all(dealer_hand: dict, user_hands: [dict], game_ended: bool=None
     However, if game_ended is true, it will display "WIN" or "LOSE".
     '''
 
+    if not renderer.enabled:
+        return
+
     print_dealer_hand(dealer_hand)
     
     if len(user_hands) > 1:
         # Use minimal layout if the user has multiple hands
-        print("Your hands:")
+        emit("Your hands:")
         
         for i in range(len(user_hands)):
             hand = user_hands[i]
             
-            graphical_state = graphical_hand_state(hand) + graphical_hand_comparison(hand["cards"], dealer_hand["cards"], game_ended)
-            print(f"  Hand #{i+1}: {graphical_state}")
+            graphical_state = graphical_hand_state(hand) + graphical_hand_comparison(hand, dealer_hand, game_ended)
+            emit(f"  Hand #{i+1}: {graphical_state}")
     else:
         # Use standard layout
         print_user_hand(user_hands[0], dealer_hand, game_ended)
@@ -448,8 +788,8 @@ def print_intro():
     '''Display the introduction of the game which 
     only plays at the beginning of the game.'''
 
-    print()
-    print(""" /$$$$$$$  /$$        /$$$$$$   /$$$$$$  /$$   /$$    /$$$$$  /$$$$$$   /$$$$$$  /$$   /$$
+    emit()
+    emit(""" /$$$$$$$  /$$        /$$$$$$   /$$$$$$  /$$   /$$    /$$$$$  /$$$$$$   /$$$$$$  /$$   /$$
 | $$__  $$| $$       /$$__  $$ /$$__  $$| $$  /$$/   |__  $$ /$$__  $$ /$$__  $$| $$  /$$/
 | $$  \ $$| $$      | $$  \ $$| $$  \__/| $$ /$$/       | $$| $$  \ $$| $$  \__/| $$ /$$/ 
 | $$$$$$$ | $$      | $$$$$$$$| $$      | $$$$$/        | $$| $$$$$$$$| $$      | $$$$$/  
@@ -468,53 +808,61 @@ def print_settings_menu(settings: dict):
     counter = 0
     for setting in settings.values():
         counter +=1
-        print(f"{counter}. {(setting['display_name']):<30}{setting['value']}")
+        emit(f"{counter}. {(setting['display_name']):<30}{setting['value']}")
 
 
 def await_continue(message: str="[press enter to continue...]"):
     '''Prompts the user with message and waits for the 
-    user to want to continue by asking for an empty input.'''
+    user to want to continue by asking for an empty input.
+    
+    Does nothing in the no-wait mode.'''
     
-    input(message)
+    if no_wait:
+        return
+    
+    prompt(message)
 
 
 def print_yield(message: str="", duration: int=0.5):
     '''Print message in the output and pause the current thread
-    for duration seconds.'''
+    for duration seconds, unless in the no-wait mode.'''
 
-    print(message)
-    time.sleep(duration)
+    emit(message)
+    renderer.flush()
+    
+    if not no_wait:
+        time.sleep(duration)
 
 
 def print_menu():
     '''Display the main menu options to the user.'''
     
     print_title("MENU")
-    print("1. Start game")
-    print("2. Options")
-    print("3. View Balance")
-    print("4. Restart game")
-    print("5. Tutorial")
-    print("6. Exit")
+    emit("1. Start game")
+    emit("2. Options")
+    emit("3. View Balance")
+    emit("4. Restart game")
+    emit("5. Tutorial")
+    emit("6. Exit")
 
 
 def print_title(label: str):
     '''Output label with some dashed lines on each side 
     to make it look like a title.'''
     
-    print()
+    emit()
     
     dash_width = (TITLE_WIDTH - len(label)) / 2.0
     left_dashes = "-" * math.floor(dash_width)
     right_dashes = "-"* math.ceil(dash_width)
-    print(f"{left_dashes} {label} {right_dashes}")
+    emit(f"{left_dashes} {label} {right_dashes}")
 
 
 def print_goodbye():
     '''Display the farewell message displayed when 
     the user quits the game'''
     
-    print()
-    print("Thank you for playing Blackjack!")
-    print("Goodbye!")
+    emit()
+    emit("Thank you for playing Blackjack!")
+    emit("Goodbye!")
 